@@ -0,0 +1,184 @@
+"""
+Admission control for the chat endpoints.
+
+Three checks run before a message is processed:
+
+1. Rate limits: a token bucket per API key and one per session_id
+   (RATE_LIMIT_KEY_RPS / _BURST, RATE_LIMIT_SESSION_RPS / _BURST). A caller
+   over its budget gets 429 with the seconds until its next token.
+2. Load shedding: past ADMISSION_MAX_IN_FLIGHT requests in progress, new
+   ones get 503 straight away instead of joining the pile. So does bulk
+   work (/chat/batch) whenever the server is degraded. A bulk stream counts
+   as one request, plus one per item of the chunk being classified.
+3. Degradation: when the requests in progress, the guard-model queue or
+   the Groq queue pass their thresholds, the request is admitted on the
+   cheap path: detection by the sub-millisecond tiers only (session,
+   indicator index, heuristic) and a cached or canned Arthur reply. It
+   answers in milliseconds, so the backlog in front of the model and Groq
+   drains instead of growing.
+
+Everything here runs on the event loop thread, so no locking is needed.
+"""
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from app import agent, security
+
+# Set ADMISSION=0 to admit everything on the full path (rate limits included)
+ADMISSION_ENABLED = os.getenv("ADMISSION", "1") == "1"
+RATE_LIMIT_KEY_RPS = float(os.getenv("RATE_LIMIT_KEY_RPS", "200"))
+RATE_LIMIT_KEY_BURST = float(os.getenv("RATE_LIMIT_KEY_BURST", "400"))
+RATE_LIMIT_SESSION_RPS = float(os.getenv("RATE_LIMIT_SESSION_RPS", "2"))
+RATE_LIMIT_SESSION_BURST = float(os.getenv("RATE_LIMIT_SESSION_BURST", "10"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "512"))
+DEGRADE_IN_FLIGHT = int(os.getenv("ADMISSION_DEGRADE_IN_FLIGHT", "64"))
+DEGRADE_MODEL_QUEUE = int(os.getenv("ADMISSION_DEGRADE_MODEL_QUEUE", str(4 * security.MAX_BATCH_SIZE)))
+DEGRADE_LLM_QUEUE = int(os.getenv("ADMISSION_DEGRADE_LLM_QUEUE", str(agent.LLM_MAX_CONCURRENCY)))
+# Pipeline stages cheaper than this (ms) still run on the degraded path
+DEGRADED_MAX_COST = float(os.getenv("ADMISSION_DEGRADED_MAX_COST", "1.0"))
+SHED_RETRY_AFTER = 1.0
+
+
+class Rejected(Exception):
+    """A request refused at admission; carries its HTTP status and Retry-After."""
+
+    def __init__(self, status: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """
+    Token buckets keyed by caller. Each bucket refills at `rate` tokens per
+    second up to `burst`; a request takes one token.
+
+    Only the last state of a bucket is stored (tokens, last update), and at
+    most `max_keys` buckets are kept: the least recently used are dropped,
+    which for an idle caller is the same as a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = RATE_LIMIT_MAX_KEYS, name: str = "limiter"):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_keys = max(1, max_keys)
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self.limited = 0
+
+    def take(self, key: str, now: Optional[float] = None) -> float:
+        """
+        Takes one token from key's bucket.
+
+        Returns:
+            float: 0.0 if the request may go ahead, else the seconds until
+                the bucket holds a token again.
+        """
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return 0.0
+        self.limited += 1
+        return (1.0 - bucket[0]) / self.rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class AdmissionController:
+    """Rate limits, the in-flight count and the degrade / shed decision."""
+
+    def __init__(self):
+        self.keys = RateLimiter(RATE_LIMIT_KEY_RPS, RATE_LIMIT_KEY_BURST, name="api_key")
+        self.sessions = RateLimiter(RATE_LIMIT_SESSION_RPS, RATE_LIMIT_SESSION_BURST, name="session")
+        self.in_flight = 0
+        self.outcomes = {"full": 0, "degraded": 0, "rate_limited": 0, "shed": 0}
+
+    def pressure(self) -> Dict[str, int]:
+        """The load signals compared against the degrade thresholds."""
+        return {
+            "in_flight": self.in_flight,
+            "model_queue": security.ENGINE.queue_depth() if security.ENGINE else 0,
+            "llm_queue": agent.llm_queue_depth(),
+        }
+
+    def overloaded(self) -> bool:
+        signals = self.pressure()
+        return (signals["in_flight"] >= DEGRADE_IN_FLIGHT
+                or signals["model_queue"] >= DEGRADE_MODEL_QUEUE
+                or signals["llm_queue"] >= DEGRADE_LLM_QUEUE)
+
+    def admit(self, api_key: str, session_id: Optional[str] = None, deferrable: bool = False) -> bool:
+        """
+        Decides how to serve one request.
+
+        Args:
+            api_key (str): The caller's API key.
+            session_id (Optional[str]): The chat session, if the endpoint has one.
+            deferrable (bool): Work with no cheap path (bulk feeds): shed it
+                instead of degrading.
+
+        Returns:
+            bool: True to serve it on the degraded (cheap) path.
+
+        Raises:
+            Rejected: 429 when a rate limit is exhausted, 503 when shedding.
+        """
+        wait = self.keys.take(api_key or "")
+        if not wait and session_id is not None:
+            wait = self.sessions.take(session_id)
+        if wait:
+            self.outcomes["rate_limited"] += 1
+            raise Rejected(429, "Rate limit exceeded", wait)
+        if not ADMISSION_ENABLED:
+            self.outcomes["full"] += 1
+            return False
+        degraded = self.overloaded()
+        if self.in_flight >= MAX_IN_FLIGHT or (degraded and deferrable):
+            self.outcomes["shed"] += 1
+            raise Rejected(503, "Server overloaded", SHED_RETRY_AFTER)
+        self.outcomes["degraded" if degraded else "full"] += 1
+        return degraded
+
+    @contextmanager
+    def slot(self, weight: int = 1):
+        """Counts the enclosed work as `weight` requests in flight."""
+        self.in_flight += weight
+        try:
+            yield
+        finally:
+            self.in_flight -= weight
+
+    def stats(self) -> dict:
+        return {
+            "enabled": ADMISSION_ENABLED,
+            **self.pressure(),
+            "thresholds": {
+                "max_in_flight": MAX_IN_FLIGHT,
+                "degrade_in_flight": DEGRADE_IN_FLIGHT,
+                "degrade_model_queue": DEGRADE_MODEL_QUEUE,
+                "degrade_llm_queue": DEGRADE_LLM_QUEUE,
+            },
+            "outcomes": dict(self.outcomes),
+            "rate_limited": {"api_key": self.keys.limited, "session": self.sessions.limited},
+            "tracked_callers": {"api_key": len(self.keys), "session": len(self.sessions)},
+        }
+
+
+CONTROLLER = AdmissionController()
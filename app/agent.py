@@ -1,21 +1,34 @@
 """
 Module for the AI persona 'Arthur'.
+
+Replies come from the LLM providers in app/providers.py (Groq models by
+default, with hedging and failover between them); when none can answer,
+Arthur carries on offline from templates (app/offline.py).
 """
 import os
-import groq
+import asyncio
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, List, Optional
+
 from dotenv import load_dotenv
 
+from app import cache, conversation, memory, metrics, offline, providers
+
 load_dotenv()
 
-# Setup Client
-API_KEY = os.getenv("GROQ_API_KEY")
-CLIENT = None
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
 
-if API_KEY:
-    try:
-        CLIENT = groq.Groq(api_key=API_KEY)
-    except Exception as e:
-        print(f"Groq Client Initialization Error: {e}")
+# Ordered LLM backends (empty without an API key)
+PROVIDERS = providers.load_pool()
+if not PROVIDERS.providers:
+    # Warned once at startup; every reply then comes from the offline templates
+    print("Warning: Arthur has no LLM provider (is GROQ_API_KEY set?)")
+
+# Caps in-flight completions so a slow LLM cannot pile up unbounded work
+LLM_SLOTS = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+# Calls waiting for or holding a slot (event loop only)
+_LLM_PENDING = 0
 
 
 # The Persona
@@ -33,10 +46,69 @@ CRITICAL RULES:
 5. VARY YOUR RESPONSES. Do not repeat phrases.
 """
 
+class CallMetrics:
+    """Metric children for one kind of LLM call."""
+
+    __slots__ = ("in_flight", "seconds", "ok", "error")
+
+    def __init__(self, call: str):
+        self.in_flight = metrics.LLM_IN_FLIGHT.labels(call)
+        self.seconds = metrics.LLM_SECONDS.labels(call)
+        self.ok = metrics.LLM_CALLS.labels(call, "ok")
+        self.error = metrics.LLM_CALLS.labels(call, "error")
+
+
+@contextmanager
+def tracked(call: CallMetrics):
+    """Counts a call in the in-flight gauge, latency histogram and outcome counter."""
+    call.in_flight.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        call.error.inc()
+        raise
+    else:
+        call.ok.inc()
+    finally:
+        call.in_flight.dec()
+        call.seconds.since(start)
+
+
+REPLY_CALL = CallMetrics("reply")
+ADJUDICATE_CALL = CallMetrics("adjudicate")
+STREAM_CALL = CallMetrics("stream")
+
+
+@asynccontextmanager
+async def llm_slot():
+    """Holds one of LLM_SLOTS, counting the wait in llm_queue_depth()."""
+    global _LLM_PENDING
+    _LLM_PENDING += 1
+    try:
+        async with LLM_SLOTS:
+            yield
+    finally:
+        _LLM_PENDING -= 1
+
+
+def llm_queue_depth() -> int:
+    """LLM calls waiting for a free slot."""
+    return max(0, _LLM_PENDING - LLM_MAX_CONCURRENCY)
+
 
-def generate_reply(session_id: str, message: str) -> str:
+def last_reply(session_id: str) -> Optional[str]:
+    """Arthur's previous reply in this session, if any."""
+    history = conversation.get_history(session_id)
+    if history and history.turns and history.turns[-1][0] == conversation.ARTHUR:
+        return history.turns[-1][1]
+    return None
+
+
+def offline_reply(session_id: str, message: str) -> str:
     """
-    Sends the user message to Groq and returns the persona's response.
+    Arthur's reply without an LLM call: a template / Markov line from
+    app/offline.py that does not repeat his last reply.
 
     Args:
         session_id (str): The unique session identifier.
@@ -45,26 +117,138 @@ def generate_reply(session_id: str, message: str) -> str:
     Returns:
         str: The persona's response.
     """
-    global CLIENT
-    
-    # Emergency Check
-    if not CLIENT:
-        print("Warning: Arthur is missing the Groq API Key.")
-        return "Oh dear, my computer screen is flickering. One moment..."
+    return offline.ARTHUR.reply(message, avoid=last_reply(session_id))
+
+
+def degraded_reply(session_id: str, message: str) -> str:
+    """
+    Arthur's reply without an LLM call, for requests admitted on the
+    degraded path: any cached reply for this script, else an offline one.
 
+    Args:
+        session_id (str): The unique session identifier.
+        message (str): The user's input message.
+
+    Returns:
+        str: The persona's response.
+    """
+    reply = cache.cached_reply(message, avoid=last_reply(session_id), min_pool=1)
+    if reply:
+        return reply
+    return offline_reply(session_id, message)
+
+
+def build_messages(session_id: str, message: str) -> List[dict]:
+    """Builds the token-budgeted chat prompt for a session."""
+    return conversation.build_prompt(
+        SYSTEM_PROMPT, conversation.get_history(session_id), message
+    )
+
+
+async def generate_reply(session_id: str, message: str) -> str:
+    """
+    Sends the user message to the LLM providers and returns the persona's response.
+
+    Args:
+        session_id (str): The unique session identifier.
+        message (str): The user's input message.
+
+    Returns:
+        str: The persona's response (an offline one if no provider answers).
+    """
+    # Repeated scam script: reuse one of several cached, varied replies
+    reply = cache.cached_reply(message, avoid=await memory.run_blocking(last_reply, session_id))
+    if reply:
+        return reply
+
+    # Emergency Check: nothing to call, or every breaker open
+    if not PROVIDERS.available():
+        return await memory.run_blocking(offline_reply, session_id, message)
+
+    messages = await memory.run_blocking(build_messages, session_id, message)
     try:
-        chat_completion = CLIENT.chat.completions.create(
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": message}
-            ],
-            model="llama-3.3-70b-versatile", 
-            temperature=0.7,        
-        )
-
-        response = chat_completion.choices[0].message.content
+        async with llm_slot():
+            with tracked(REPLY_CALL):
+                response = await PROVIDERS.complete(messages, temperature=0.7)
+        cache.store_reply(message, response)
         return response
 
     except Exception as e:
-        print(f"Groq API Failure: {e}")
-        return "I am sorry, young man. My hearing aid is buzzing again. What did you say?"
\ No newline at end of file
+        print(f"LLM API Failure: {e}")
+        return await memory.run_blocking(offline_reply, session_id, message)
+
+
+ADJUDICATION_PROMPT = """
+You review chat messages for a scam-detection system.
+Reply with a single number between 0 and 1: the probability that the
+message is part of a scam (phishing, fake KYC, lottery, impersonation,
+payment fraud). Reply with the number only.
+"""
+
+
+async def adjudicate(message: str) -> Optional[float]:
+    """
+    Asks the LLM for a scam probability for a message the guard model was unsure about.
+
+    Args:
+        message (str): The user's input message.
+
+    Returns:
+        Optional[float]: The probability, or None if no provider answers or
+        the answer cannot be parsed.
+    """
+    if not PROVIDERS.available():
+        return None
+
+    messages = [
+        {"role": "system", "content": ADJUDICATION_PROMPT},
+        {"role": "user", "content": message}
+    ]
+    try:
+        async with llm_slot():
+            with tracked(ADJUDICATE_CALL):
+                answer = await PROVIDERS.complete(messages, temperature=0.0, max_tokens=8)
+        return min(1.0, max(0.0, float(answer.strip().split()[0])))
+    except Exception as e:
+        print(f"LLM Adjudication Failure: {e}")
+        return None
+
+
+async def stream_reply(session_id: str, message: str) -> AsyncIterator[str]:
+    """
+    Streams the persona's response as text fragments as the LLM produces them.
+
+    Failover, hedging and retries cover opening the stream; once fragments
+    have been sent, a failure just ends the stream. If no provider answers,
+    the whole offline reply is sent as one fragment.
+
+    Args:
+        session_id (str): The unique session identifier.
+        message (str): The user's input message.
+
+    Yields:
+        str: Consecutive fragments of the reply.
+    """
+    reply = cache.cached_reply(message, avoid=await memory.run_blocking(last_reply, session_id))
+    if reply:
+        yield reply
+        return
+
+    if not PROVIDERS.available():
+        yield await memory.run_blocking(offline_reply, session_id, message)
+        return
+
+    messages = await memory.run_blocking(build_messages, session_id, message)
+    fragments = []
+    try:
+        async with llm_slot():
+            with tracked(STREAM_CALL):
+                async for fragment in PROVIDERS.stream(messages, temperature=0.7):
+                    fragments.append(fragment)
+                    yield fragment
+        cache.store_reply(message, "".join(fragments))
+
+    except Exception as e:
+        print(f"LLM API Failure: {e}")
+        if not fragments:
+            yield await memory.run_blocking(offline_reply, session_id, message)
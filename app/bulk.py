@@ -0,0 +1,159 @@
+"""
+Bulk analysis of captured scam messages (SMS / email feeds).
+
+Input is a JSON array or an NDJSON stream of {"session_id", "message"}
+objects. Items are grouped into chunks sized to the guard model's batch
+size; each chunk is extracted in one call and decided stage by stage with
+Pipeline.run_batch, so the model only ever sees full batches. Results come
+back in input order, one dict per item. Bulk items are classified and their
+indicators recorded, but Arthur does not reply to them.
+"""
+import asyncio
+import json
+import os
+from typing import AsyncIterator, Iterable, List, Optional, Union
+
+from app import admission, campaigns, indicators, pipeline, security, utils
+
+# Full model batches per chunk, so the engine never waits on a partial one
+MODEL_BATCHES_PER_CHUNK = int(os.getenv("BULK_MODEL_BATCHES", "4"))
+CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "0")) or security.MAX_BATCH_SIZE * MODEL_BATCHES_PER_CHUNK
+
+Line = Union[str, bytes]
+
+
+def parse_item(raw, index: int) -> dict:
+    """Validates one input object. Invalid items carry an 'error' instead."""
+    if isinstance(raw, (str, bytes)):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            return {"index": index, "error": "invalid JSON"}
+    if not isinstance(raw, dict) or not isinstance(raw.get("message"), str):
+        return {"index": index, "error": "expected {\"session_id\", \"message\"}"}
+    return {"index": index, "session_id": str(raw.get("session_id", "")), "message": raw["message"]}
+
+
+def iter_items(lines: Iterable[Line]) -> Iterable[dict]:
+    """
+    Parses a JSON array (possibly split over lines) or NDJSON lines.
+
+    Args:
+        lines (Iterable[Line]): Lines of the request body or input file.
+
+    Yields:
+        dict: Parsed items from parse_item, numbered from 0.
+    """
+    lines = iter(lines)
+    index = 0
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.strip():
+            continue
+        if line.lstrip().startswith("["):
+            # JSON array: parse it whole
+            rest = "".join(l.decode("utf-8") if isinstance(l, bytes) else l for l in lines)
+            try:
+                array = json.loads(line + rest)
+            except ValueError:
+                yield {"index": index, "error": "invalid JSON array"}
+                return
+            for raw in array:
+                yield parse_item(raw, index)
+                index += 1
+            return
+        yield parse_item(line, index)
+        index += 1
+
+
+async def analyze_chunk(items: List[dict]) -> List[dict]:
+    """
+    Extracts, looks up and classifies a chunk of parsed items.
+
+    Args:
+        items (List[dict]): Items from iter_items (errors pass through).
+
+    Returns:
+        List[dict]: Per-item results in the same order.
+    """
+    valid = [item for item in items if "error" not in item]
+    intelligence = utils.extract_intelligence_batch([item["message"] for item in valid])
+    # Each item is the detection work of one /chat request: count it as one
+    # in flight, so bulk load shows up in admission control's degrade signal
+    with admission.CONTROLLER.slot(len(valid)):
+        decisions = await pipeline.PIPELINE.run_batch(
+            [(item["session_id"], item["message"], intel) for item, intel in zip(valid, intelligence)]
+        )
+
+    results = {}
+    for item, intel, (detected, source, confidence, stage) in zip(valid, intelligence, decisions):
+        # Session-less items would all share the "" node and merge into one campaign
+        if detected and item["session_id"]:
+            campaigns.GRAPH.observe(item["session_id"], intel)
+        if detected and stage is not None and stage.record:
+            indicators.record_intelligence(intel, confidence)
+        results[item["index"]] = {
+            "index": item["index"],
+            "session_id": item["session_id"],
+            "status": "threat" if detected else "clean",
+            "source": source,
+            "confidence": round(confidence, 4),
+            "intelligence": intel,
+        }
+    return [results.get(item["index"], item) for item in items]
+
+
+async def analyze_stream(items: AsyncIterator[dict],
+                         chunk_size: int = CHUNK_SIZE) -> AsyncIterator[dict]:
+    """
+    Analyzes an item stream chunk by chunk, yielding results in order.
+
+    The next chunk is read while the current one is being classified.
+    """
+    running: Optional[asyncio.Task] = None
+    chunk: List[dict] = []
+    async for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            if running is not None:
+                for result in await running:
+                    yield result
+            running = asyncio.ensure_future(analyze_chunk(chunk))
+            chunk = []
+    if running is not None:
+        for result in await running:
+            yield result
+    if chunk:
+        for result in await analyze_chunk(chunk):
+            yield result
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Splits a byte stream (e.g. an HTTP body) into lines."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+async def items_from_body(chunks: AsyncIterator[bytes]) -> AsyncIterator[dict]:
+    """Parses a streamed request body: NDJSON item by item, or a JSON array."""
+    lines = iter_lines(chunks)
+    index = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        if line.lstrip().startswith(b"["):
+            body = [line]
+            async for more in lines:
+                body.append(more)
+            for item in iter_items([b"\n".join(body)]):
+                yield item
+            return
+        yield parse_item(line, index)
+        index += 1
@@ -0,0 +1,174 @@
+"""
+Response caches for repeated scam scripts.
+
+Scam campaigns replay the same lines thousands of times. Two caches sit in
+front of the expensive tiers: classifier verdicts and pools of Arthur
+replies. Replies are keyed on an aggressively normalized form (case,
+spacing, punctuation, links and digit runs folded) so small script
+variations share one pool. Verdicts fold only case, spacing and the
+punctuation around words: a message that differs in a link, domain, phone
+or account number is classified on its own, never given another's verdict.
+A third keeps tokenizer output for the guard model, keyed on a digest of
+the exact text, so retried long messages are not tokenized again.
+"""
+import hashlib
+import os
+import random
+import re
+import string
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+VERDICT_CACHE_SIZE = int(os.getenv("VERDICT_CACHE_SIZE", "50000"))
+VERDICT_CACHE_TTL = float(os.getenv("VERDICT_CACHE_TTL", "3600"))
+REPLY_CACHE_SIZE = int(os.getenv("REPLY_CACHE_SIZE", "5000"))
+REPLY_CACHE_TTL = float(os.getenv("REPLY_CACHE_TTL", "1800"))
+REPLY_POOL_SIZE = int(os.getenv("REPLY_POOL_SIZE", "4"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "2048"))
+# Set REPLY_CACHE=0 to always ask the LLM
+REPLY_CACHE_ENABLED = os.getenv("REPLY_CACHE", "1") == "1"
+
+URL_RUN = re.compile(r'https?://\S+|www\.\S+')
+DIGIT_RUN = re.compile(r'\d+')
+NON_WORD = re.compile(r'[^a-z0-9#<>@]+')
+# Stripped from both ends of each word for verdict keys (inner characters stay)
+EDGE_PUNCTUATION = string.punctuation + "\u2018\u2019\u201c\u201d\u2026"
+
+
+def normalize(message: str) -> str:
+    """Cache key for a message: lowercased, links/digits folded, punctuation dropped."""
+    text = URL_RUN.sub(" <url> ", message.lower())
+    text = DIGIT_RUN.sub("#", text)
+    return NON_WORD.sub(" ", text).strip()
+
+
+def verdict_key(message: str) -> str:
+    """Cache key for a classifier verdict: lowercased, spacing and edge punctuation folded."""
+    words = (word.strip(EDGE_PUNCTUATION) for word in message.lower().split())
+    return " ".join(word for word in words if word)
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries also expire after ttl seconds."""
+
+    def __init__(self, max_size: int, ttl: float, name: str = "cache"):
+        self.name = name
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Returns the live value for key (refreshing its LRU position) or default."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def peek(self, key: str, default: Any = None) -> Any:
+        """Like get(), but leaves counters and LRU order untouched."""
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return default
+        return entry[1]
+
+    def set(self, key: str, value: Any) -> None:
+        """Stores value under key with a fresh TTL, evicting the LRU entry if full."""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def count(self, hit: bool) -> None:
+        """Records a lookup made through peek()."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+VERDICTS = TTLCache(VERDICT_CACHE_SIZE, VERDICT_CACHE_TTL, "verdicts")
+REPLIES = TTLCache(REPLY_CACHE_SIZE, REPLY_CACHE_TTL, "replies")
+# Token ids never go stale for a given tokenizer; only the LRU bound applies
+TOKENS = TTLCache(TOKEN_CACHE_SIZE, float("inf"), "tokens")
+
+
+def text_digest(text: str) -> bytes:
+    """Key of the token cache: a 128-bit digest of the exact message text."""
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+def cached_reply(message: str, avoid: Optional[str] = None,
+                 min_pool: int = REPLY_POOL_SIZE) -> Optional[str]:
+    """
+    Picks a cached Arthur reply for a repeated script, if the pool is full.
+
+    Until min_pool (by default REPLY_POOL_SIZE) different replies have been
+    collected for a key, this returns None so the LLM keeps adding variety
+    to the pool.
+
+    Args:
+        message (str): The scammer message.
+        avoid (Optional[str]): A reply not to repeat (e.g. Arthur's last one).
+        min_pool (int): Replies the pool needs before it is used.
+
+    Returns:
+        Optional[str]: A reply from the pool, or None on a miss.
+    """
+    if not REPLY_CACHE_ENABLED:
+        return None
+    pool: List[str] = REPLIES.peek(normalize(message), [])
+    full = len(pool) >= max(1, min_pool)
+    REPLIES.count(full)
+    if not full:
+        return None
+    choices = [reply for reply in pool if reply != avoid] or pool
+    return random.choice(choices)
+
+
+def store_reply(message: str, reply: str) -> None:
+    """Adds a fresh LLM reply to the message's pool (distinct replies only)."""
+    if not REPLY_CACHE_ENABLED or not reply:
+        return
+    key = normalize(message)
+    pool = list(REPLIES.peek(key, []))
+    if reply not in pool:
+        pool.append(reply)
+    REPLIES.set(key, pool[-REPLY_POOL_SIZE:])
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """Hit/miss counters of every cache."""
+    return {"verdicts": VERDICTS.stats(), "replies": REPLIES.stats(), "tokens": TOKENS.stats()}
@@ -0,0 +1,242 @@
+"""
+Campaign graph: sessions and the indicators they reveal.
+
+Nodes are sessions and canonical indicators (see app.canonical); a session
+is linked to every indicator extracted from its scam messages. A campaign
+is a connected component: one phone number shared by two sessions puts
+both sessions, and every domain and UPI ID either of them used, into the
+same campaign.
+
+Components are kept by a union-find (path halving, union by size) updated
+with each message, never recomputed. Each root also holds its member
+lists, merged small-into-large, so "all indicators in this campaign" is a
+find plus a slice. A campaign is named after the smallest indicator value
+it contains, so the id is the same in every worker and changes only when
+two campaigns merge.
+
+Only links that add a node or join two campaigns are persisted
+(campaign_edges, through the queued threat-store writer): that spanning
+forest rebuilds the same components on startup, and other workers pull it
+incrementally.
+"""
+import heapq
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from app import canonical, indicators, memory
+
+SESSION = 0  # type code of session nodes (indicator types start at 1)
+DEFAULT_LIMIT = 100
+
+
+class CampaignGraph:
+    """Incremental union-find over session and indicator nodes."""
+
+    def __init__(self, store: Optional[memory.ThreatStore] = None, persist: bool = True):
+        self.store = store
+        self.persist = persist
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, int] = {}
+        self._indicators: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._types = array("B")
+        self._parent = array("q")
+        # root -> (indicator node ids, session node ids)
+        self._members: Dict[int, Tuple[List[int], List[int]]] = {}
+        # root -> smallest indicator value (the campaign id)
+        self._anchor: Dict[int, str] = {}
+        self._last_rowid = 0
+        # Links seen by observe() in this process; replayed rows are not counted
+        self.links = 0
+
+    def __len__(self) -> int:
+        """Number of nodes."""
+        return len(self._names)
+
+    # --- Union-find ---
+
+    def _find(self, node: int) -> int:
+        parent = self._parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def _add_node(self, name: str, type_code: int) -> int:
+        node = len(self._names)
+        self._names.append(name)
+        self._types.append(type_code)
+        self._parent.append(node)
+        if type_code == SESSION:
+            self._sessions[name] = node
+            self._members[node] = ([], [node])
+        else:
+            self._indicators[name] = node
+            self._members[node] = ([node], [])
+            self._anchor[node] = name
+        return node
+
+    def _union(self, a: int, b: int) -> bool:
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a == root_b:
+            return False
+        members_a, members_b = self._members[root_a], self._members[root_b]
+        if len(members_a[0]) + len(members_a[1]) < len(members_b[0]) + len(members_b[1]):
+            root_a, root_b = root_b, root_a
+            members_a, members_b = members_b, members_a
+        self._parent[root_b] = root_a
+        members_a[0].extend(members_b[0])
+        members_a[1].extend(members_b[1])
+        del self._members[root_b]
+        anchor_b = self._anchor.pop(root_b, None)
+        if anchor_b is not None:
+            anchor_a = self._anchor.get(root_a)
+            if anchor_a is None or anchor_b < anchor_a:
+                self._anchor[root_a] = anchor_b
+        return True
+
+    def _link(self, session_id: str, value: str, threat_type: str) -> bool:
+        """Links one session to one indicator. True if the graph changed shape."""
+        session = self._sessions.get(session_id)
+        indicator = self._indicators.get(value)
+        created = session is None or indicator is None
+        if session is None:
+            session = self._add_node(session_id, SESSION)
+        if indicator is None:
+            indicator = self._add_node(value, indicators.TYPE_CODES.get(threat_type, 0))
+        return self._union(session, indicator) or created
+
+    # --- Updates ---
+
+    def observe(self, session_id: str, intelligence: dict) -> Optional[str]:
+        """
+        Adds the indicators extracted from one scam message of a session.
+
+        Args:
+            session_id (str): The session the message belongs to.
+            intelligence (dict): Output of utils.extract_intelligence.
+
+        Returns:
+            Optional[str]: The session's campaign id, or None if the message
+                carried no indicators.
+        """
+        pairs = indicators.indicator_values(intelligence)
+        if not pairs:
+            return None
+        new_edges = []
+        with self._lock:
+            self.links += len(pairs)
+            for value, threat_type in pairs:
+                if self._link(session_id, value, threat_type):
+                    new_edges.append((value, threat_type))
+            campaign = self._anchor[self._find(self._sessions[session_id])]
+        if new_edges and self.persist:
+            store = self.store or memory.STORE
+            seen = memory._timestamp()
+            for value, threat_type in new_edges:
+                store.enqueue(memory.INSERT_CAMPAIGN_EDGE, (session_id, value, threat_type, seen))
+        return campaign
+
+    def load(self, store: Optional[memory.ThreatStore] = None) -> int:
+        """
+        Replays persisted links written since the last load (all of them on
+        the first call). Returns the number of rows read.
+        """
+        store = store or self.store or memory.STORE
+        cursor = store.connection().execute(memory.SELECT_CAMPAIGN_EDGES, (self._last_rowid,))
+        count = 0
+        while True:
+            rows = cursor.fetchmany(10000)
+            if not rows:
+                break
+            with self._lock:
+                for rowid, session_id, value, threat_type in rows:
+                    self._link(session_id, value, threat_type)
+                self._last_rowid = rows[-1][0]
+            count += len(rows)
+        return count
+
+    # --- Queries ---
+
+    def _node_for(self, key: str) -> Optional[int]:
+        """Node for a session id or an indicator in any spelling."""
+        for candidate in (key, key.strip().lower(), canonical.registrable_domain(key),
+                          canonical.phone(key), canonical.digits_only(key)):
+            node = self._indicators.get(candidate)
+            if node is not None:
+                return node
+        return self._sessions.get(key)
+
+    def _describe(self, root: int, limit: int) -> dict:
+        indicator_ids, session_ids = self._members[root]
+        names, types = self._names, self._types
+        return {
+            "campaign_id": self._anchor.get(root),
+            "indicator_count": len(indicator_ids),
+            "session_count": len(session_ids),
+            "indicators": [
+                {"value": names[n], "type": indicators.TYPE_NAMES.get(types[n], "UNKNOWN")}
+                for n in indicator_ids[:limit]
+            ],
+            "sessions": [names[n] for n in session_ids[:limit]],
+        }
+
+    def campaign(self, key: str, limit: int = DEFAULT_LIMIT) -> Optional[dict]:
+        """
+        The campaign containing an indicator, a session or a campaign id.
+
+        Args:
+            key (str): Indicator (any spelling), session id or campaign id.
+            limit (int): Maximum indicators and sessions to list.
+
+        Returns:
+            Optional[dict]: campaign_id, counts and up to `limit` indicators
+                and sessions, or None if the key is unknown.
+        """
+        with self._lock:
+            node = self._node_for(key)
+            if node is None:
+                return None
+            return self._describe(self._find(node), limit)
+
+    def campaign_id(self, key: str) -> Optional[str]:
+        """Just the campaign id for a key (see campaign())."""
+        with self._lock:
+            node = self._node_for(key)
+            return None if node is None else self._anchor.get(self._find(node))
+
+    def largest(self, count: int = 20, limit: int = 10) -> List[dict]:
+        """The `count` campaigns with the most indicators (one pass over roots)."""
+        with self._lock:
+            roots = heapq.nlargest(count, self._members, key=lambda r: len(self._members[r][0]))
+            return [self._describe(root, limit) for root in roots]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "nodes": len(self._names),
+                "sessions": len(self._sessions),
+                "indicators": len(self._indicators),
+                "campaigns": len(self._members),
+                "links_observed": self.links,
+            }
+
+
+GRAPH = CampaignGraph()
+
+
+def start_refresher(interval: float = indicators.REFRESH_SECONDS) -> threading.Thread:
+    """Pulls links persisted by other workers into GRAPH on a daemon thread."""
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                GRAPH.load()
+            except Exception as e:
+                print(f"Campaign Refresh Error: {e}")
+
+    thread = threading.Thread(target=loop, name="campaign-refresh", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,216 @@
+"""
+Canonical forms for threat indicators.
+
+One scam domain or phone number shows up in many spellings
+(`a.evil.com`, `EVIL.com:8080`, `+91 98765-43210`, `098765 43210`). Every
+indicator is reduced to one canonical value before it is stored or looked up:
+
+- domains: the registrable domain (public suffix + one label), found with a
+  label trie built from the bundled Public Suffix List
+- phones: E.164 (`+<country code><number>`); numbers without a country
+  code get DEFAULT_COUNTRY_CODE
+- emails and UPI IDs: lowercased
+- bank accounts: digits only
+"""
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SUFFIX_LIST_PATH = os.getenv("PUBLIC_SUFFIX_LIST", os.path.join(BASE_DIR, "public_suffix_list.dat"))
+DEFAULT_COUNTRY_CODE = os.getenv("DEFAULT_COUNTRY_CODE", "91")
+NATIONAL_DIGITS = 10
+
+NON_DIGIT = re.compile(r'\D')
+IPV4 = re.compile(r'^\d{1,3}(?:\.\d{1,3}){3}$')
+
+# Trie node markers (never valid DNS labels)
+RULE = ""
+EXCEPTION = "!"
+
+
+class SuffixTrie:
+    """
+    Public Suffix List rules as a trie of reversed labels.
+
+    `co.uk` is stored as root["uk"]["co"] with a RULE marker; wildcard rules
+    (`*.ck`) use a "*" child and exception rules (`!www.ck`) an EXCEPTION
+    marker. Rules are kept in their ASCII (punycode) form.
+    """
+
+    def __init__(self, rules: List[str] = ()):
+        self.root: Dict[str, dict] = {}
+        self.size = 0
+        for rule in rules:
+            self.add(rule)
+
+    def add(self, rule: str) -> None:
+        marker = RULE
+        if rule.startswith("!"):
+            marker, rule = EXCEPTION, rule[1:]
+        node = self.root
+        for label in reversed(_ascii_host(rule).split(".")):
+            node = node.setdefault(label, {})
+        node[marker] = True
+        self.size += 1
+
+    def suffix_length(self, labels: List[str]) -> int:
+        """
+        Number of trailing labels forming the public suffix.
+
+        Args:
+            labels (List[str]): Host labels, last label (TLD) first.
+
+        Returns:
+            int: Labels in the longest matching rule (1 if none matches).
+        """
+        node = self.root
+        length = 1
+        for depth, label in enumerate(labels, 1):
+            child = node.get(label)
+            if child is not None and EXCEPTION in child:
+                # "!city.kobe.jp": the suffix is the rule minus its first label
+                return depth - 1
+            wildcard = node.get("*")
+            if wildcard is not None and RULE in wildcard:
+                length = depth
+            if child is None:
+                break
+            if RULE in child:
+                length = depth
+            node = child
+        return length
+
+
+def load_suffix_list(path: str = SUFFIX_LIST_PATH) -> SuffixTrie:
+    """Parses a public_suffix_list.dat file (ICANN and private sections)."""
+    rules = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            rule = line.strip()
+            if rule and not rule.startswith("//"):
+                rules.append(rule.split()[0])
+    return SuffixTrie(rules)
+
+
+_SUFFIXES: Optional[SuffixTrie] = None
+
+
+def suffixes() -> SuffixTrie:
+    """The bundled suffix list, parsed on first use."""
+    global _SUFFIXES
+    if _SUFFIXES is None:
+        _SUFFIXES = load_suffix_list()
+    return _SUFFIXES
+
+
+def _ascii_host(host: str) -> str:
+    host = host.strip().rstrip(".").lower()
+    if host.isascii():
+        return host
+    try:
+        return host.encode("idna").decode("ascii")
+    except UnicodeError:
+        return host
+
+
+def host(url: str) -> str:
+    """
+    Lowercased ASCII host of a URL or bare hostname, without scheme,
+    credentials, port or trailing dot. Returns "" if there is none.
+    """
+    text = url.strip()
+    if "://" not in text:
+        text = "http://" + text
+    try:
+        hostname = urlsplit(text).hostname
+    except ValueError:
+        return ""
+    return _ascii_host(hostname) if hostname else ""
+
+
+@lru_cache(maxsize=65536)
+def _registrable(hostname: str) -> str:
+    if not hostname or ":" in hostname or IPV4.match(hostname):
+        return hostname
+    labels = hostname.split(".")[::-1]
+    length = suffixes().suffix_length(labels)
+    if len(labels) <= length:
+        # The host is itself a public suffix; keep it whole
+        return hostname
+    return ".".join(reversed(labels[:length + 1]))
+
+
+def registrable_domain(url: str) -> str:
+    """
+    The registrable domain of a URL or host: `https://A.b.Evil.co.uk:8080/x`
+    gives `evil.co.uk`. IP addresses are returned as-is.
+    """
+    return _registrable(host(url))
+
+
+def domain_candidates(url: str) -> List[str]:
+    """
+    The registrable domain of a URL's host, then each longer suffix up to
+    the full host (`x.a.evil.com` -> evil.com, a.evil.com, x.a.evil.com).
+
+    Looking every candidate up matches an indicator stored for the domain
+    or for any parent of the host.
+    """
+    full = host(url)
+    base = _registrable(full)
+    if not base:
+        return []
+    candidates = [base]
+    extra = full[:-len(base)].rstrip(".").split(".") if len(full) > len(base) else []
+    for label in reversed(extra):
+        candidates.append(f"{label}.{candidates[-1]}")
+    return candidates
+
+
+def phone(raw: str, country_code: str = DEFAULT_COUNTRY_CODE) -> str:
+    """
+    E.164 form of a phone number (`+919876543210`), or "" if it cannot be one.
+
+    Numbers written with `+` or `00` keep their country code; ten-digit
+    national numbers (optionally with a leading trunk 0) get country_code;
+    anything else is taken to include its country code already.
+    """
+    digits = NON_DIGIT.sub("", raw)
+    if raw.lstrip().startswith("+"):
+        pass
+    elif digits.startswith("00"):
+        digits = digits[2:]
+    elif len(digits) == NATIONAL_DIGITS:
+        digits = country_code + digits
+    elif len(digits) == NATIONAL_DIGITS + 1 and digits.startswith("0"):
+        digits = country_code + digits[1:]
+    if not 8 <= len(digits) <= 15 or digits.startswith("0"):
+        return ""
+    return "+" + digits
+
+
+def lowercase(raw: str) -> str:
+    return raw.strip().lower()
+
+
+def digits_only(raw: str) -> str:
+    return NON_DIGIT.sub("", raw)
+
+
+# extract_intelligence field -> canonicalizer
+CANONICALIZERS = {
+    "phishingLinks": registrable_domain,
+    "emails": lowercase,
+    "phoneNumbers": phone,
+    "upiIds": lowercase,
+    "bankAccounts": digits_only,
+}
+
+
+def canonicalize(field: str, raw: str) -> str:
+    """Canonical value of one extract_intelligence item ("" if unusable)."""
+    canonicalizer = CANONICALIZERS.get(field)
+    return canonicalizer(raw) if canonicalizer else raw
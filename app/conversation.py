@@ -0,0 +1,175 @@
+"""
+Per-session conversation memory for Arthur with token-budgeted prompts.
+
+Recent turns are kept verbatim up to RECENT_TOKEN_BUDGET; older turns are
+folded into a rolling summary capped at SUMMARY_TOKEN_BUDGET. Prompt size
+therefore stays flat no matter how long a session runs.
+"""
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app import memory, utils
+
+RECENT_TOKEN_BUDGET = int(os.getenv("CONVO_RECENT_TOKEN_BUDGET", "600"))
+SUMMARY_TOKEN_BUDGET = int(os.getenv("CONVO_SUMMARY_TOKEN_BUDGET", "200"))
+MESSAGE_TOKEN_LIMIT = int(os.getenv("CONVO_MESSAGE_TOKEN_LIMIT", "400"))
+GIST_CHARS = 90
+MAX_FACTS = 12
+
+SCAMMER = "user"
+ARTHUR = "assistant"
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+def clip(text: str, max_tokens: int) -> str:
+    """Trims text to roughly max_tokens, marking the cut."""
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rstrip() + " ..."
+
+
+def gist(text: str) -> str:
+    """First sentence of a turn, shortened for the summary."""
+    text = " ".join(text.split())
+    for stop in (". ", "? ", "! "):
+        cut = text.find(stop)
+        if 0 < cut < GIST_CHARS:
+            return text[:cut + 1]
+    return text if len(text) <= GIST_CHARS else text[:GIST_CHARS].rstrip() + "..."
+
+
+class ConversationHistory:
+    """
+    Compact history of one session.
+
+    turns holds (role, text, tokens) tuples for the verbatim window. When the
+    window exceeds its budget, the oldest turns move into gists (short lines)
+    and facts (indicators the scammer mentioned), which form the summary.
+    """
+
+    __slots__ = ("turns", "recent_tokens", "gists", "facts", "turn_count")
+
+    def __init__(self):
+        self.turns: Deque[Tuple[str, str, int]] = deque()
+        self.recent_tokens = 0
+        self.gists: Deque[str] = deque()
+        self.facts: Dict[str, None] = {}
+        self.turn_count = 0
+
+    def add(self, role: str, text: str) -> None:
+        """Appends a turn and compacts the oldest ones past the budget."""
+        text = clip(text, MESSAGE_TOKEN_LIMIT)
+        tokens = estimate_tokens(text)
+        self.turns.append((role, text, tokens))
+        self.recent_tokens += tokens
+        self.turn_count += 1
+        while self.recent_tokens > RECENT_TOKEN_BUDGET and len(self.turns) > 1:
+            self._collapse(*self.turns.popleft())
+
+    def _collapse(self, role: str, text: str, tokens: int) -> None:
+        self.recent_tokens -= tokens
+        speaker = "Caller" if role == SCAMMER else "You"
+        self.gists.append(f"{speaker}: {gist(text)}")
+
+        if role == SCAMMER:
+            intelligence = utils.extract_intelligence(text)
+            for field in ("phishingLinks", "phoneNumbers", "upiIds", "bankAccounts", "emails"):
+                for value in intelligence[field]:
+                    self.facts[value] = None
+            while len(self.facts) > MAX_FACTS:
+                self.facts.pop(next(iter(self.facts)))
+
+        # Keep the rendered summary inside its budget by dropping old gists
+        while self.gists and estimate_tokens(self.summary()) > SUMMARY_TOKEN_BUDGET:
+            self.gists.popleft()
+
+    def to_state(self) -> dict:
+        """JSON-serializable snapshot, so sessions can live outside this process."""
+        return {
+            "turns": [list(turn) for turn in self.turns],
+            "gists": list(self.gists),
+            "facts": list(self.facts),
+            "turn_count": self.turn_count,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "ConversationHistory":
+        history = cls()
+        history.turns.extend(tuple(turn) for turn in state.get("turns", []))
+        history.recent_tokens = sum(turn[2] for turn in history.turns)
+        history.gists.extend(state.get("gists", []))
+        history.facts = dict.fromkeys(state.get("facts", []))
+        history.turn_count = state.get("turn_count", len(history.turns))
+        return history
+
+    def summary(self) -> str:
+        """Rolling summary of the collapsed turns ('' if nothing collapsed)."""
+        if not self.gists and not self.facts:
+            return ""
+        parts = ["Earlier in this conversation (summary):"]
+        if self.facts:
+            parts.append("Details the caller gave: " + ", ".join(self.facts) + ".")
+        parts.extend(self.gists)
+        return "\n".join(parts)
+
+    def messages(self) -> List[dict]:
+        """Chat messages for the summary and verbatim window."""
+        out = []
+        summary = self.summary()
+        if summary:
+            out.append({"role": "system", "content": summary})
+        out.extend({"role": role, "content": text} for role, text, _ in self.turns)
+        return out
+
+
+def get_history(session_id: str) -> Optional[ConversationHistory]:
+    """Returns the session's history, or None for unknown sessions."""
+    session = memory.get_session(session_id)
+    if session and session.get("history"):
+        return ConversationHistory.from_state(session["history"])
+    return None
+
+
+def build_prompt(system_prompt: str, history: Optional[ConversationHistory],
+                 message: str) -> List[dict]:
+    """
+    Builds the chat prompt: persona, summary, recent turns, new message.
+
+    Args:
+        system_prompt (str): The persona prompt.
+        history (Optional[ConversationHistory]): The session history, if any.
+        message (str): The newest scammer message.
+
+    Returns:
+        List[dict]: Messages for the chat completions API.
+    """
+    messages = [{"role": "system", "content": system_prompt}]
+    if history is not None:
+        messages.extend(history.messages())
+    messages.append({"role": SCAMMER, "content": clip(message, MESSAGE_TOKEN_LIMIT)})
+    return messages
+
+
+def record_exchange(session_id: str, message: str, reply: str, threat_source: str) -> None:
+    """
+    Stores one scammer message and Arthur's reply in the session store,
+    creating the session on first engagement.
+
+    The history is saved as plain state (not a live object) so the session
+    can be shared by several workers through memory.SESSION_BACKEND=sqlite.
+    """
+    session = memory.get_session(session_id)
+    if session is None:
+        session = {"created_at": time.time(), "threat_source": threat_source}
+    history = ConversationHistory.from_state(session.get("history") or {})
+    history.add(SCAMMER, message)
+    history.add(ARTHUR, reply)
+    session["history"] = history.to_state()
+    memory.create_session(session_id, session)
@@ -0,0 +1,179 @@
+"""
+Live dashboard log: fixed-capacity ring buffer with sequence numbers.
+
+Each entry is stamped with a monotonic `seq` and serialized to JSON once,
+when it is added. Pollers ask for `since=<seq>` and get only newer entries;
+streaming clients wait on the buffer and are woken when an entry arrives.
+
+With SESSION_BACKEND=sqlite the log lives in the shared database instead,
+so every worker serves the same entries and sequence numbers.
+"""
+import asyncio
+import json
+import os
+import time
+from typing import List, Optional, Tuple
+
+from app import memory
+
+DASHBOARD_CAPACITY = int(os.getenv("DASHBOARD_CAPACITY", "50"))
+HEARTBEAT_SECONDS = 15.0
+# How often a shared-log stream checks the database for new entries
+POLL_SECONDS = float(os.getenv("DASHBOARD_POLL_SECONDS", "0.5"))
+PRUNE_EVERY = 32
+
+
+class RingLog:
+    """Fixed-capacity log; the oldest entry is overwritten when full."""
+
+    def __init__(self, capacity: int = DASHBOARD_CAPACITY):
+        self.capacity = max(1, capacity)
+        self._slots: List[Optional[Tuple[int, str]]] = [None] * self.capacity
+        self.last_seq = 0
+        self._arrived = asyncio.Event()
+
+    def append(self, entry: dict) -> int:
+        """Stamps, serializes and stores an entry. Returns its seq."""
+        self.last_seq += 1
+        seq = self.last_seq
+        entry = dict(entry, seq=seq)
+        self._slots[seq % self.capacity] = (seq, json.dumps(entry))
+        self._wake()
+        return seq
+
+    async def add(self, entry: dict) -> int:
+        """append() for async callers."""
+        return self.append(entry)
+
+    def _wake(self) -> None:
+        # Wake every waiting stream, then arm a fresh event for the next entry
+        arrived, self._arrived = self._arrived, asyncio.Event()
+        arrived.set()
+
+    def since(self, seq: int = 0) -> List[Tuple[int, str]]:
+        """(seq, json) pairs newer than seq, oldest first."""
+        first = max(seq + 1, self.last_seq - self.capacity + 1, 1)
+        out = []
+        for s in range(first, self.last_seq + 1):
+            slot = self._slots[s % self.capacity]
+            if slot is not None and slot[0] == s:
+                out.append(slot)
+        return out
+
+    async def entries(self, seq: int = 0) -> List[Tuple[int, str]]:
+        """since() for async callers."""
+        return self.since(seq)
+
+    def render(self, seq: int = 0) -> str:
+        """JSON array of entries newer than seq, newest first (pre-serialized)."""
+        return "[" + ",".join(body for _, body in reversed(self.since(seq))) + "]"
+
+    async def wait(self, seq: int, timeout: float) -> bool:
+        """Waits until an entry newer than seq exists. False on timeout."""
+        if self.last_seq > seq:
+            return True
+        try:
+            await asyncio.wait_for(self._arrived.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def stream(self, seq: int = 0):
+        """
+        Server-Sent Events for every entry after seq, forever.
+
+        Each frame carries the entry's seq as its SSE id, so a reconnecting
+        client resumes with Last-Event-ID. Comments are sent as heartbeats.
+        """
+        while True:
+            if not await self.wait(seq, HEARTBEAT_SECONDS):
+                yield ": keep-alive\n\n"
+                continue
+            for entry_seq, body in await self.entries(seq):
+                yield f"id: {entry_seq}\nevent: log\ndata: {body}\n\n"
+                seq = entry_seq
+
+
+class SharedRingLog(RingLog):
+    """
+    RingLog backed by the dashboard_log table of the shared database.
+
+    The table's autoincrement key is the seq, so it is global across
+    workers. Rows beyond `capacity` are pruned every few appends. The async
+    methods (add, entries, wait) run their queries in a worker thread, so
+    streams and handlers never block the event loop on SQLite.
+    """
+
+    def __init__(self, store: memory.ThreatStore, capacity: int = DASHBOARD_CAPACITY):
+        self.capacity = max(1, capacity)
+        self.store = store
+        self._appends = 0
+        self._arrived = asyncio.Event()
+
+    @property
+    def last_seq(self) -> int:
+        return self._max_seq()
+
+    def _max_seq(self) -> int:
+        row = self.store.connection().execute("SELECT MAX(seq) FROM dashboard_log").fetchone()
+        return row[0] or 0
+
+    def append(self, entry: dict) -> int:
+        seq = self._insert(entry)
+        self._wake()
+        return seq
+
+    async def add(self, entry: dict) -> int:
+        seq = await asyncio.to_thread(self._insert, entry)
+        self._wake()
+        return seq
+
+    def _insert(self, entry: dict) -> int:
+        conn = self.store.connection()
+        # The body embeds its own seq, so insert and fill it in one transaction
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            seq = conn.execute("INSERT INTO dashboard_log (body) VALUES ('')").lastrowid
+            conn.execute("UPDATE dashboard_log SET body = ? WHERE seq = ?",
+                         (json.dumps(dict(entry, seq=seq)), seq))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._appends += 1
+        if self._appends % PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM dashboard_log WHERE seq <= ?", (seq - self.capacity,))
+        return seq
+
+    def since(self, seq: int = 0) -> List[Tuple[int, str]]:
+        rows = self.store.connection().execute(
+            "SELECT seq, body FROM dashboard_log WHERE seq > ? ORDER BY seq DESC LIMIT ?",
+            (seq, self.capacity),
+        ).fetchall()
+        return rows[::-1]
+
+    async def entries(self, seq: int = 0) -> List[Tuple[int, str]]:
+        return await asyncio.to_thread(self.since, seq)
+
+    async def wait(self, seq: int, timeout: float) -> bool:
+        """Polls the table (entries may come from other workers)."""
+        deadline = time.monotonic() + timeout
+        while await asyncio.to_thread(self._max_seq) <= seq:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self._arrived.wait(), min(POLL_SECONDS, remaining))
+            except asyncio.TimeoutError:
+                pass
+        return True
+
+
+def load_log() -> RingLog:
+    """Shared log when sessions are shared between workers, else in-process."""
+    if memory.SESSION_BACKEND == "sqlite":
+        return SharedRingLog(memory.STORE)
+    return RingLog()
+
+
+DASHBOARD_LOGS = load_log()
@@ -0,0 +1,462 @@
+"""
+In-memory index of known threat indicators with a Bloom filter front.
+
+Every indicator in the threat database is held in-process as a 64-bit
+fingerprint. A Bloom filter answers "definitely unknown" for clean traffic
+without touching the sorted fingerprint array or SQLite.
+
+With INDICATOR_SNAPSHOT_PATH set, the sorted array and Bloom filter come
+from an immutable snapshot file (app/snapshot.py) that every worker maps
+read-only instead of scanning SQLite, and only the small delta of newer
+writes (and tombstones of archived values) is private to each worker.
+One worker re-exports the snapshot every INDICATOR_SNAPSHOT_SECONDS; the
+others swap to the new file at their next refresh.
+"""
+import hashlib
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app import canonical, memory, snapshot
+
+# extract_intelligence field -> threat type stored in threat_cache
+INDICATOR_TYPES = {
+    "phishingLinks": "SCAM_URL",
+    "emails": "SCAM_EMAIL",
+    "phoneNumbers": "SCAM_PHONE",
+    "upiIds": "SCAM_UPI",
+    "bankAccounts": "SCAM_BANK",
+}
+TYPE_CODES = {name: code for code, name in enumerate(sorted(set(INDICATOR_TYPES.values())), 1)}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+
+BLOOM_ERROR_RATE = 0.01
+MIN_CAPACITY = 100_000
+DELTA_MERGE_SIZE = 50_000
+# Multi-worker deployments: how often to pull indicators other workers found
+REFRESH_SECONDS = float(os.getenv("INDICATOR_REFRESH_SECONDS", "2"))
+# last_seen has one-second resolution and writes are batched; overlap a bit
+REFRESH_OVERLAP_SECONDS = 5
+# Shared read-only snapshot of the index ("" keeps each worker loading from SQLite)
+SNAPSHOT_PATH = os.getenv("INDICATOR_SNAPSHOT_PATH", "")
+SNAPSHOT_SECONDS = float(os.getenv("INDICATOR_SNAPSHOT_SECONDS", "300"))
+
+
+def fingerprint(value: str) -> int:
+    """64-bit fingerprint of an indicator value."""
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "little")
+
+
+def indicator_values(intelligence: dict) -> List[Tuple[str, str]]:
+    """
+    Flattens extract_intelligence output into canonical (value, threat_type)
+    pairs: URLs become their registrable domain, phones E.164, and so on
+    (see app.canonical). Spellings of one indicator collapse into one pair.
+    """
+    pairs = {}
+    for field, threat_type in INDICATOR_TYPES.items():
+        for item in intelligence.get(field, []):
+            value = canonical.canonicalize(field, item)
+            if value:
+                pairs[value] = threat_type
+    return list(pairs.items())
+
+
+class BloomFilter:
+    """Bit-array Bloom filter keyed by 64-bit fingerprints (double hashing)."""
+
+    def __init__(self, capacity: int, error_rate: float = BLOOM_ERROR_RATE):
+        capacity = max(1, capacity)
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def add(self, fp: int) -> None:
+        bits, m = self.bits, self.num_bits
+        pos, step = fp & 0xFFFFFFFF, (fp >> 32) | 1
+        for _ in range(self.num_hashes):
+            p = pos % m
+            bits[p >> 3] |= 1 << (p & 7)
+            pos += step
+
+    def __contains__(self, fp: int) -> bool:
+        bits, m = self.bits, self.num_bits
+        pos, step = fp & 0xFFFFFFFF, (fp >> 32) | 1
+        for _ in range(self.num_hashes):
+            p = pos % m
+            if not bits[p >> 3] & (1 << (p & 7)):
+                return False
+            pos += step
+        return True
+
+    @classmethod
+    def from_bits(cls, bits, num_bits: int, num_hashes: int) -> "BloomFilter":
+        """A filter over existing bits (e.g. a read-only snapshot mapping)."""
+        bloom = cls.__new__(cls)
+        bloom.num_bits = num_bits
+        bloom.num_hashes = num_hashes
+        bloom.bits = bits
+        return bloom
+
+    def nbytes(self) -> int:
+        return len(self.bits)
+
+
+def sorted_arrays(items: Iterable[Tuple[str, str]]) -> Tuple[array, array]:
+    """(sorted fingerprints, type codes) for (value, threat_type) pairs."""
+    merged = {fingerprint(value): TYPE_CODES.get(t, 0) for value, t in items}
+    ordered = sorted(merged)
+    return array("Q", ordered), array("B", (merged[fp] for fp in ordered))
+
+
+class IndicatorIndex:
+    """
+    Known-indicator set: Bloom filter -> sorted fingerprint array + small delta.
+
+    New indicators land in the delta dict and are merged into the sorted
+    arrays once it grows past DELTA_MERGE_SIZE. The Bloom filter is rebuilt
+    at double capacity when it fills up.
+
+    On a snapshot the sorted arrays and Bloom filter are read-only: the delta
+    is never merged (the next snapshot absorbs it) and removed values are
+    hidden by tombstones instead of being cut out of the array.
+    """
+
+    def __init__(self, capacity: int = MIN_CAPACITY):
+        self._lock = threading.Lock()
+        self._refreshed_at: Optional[datetime] = None
+        self._reset(array("Q"), array("B"), capacity)
+
+    def _reset(self, fps: array, codes: array, capacity: int) -> None:
+        bloom = BloomFilter(max(capacity, MIN_CAPACITY, 2 * len(fps)))
+        for fp in fps:
+            bloom.add(fp)
+        self.bloom = bloom
+        self.capacity = max(capacity, MIN_CAPACITY, 2 * len(fps))
+        # (sorted fingerprints, type codes), swapped as one reference
+        self.base: Tuple[array, array] = (fps, codes)
+        self.delta: Dict[int, int] = {}
+        # Snapshot mode: the mapped file, and removed fingerprint -> time removed
+        self.snapshot: Optional[snapshot.Snapshot] = None
+        self.tombstones: Dict[int, float] = {}
+
+    def __len__(self) -> int:
+        return len(self.base[0]) + len(self.delta) - len(self.tombstones)
+
+    def _base_code(self, fp: int) -> Optional[int]:
+        fps, codes = self.base
+        i = bisect_left(fps, fp)
+        if i < len(fps) and fps[i] == fp:
+            return codes[i]
+        return None
+
+    # --- Building ---
+
+    def build(self, items: Iterable[Tuple[str, str]]) -> None:
+        """Replaces the index contents with (value, threat_type) pairs."""
+        fps, codes = sorted_arrays(items)
+        with self._lock:
+            self._reset(fps, codes, 2 * len(fps))
+
+    def attach(self, snap: snapshot.Snapshot) -> None:
+        """
+        Switches the read-only half of the index to a snapshot. Delta entries
+        and tombstones the snapshot already reflects are dropped.
+        """
+        cutoff = snap.created_at - REFRESH_OVERLAP_SECONDS
+        with self._lock:
+            # Lookups read delta, then bloom, then base: publish in reverse
+            self.bloom = BloomFilter.from_bits(snap.bloom_bits, snap.num_bits, snap.num_hashes)
+            self.base = (snap.fps, snap.codes)
+            self.capacity = len(snap)
+            self.delta = {fp: code for fp, code in self.delta.items() if self._base_code(fp) != code}
+            self.tombstones = {fp: at for fp, at in self.tombstones.items()
+                               if at >= cutoff and self._base_code(fp) is not None}
+            self.snapshot = snap
+
+    def swap_snapshot(self, path: Optional[str] = None) -> bool:
+        """Attaches the snapshot at path (default: the current one's) if it was replaced."""
+        if self.snapshot is None:
+            return False
+        path = path or self.snapshot.path
+        if snapshot.identity(path) in (None, self.snapshot.identity):
+            return False
+        self.attach(snapshot.Snapshot(path))
+        return True
+
+    def load(self, store: Optional[memory.ThreatStore] = None, snapshot_path: str = SNAPSHOT_PATH) -> int:
+        """
+        Loads every indicator from the threat database. Returns the count.
+
+        With a snapshot path, maps the snapshot instead (exporting it first if
+        it is missing or older than SNAPSHOT_SECONDS) and reads only the rows
+        written since it was taken.
+        """
+        store = store or memory.STORE
+        store.flush()
+        if snapshot_path:
+            try:
+                snap = open_snapshot(store, snapshot_path)
+            except (OSError, snapshot.SnapshotError) as e:
+                print(f"Indicator Snapshot Error: {e}; loading from the database")
+            else:
+                self.attach(snap)
+                self._refreshed_at = datetime.fromtimestamp(snap.created_at, timezone.utc)
+                self.refresh(store)
+                print(f"Indicator index mapped: {len(self)} entries "
+                      f"(snapshot {snap.age():.0f}s old, {len(self.delta)} newer).")
+                return len(self)
+        started = datetime.now(timezone.utc)
+        cursor = store.connection().execute(memory.SELECT_LIVE_THREATS, (started.timestamp(),))
+        self.build(cursor)
+        self._refreshed_at = started
+        print(f"Indicator index loaded: {len(self)} entries.")
+        return len(self)
+
+    def refresh(self, store: Optional[memory.ThreatStore] = None) -> int:
+        """
+        Pulls indicators written, and drops those archived, since the last
+        load/refresh, e.g. by other workers sharing the database. Returns the
+        number of rows read.
+        """
+        store = store or memory.STORE
+        self.swap_snapshot()
+        started = datetime.now(timezone.utc)
+        since = (self._refreshed_at or datetime.fromtimestamp(0, timezone.utc))
+        since = (since - timedelta(seconds=REFRESH_OVERLAP_SECONDS)).strftime("%Y-%m-%d %H:%M:%S")
+        archived = store.archived_since(since)
+        rows = store.connection().execute(
+            "SELECT value, type FROM threat_cache WHERE last_seen >= ?", (since,)
+        ).fetchall()
+        # Discard first: a value archived and then seen again is re-added
+        self.discard(archived)
+        for value, threat_type in rows:
+            self.add(value, threat_type)
+        self._refreshed_at = started
+        return len(rows)
+
+    def add(self, value: str, threat_type: str) -> None:
+        """Adds one indicator (write-through path)."""
+        fp = fingerprint(value)
+        code = TYPE_CODES.get(threat_type, 0)
+        with self._lock:
+            if self.snapshot is not None:
+                self.tombstones.pop(fp, None)
+                if self._base_code(fp) == code:
+                    self.delta.pop(fp, None)
+                else:
+                    self.delta[fp] = code
+                return
+            if len(self) >= self.capacity:
+                self._merge(grow=True)
+            self.bloom.add(fp)
+            self.delta[fp] = code
+            if len(self.delta) >= DELTA_MERGE_SIZE:
+                self._merge()
+
+    def discard(self, values: Iterable[str]) -> int:
+        """
+        Removes indicators (e.g. expired by the compactor). Returns the count.
+
+        Their Bloom filter bits stay set until the next rebuild, which only
+        costs a fingerprint lookup for those values.
+        """
+        fps = {fingerprint(value) for value in values}
+        if not fps:
+            return 0
+        with self._lock:
+            removed = sum(1 for fp in fps if self.delta.pop(fp, None) is not None)
+            if self.snapshot is not None:
+                now = time.time()
+                for fp in fps:
+                    if fp not in self.tombstones and self._base_code(fp) is not None:
+                        self.tombstones[fp] = now
+                        removed += 1
+                return removed
+            base_fps, base_codes = self.base
+            kept = [(fp, code) for fp, code in zip(base_fps, base_codes) if fp not in fps]
+            if len(kept) < len(base_fps):
+                removed += len(base_fps) - len(kept)
+                self.base = (array("Q", (fp for fp, _ in kept)), array("B", (code for _, code in kept)))
+        return removed
+
+    def _merge(self, grow: bool = False) -> None:
+        merged = dict(zip(*self.base))
+        merged.update(self.delta)
+        ordered = sorted(merged)
+        fps = array("Q", ordered)
+        codes = array("B", (merged[fp] for fp in ordered))
+        if grow:
+            self._reset(fps, codes, 2 * self.capacity)
+        else:
+            self.base = (fps, codes)
+            self.delta = {}
+
+    # --- Lookups ---
+
+    def get(self, value: str) -> Optional[str]:
+        """Returns the threat type of a known indicator, else None."""
+        fp = fingerprint(value)
+        # The delta comes first: on a snapshot its entries are not in the Bloom filter
+        code = self.delta.get(fp)
+        if code is None:
+            if fp not in self.bloom:
+                return None
+            code = self._base_code(fp)
+            if code is None or fp in self.tombstones:
+                return None
+        return TYPE_NAMES.get(code, "UNKNOWN")
+
+    def match(self, intelligence: dict) -> List[Dict[str, str]]:
+        """
+        Looks up every indicator from extract_intelligence in one call.
+
+        A URL matches if its registrable domain or any parent of its host is
+        known, so one stored domain covers all its subdomains; the walk over
+        the host's labels is a handful of Bloom-filtered probes.
+
+        Args:
+            intelligence (dict): Output of utils.extract_intelligence.
+
+        Returns:
+            List[Dict[str, str]]: {"value", "type"} for each known indicator.
+        """
+        hits = {}
+        for field in INDICATOR_TYPES:
+            for item in intelligence.get(field, []):
+                if field == "phishingLinks":
+                    candidates = canonical.domain_candidates(item)
+                else:
+                    candidates = (canonical.canonicalize(field, item),)
+                for value in candidates:
+                    known = self.get(value) if value else None
+                    if known:
+                        hits[value] = known
+                        break
+        return [{"value": value, "type": known} for value, known in hits.items()]
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the index structures (mapped snapshot included)."""
+        fps, codes = self.base
+        delta = (len(self.delta) + len(self.tombstones)) * 100
+        return self.bloom.nbytes() + fps.itemsize * len(fps) + len(codes) + delta
+
+
+INDEX = IndicatorIndex()
+
+
+def start_refresher(interval: float = REFRESH_SECONDS) -> threading.Thread:
+    """Keeps INDEX in step with the shared database on a daemon thread."""
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                INDEX.refresh()
+            except Exception as e:
+                print(f"Indicator Refresh Error: {e}")
+
+    thread = threading.Thread(target=loop, name="indicator-refresh", daemon=True)
+    thread.start()
+    return thread
+
+
+def export_snapshot(store: Optional[memory.ThreatStore] = None, path: str = SNAPSHOT_PATH) -> dict:
+    """
+    Writes every live indicator to a snapshot file (atomically replacing
+    the old one). Callers should hold snapshot.export_lock(path).
+
+    Returns:
+        dict: entries, bytes and seconds taken.
+    """
+    store = store or memory.STORE
+    store.flush()
+    start = time.perf_counter()
+    created_at = time.time()
+    fps, codes = sorted_arrays(store.connection().execute(memory.SELECT_LIVE_THREATS, (created_at,)))
+    bloom = BloomFilter(max(MIN_CAPACITY, 2 * len(fps)))
+    for fp in fps:
+        bloom.add(fp)
+    size = snapshot.write(path, fps, codes, bloom.bits, bloom.num_bits, bloom.num_hashes, created_at)
+    return {"entries": len(fps), "bytes": size, "seconds": time.perf_counter() - start}
+
+
+def open_snapshot(store: Optional[memory.ThreatStore] = None, path: str = SNAPSHOT_PATH,
+                  max_age: float = SNAPSHOT_SECONDS) -> snapshot.Snapshot:
+    """
+    Maps the snapshot at path, exporting it first if it is missing or older
+    than max_age. Workers starting together wait for the first one's export.
+    """
+    with snapshot.export_lock(path):
+        if time.time() - snapshot.created_at(path) > max_age:
+            stats = export_snapshot(store, path)
+            print(f"Indicator snapshot exported: {stats['entries']} entries, "
+                  f"{stats['bytes'] / 2**20:.1f} MB in {stats['seconds']:.2f}s.")
+        return snapshot.Snapshot(path)
+
+
+def start_snapshotter(interval: float = SNAPSHOT_SECONDS, path: str = SNAPSHOT_PATH) -> threading.Thread:
+    """
+    Re-exports the snapshot once it is `interval` seconds old and attaches
+    INDEX to the newest one, on a daemon thread. With several workers, the
+    first to find it stale exports; the others skip and swap at refresh.
+    """
+    def loop():
+        while True:
+            time.sleep(max(1.0, interval / 10))
+            try:
+                with snapshot.export_lock(path, blocking=False) as locked:
+                    if locked and time.time() - snapshot.created_at(path) > interval:
+                        export_snapshot(path=path)
+                INDEX.swap_snapshot(path)
+            except Exception as e:
+                print(f"Indicator Snapshot Error: {e}")
+
+    thread = threading.Thread(target=loop, name="indicator-snapshot", daemon=True)
+    thread.start()
+    return thread
+
+
+def compact(store: Optional[memory.ThreatStore] = None, now: Optional[float] = None) -> dict:
+    """Archives expired indicators (ThreatStore.compact) and drops them from INDEX."""
+    store = store or memory.STORE
+    stats = store.compact(now)
+    INDEX.discard(stats["expired"])
+    return stats
+
+
+def start_compactor(interval: float = memory.COMPACT_SECONDS) -> threading.Thread:
+    """Runs compact() every `interval` seconds on a daemon thread."""
+    def loop():
+        while True:
+            try:
+                stats = compact()
+                if stats["expired"] or stats["pruned"]:
+                    print(
+                        f"Threat Compaction: {len(stats['expired'])} expired, {stats['pruned']} "
+                        f"archive rows pruned, longest lock {stats['max_lock_ms']:.1f} ms"
+                    )
+            except Exception as e:
+                print(f"Threat Compaction Error: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name="threat-compactor", daemon=True)
+    thread.start()
+    return thread
+
+
+def record_intelligence(intelligence: dict, confidence: float) -> None:
+    """
+    Saves every extracted indicator to the threat database and the index.
+
+    Args:
+        intelligence (dict): Output of utils.extract_intelligence.
+        confidence (float): The confidence score of the detection.
+    """
+    for value, threat_type in indicator_values(intelligence):
+        memory.update_cache(value, threat_type, confidence)
+        INDEX.add(value, threat_type)
@@ -0,0 +1,185 @@
+"""
+Durable append-only engagement journal.
+
+Every engaged exchange is appended as one JSON line to a segment file in
+data/journal/. Segments rotate by size and are named after the timestamp of
+their first record, so readers can skip whole files outside a time range.
+The request path only enqueues; a background thread writes in batches and
+fsyncs at most every JOURNAL_FSYNC_MS.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from typing import Iterator, List, Optional
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+JOURNAL_DIR = os.getenv("JOURNAL_DIR", os.path.join(BASE_DIR, "../data/journal"))
+SEGMENT_BYTES = int(os.getenv("JOURNAL_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+FSYNC_MS = float(os.getenv("JOURNAL_FSYNC_MS", "200"))
+MAX_BATCH = 1000
+SEGMENT_SUFFIX = ".jsonl"
+
+
+def segment_start(name: str) -> float:
+    """Timestamp (seconds) of the first record in a segment, from its name."""
+    return int(name.split("-")[0]) / 1000.0
+
+
+def list_segments(directory: str = JOURNAL_DIR) -> List[str]:
+    """Segment file names, oldest first."""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(n for n in os.listdir(directory) if n.endswith(SEGMENT_SUFFIX))
+
+
+class Journal:
+    """Batched, segment-rotated JSONL writer running on its own thread."""
+
+    def __init__(self, directory: str = JOURNAL_DIR, segment_bytes: int = SEGMENT_BYTES,
+                 fsync_ms: float = FSYNC_MS):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_ms / 1000.0
+        self.appended = 0
+        self.written = 0
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._file = None
+        self._segment_size = 0
+        self._segment_count = 0
+        self._last_fsync = 0.0
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    # --- Request path ---
+
+    def append(self, record: dict) -> None:
+        """Queues a record (stamped with 'ts' if missing). Never blocks on disk."""
+        if "ts" not in record:
+            record = dict(record, ts=time.time())
+        self.appended += 1
+        self._ensure_writer()
+        self._queue.put(record)
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Blocks until everything queued so far is written and fsynced."""
+        if self._writer is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self) -> None:
+        """Flushes and closes the current segment."""
+        self.flush()
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    # --- Writer thread ---
+
+    def _ensure_writer(self) -> None:
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    os.makedirs(self.directory, exist_ok=True)
+                    self._writer = threading.Thread(
+                        target=self._write_loop, name="journal-writer", daemon=True
+                    )
+                    self._writer.start()
+
+    def _open_segment(self, first_ts: float) -> None:
+        if self._file:
+            self._sync()
+            self._file.close()
+        self._segment_count += 1
+        name = f"{int(first_ts * 1000):015d}-{os.getpid()}-{self._segment_count:06d}{SEGMENT_SUFFIX}"
+        self._file = open(os.path.join(self.directory, name), "ab")
+        self._segment_size = 0
+
+    def _sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_fsync = time.monotonic()
+
+    def _write_loop(self) -> None:
+        while True:
+            items = [self._queue.get()]
+            while len(items) < MAX_BATCH:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            records = [item for item in items if not isinstance(item, threading.Event)]
+            waiters = [item for item in items if isinstance(item, threading.Event)]
+            try:
+                with self._lock:
+                    self._write(records, force_sync=bool(waiters))
+            except OSError as e:
+                print(f"Journal Write Error: {e}")
+            for waiter in waiters:
+                waiter.set()
+
+    def _write(self, records: List[dict], force_sync: bool) -> None:
+        for record in records:
+            line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+            if self._file is None or self._segment_size + len(line) > self.segment_bytes:
+                self._open_segment(record["ts"])
+            self._file.write(line)
+            self._segment_size += len(line)
+        self.written += len(records)
+
+        if self._file and (force_sync or time.monotonic() - self._last_fsync >= self.fsync_interval):
+            self._sync()
+
+
+def read(start: Optional[float] = None, end: Optional[float] = None,
+         directory: str = JOURNAL_DIR) -> Iterator[dict]:
+    """
+    Streams journal records segment by segment, optionally within [start, end).
+
+    Segments whose time span cannot overlap the range are skipped without
+    being opened (a segment ends where the same writer's next one starts).
+    Torn lines (e.g. after a crash) are skipped.
+
+    Args:
+        start (Optional[float]): Earliest 'ts' (epoch seconds) to return.
+        end (Optional[float]): Return only records with 'ts' before this.
+        directory (str): Journal folder.
+
+    Yields:
+        dict: One journal record.
+    """
+    names = list_segments(directory)
+    next_start = {}
+    latest_by_writer = {}
+    for name in reversed(names):
+        writer = name.split("-")[1]
+        next_start[name] = latest_by_writer.get(writer)
+        latest_by_writer[writer] = segment_start(name)
+
+    for name in names:
+        if end is not None and segment_start(name) >= end:
+            break
+        following = next_start[name]
+        if start is not None and following is not None and following < start:
+            continue
+        with open(os.path.join(directory, name), "rb") as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                ts = record.get("ts", 0)
+                if start is not None and ts < start:
+                    continue
+                if end is not None and ts >= end:
+                    continue
+                yield record
+
+
+JOURNAL = Journal()
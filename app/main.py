@@ -2,21 +2,28 @@
 Main Entry point for the Agentic Honeypot API.
 """
 import os
+import json
+import math
+import time
 from datetime import datetime
+from typing import Optional, Tuple
 
-from fastapi import FastAPI, HTTPException, Depends, Security
+from fastapi import FastAPI, HTTPException, Depends, Security, Header, Request
 from fastapi.security.api_key import APIKeyHeader
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
 from dotenv import load_dotenv
 
 # Import custom modules
-from app import utils, memory, security, agent
+from app import utils, memory, security, agent, indicators, conversation, cache, pipeline, dashboard, journal, bulk, metrics, campaigns, neardup, admission, offline
 
 # Load environment variables
 load_dotenv()
 API_SECRET_KEY = os.getenv("API_SECRET_KEY")
+# Set GUARD_EAGER_LOAD=1 to block startup until the model is loaded
+EAGER_LOAD = os.getenv("GUARD_EAGER_LOAD", "0") == "1"
 
 app = FastAPI(title="Agentic Honeypot API")
 
@@ -29,17 +36,117 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global Logs
-DASHBOARD_LOGS = []
+# Global Logs (ring buffer, see app/dashboard.py)
+DASHBOARD_LOGS = dashboard.DASHBOARD_LOGS
+
+# Metrics (see app/metrics.py). Children are looked up once, not per request.
+CHAT_SECONDS = metrics.REQUEST_SECONDS.labels("chat")
+EXTRACT_SECONDS = metrics.CHAT_STAGE_SECONDS.labels("extract")
+DETECT_SECONDS = metrics.CHAT_STAGE_SECONDS.labels("detect")
+REPLY_SECONDS = metrics.CHAT_STAGE_SECONDS.labels("reply")
+RECORD_SECONDS = metrics.CHAT_STAGE_SECONDS.labels("record")
+LOG_SECONDS = metrics.CHAT_STAGE_SECONDS.labels("log")
+
+
+def cache_stats():
+    return {**cache.stats(), "neardup": neardup.INDEX.stats()}
+
+
+def cache_lookups():
+    out = {}
+    for name, stats in cache_stats().items():
+        out[(name, "hit")] = stats["hits"]
+        out[(name, "miss")] = stats["misses"]
+    return out
+
+
+def pipeline_outcomes():
+    out = {}
+    for name, stats in pipeline.PIPELINE.stats()["stages"].items():
+        out[(name, "scam")] = stats["scam_exits"]
+        out[(name, "clean")] = stats["clean_exits"]
+        out[(name, "abstain")] = stats["abstained"]
+        out[(name, "pass")] = stats["runs"] - stats["scam_exits"] - stats["clean_exits"] - stats["abstained"]
+    return out
+
+
+def pipeline_seconds():
+    return {(stage.name,): stage.total_seconds for stage in pipeline.PIPELINE.stages}
+
+
+def queue_depths():
+    return {
+        ("model",): security.ENGINE.queue_depth() if security.ENGINE else 0,
+        ("llm",): agent.llm_queue_depth(),
+        ("db_writes",): memory.STORE.queue_depth(),
+        ("journal",): journal.JOURNAL.appended - journal.JOURNAL.written,
+    }
+
+
+def provider_requests():
+    return {(provider.name, outcome): count
+            for provider in agent.PROVIDERS.providers for outcome, count in provider.outcomes.items()}
+
+
+metrics.CallbackMetric("honeypot_cache_lookups_total", "Cache lookups by result.",
+                       ["cache", "result"], cache_lookups, kind="counter")
+metrics.CallbackMetric("honeypot_cache_entries", "Live cache entries.", ["cache"],
+                       lambda: {(name,): s["size"] for name, s in cache_stats().items()})
+metrics.CallbackMetric("honeypot_pipeline_outcomes_total", "Detection tier outcomes.",
+                       ["stage", "outcome"], pipeline_outcomes, kind="counter")
+metrics.CallbackMetric("honeypot_pipeline_stage_seconds_total", "Time spent in each detection tier.",
+                       ["stage"], pipeline_seconds, kind="counter")
+metrics.CallbackMetric("honeypot_queue_depth", "Work queued behind background workers.",
+                       ["queue"], queue_depths)
+metrics.CallbackMetric("honeypot_admissions_total", "Chat requests by admission outcome.",
+                       ["outcome"], lambda: {(k,): v for k, v in admission.CONTROLLER.outcomes.items()},
+                       kind="counter")
+metrics.CallbackMetric("honeypot_requests_in_flight", "Chat requests being processed.",
+                       [], lambda: {(): admission.CONTROLLER.in_flight})
+metrics.CallbackMetric("honeypot_llm_provider_requests_total", "Requests sent to each LLM provider by outcome.",
+                       ["provider", "outcome"], provider_requests, kind="counter")
+metrics.CallbackMetric("honeypot_llm_breaker_open", "1 while an LLM provider's circuit breaker is open.",
+                       ["provider"], lambda: {(p.name,): int(p.breaker.state != p.breaker.CLOSED)
+                                             for p in agent.PROVIDERS.providers})
+metrics.CallbackMetric("honeypot_llm_hedges_total", "Hedged second requests sent after the latency budget.",
+                       [], lambda: {(): agent.PROVIDERS.counts["hedges"]}, kind="counter")
+metrics.CallbackMetric("honeypot_llm_offline_replies_total", "Arthur replies generated offline.",
+                       [], lambda: {(): offline.ARTHUR.replies}, kind="counter")
+metrics.CallbackMetric("honeypot_indicator_index_entries", "Indicators in the in-memory index.",
+                       [], lambda: {(): len(indicators.INDEX)})
+metrics.CallbackMetric("honeypot_model_ready", "1 once the guard model has warmed up.",
+                       [], lambda: {(): int(security.is_ready())})
 
 @app.on_event("startup")
 def startup_event():
-    """Initialize database connection on application startup."""
+    """Initialize database connection and start the guard model warm-up."""
     try:
         memory.init_db()
+        indicators.INDEX.load()
+        campaigns.GRAPH.load()
+        if memory.SESSION_BACKEND == "sqlite":
+            # Other workers add indicators and campaign links to the same database
+            indicators.start_refresher()
+            campaigns.start_refresher()
+        if indicators.SNAPSHOT_PATH:
+            indicators.start_snapshotter()
+        if memory.COMPACT_SECONDS > 0:
+            indicators.start_compactor()
     except Exception as e:
         print(f"Critical DB Failure: {e}")
 
+    if EAGER_LOAD:
+        security.warm_up()
+    else:
+        security.start_warmup()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    """Flush queued threat and journal writes and close pooled connections."""
+    memory.STORE.close()
+    journal.JOURNAL.close()
+
 class ChatRequest(BaseModel):
     """Schema for chat requests."""
     session_id: str
@@ -52,10 +159,89 @@ def verify_api_key(x_api_key: str = Security(APIKeyHeader(name="x-api-key", auto
     return x_api_key
 
 
+def admit(api_key: str, session_id: Optional[str] = None, deferrable: bool = False) -> bool:
+    """
+    Admission control (see app/admission.py). Returns True if the request
+    is to be served on the degraded path; raises 429 / 503 with Retry-After.
+    """
+    try:
+        return admission.CONTROLLER.admit(api_key, session_id, deferrable)
+    except admission.Rejected as e:
+        raise HTTPException(status_code=e.status, detail=e.reason,
+                            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+
+
 @app.get("/dashboard-data")
-def get_dashboard_data():
-    """Returns the live logs for the frontend polling."""
-    return DASHBOARD_LOGS
+def get_dashboard_data(since: int = 0):
+    """
+    Returns the live logs for the frontend polling, newest first.
+    Pass since=<seq> to receive only entries added after that seq.
+    """
+    return Response(content=DASHBOARD_LOGS.render(since), media_type="application/json")
+
+
+@app.get("/dashboard-stream")
+async def dashboard_stream(since: int = 0, last_event_id: Optional[str] = Header(None)):
+    """Server-Sent Events push of new log entries (resumes from Last-Event-ID)."""
+    if last_event_id and last_event_id.isdigit():
+        since = max(since, int(last_event_id))
+    return StreamingResponse(DASHBOARD_LOGS.stream(since), media_type="text/event-stream")
+
+
+async def detect_threat(session_id: str, message: str, intelligence: dict,
+                        degraded: bool = False) -> Tuple[bool, str, float]:
+    """
+    Threat Detection through the tiered pipeline
+    (Session, Indicator Index, Heuristic, AI Guard, optional LLM).
+    Degraded requests stop before the model and LLM tiers.
+
+    Returns:
+        Tuple[bool, str, float]: (threat_detected, threat_source, confidence)
+    """
+    threat_detected, threat_source, confidence, stage = await pipeline.PIPELINE.run(
+        session_id, message, intelligence,
+        max_cost=admission.DEGRADED_MAX_COST if degraded else None,
+    )
+
+    # Link the session to what it revealed, even on session / index hits:
+    # later turns are where payment details come out
+    if threat_detected:
+        campaigns.GRAPH.observe(session_id, intelligence)
+
+    # Session / known-indicator hits carry no new score
+    if not (threat_detected and stage is not None and stage.record):
+        return threat_detected, threat_source, 0.0
+
+    # Save all entities to database and index
+    indicators.record_intelligence(intelligence, confidence)
+    return threat_detected, threat_source, confidence
+
+
+def count_outcome(threat_detected: bool, threat_source: str) -> None:
+    # Messages in total are honeypot_chat_stage_seconds_count{stage="extract"}
+    if threat_detected:
+        metrics.THREATS.labels(threat_source).inc()
+
+
+async def log_engagement(session_id: str, message: str, bot_reply: str, intelligence: dict,
+                         threat_source: str) -> None:
+    """Adds an engaged exchange to the dashboard log and the durable journal."""
+    journal.JOURNAL.append({
+        "session_id": session_id,
+        "scammer_msg": message,
+        "bot_response": bot_reply,
+        "intelligence": intelligence,
+        "threat_source": threat_source
+    })
+    log_entry = {
+        "timestamp": datetime.now().strftime("%H:%M:%S"),
+        "session_id": session_id,
+        "scammer_msg": message,
+        "bot_response": bot_reply,
+        "intelligence": intelligence,
+        "threat_source": threat_source
+    }
+    await DASHBOARD_LOGS.add(log_entry)
 
 
 @app.post("/chat")
@@ -66,67 +252,43 @@ async def chat_endpoint(request: ChatRequest, api_key: str = Depends(verify_api_
     2. Threat Detection (Session, Database, AI)
     3. Engagement Strategy
     4. Logging
+
+    Under overload the request is rate limited, shed, or served on the
+    degraded path (heuristic detection, cached / canned reply; see admit()).
     """
     session_id = request.session_id
     message = request.message
+    degraded = admit(api_key, session_id)
+    with admission.CONTROLLER.slot():
+        return await handle_chat(session_id, message, degraded)
+
+
+async def handle_chat(session_id: str, message: str, degraded: bool) -> dict:
+    start = time.perf_counter()
     
     # 1. Intelligence Extraction
     intelligence = utils.extract_intelligence(message)
+    mark = time.perf_counter()
+    EXTRACT_SECONDS.observe(mark - start)
     
     # 2. Threat Detection
-    domains = [
-        utils.get_domain(url) 
-        for url in intelligence.get("urls", []) 
-        if utils.get_domain(url)
-    ]
-    emails = intelligence.get("emails", [])
-    phones = intelligence.get("phone_numbers", [])
-    
-    threat_detected = False
-    threat_source = "clean"
-    confidence = 0.0
-
-    # A. Check Ongoing Session
-    existing_session = memory.get_session(session_id)
-    if existing_session:
-        threat_detected = True
-        threat_source = "ongoing_session"
-
-    # B. Check Cache (Database)
-    if not threat_detected:
-        # Check Domains
-        for domain in domains:
-            if memory.check_cache(domain):
-                threat_detected = True
-                threat_source = "known_database"
-                break
-        # Check Emails
-        if not threat_detected:
-            for email in emails:
-                if memory.check_cache(email):
-                    threat_detected = True
-                    threat_source = "known_database"
-                    break
-
-    # C. Check AI Guard
-    if not threat_detected:
-        is_scam, score = security.predict_scam(message)
-        if is_scam:
-            threat_detected = True
-            threat_source = "ai_guard"
-            confidence = score
-            
-            # Save all entities to database
-            for domain in domains:
-                memory.update_cache(domain, "SCAM_URL", confidence)
-            for email in emails:
-                memory.update_cache(email, "SCAM_EMAIL", confidence)
-            for phone in phones:
-                memory.update_cache(phone, "SCAM_PHONE", confidence)
+    threat_detected, threat_source, confidence = await detect_threat(
+        session_id, message, intelligence, degraded
+    )
+    DETECT_SECONDS.since(mark)
+    count_outcome(threat_detected, threat_source)
 
     # 3. Engagement
     if threat_detected:
-        bot_reply = agent.generate_reply(session_id, message)
+        mark = time.perf_counter()
+        if degraded:
+            bot_reply = await memory.run_blocking(agent.degraded_reply, session_id, message)
+        else:
+            bot_reply = await agent.generate_reply(session_id, message)
+        REPLY_SECONDS.since(mark)
+        mark = time.perf_counter()
+        await memory.run_blocking(conversation.record_exchange, session_id, message, bot_reply, threat_source)
+        RECORD_SECONDS.since(mark)
         response_data = {
             "response": bot_reply,
             "intelligence": intelligence,
@@ -139,25 +301,165 @@ async def chat_endpoint(request: ChatRequest, api_key: str = Depends(verify_api_
             "intelligence": intelligence,
             "status": "ignored"
         }
+    if degraded:
+        response_data["degraded"] = True
 
     # 4. Logging
     if threat_detected:
-        log_entry = {
-            "timestamp": datetime.now().strftime("%H:%M:%S"),
-            "session_id": session_id,
-            "scammer_msg": message,
-            "bot_response": response_data["response"],
+        mark = time.perf_counter()
+        await log_engagement(session_id, message, response_data["response"], intelligence, threat_source)
+        LOG_SECONDS.since(mark)
+
+    CHAT_SECONDS.since(start)
+    return response_data
+
+
+def sse_event(event: str, data) -> str:
+    """Formats one Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest, api_key: str = Depends(verify_api_key)):
+    """
+    Streaming variant of /chat (Server-Sent Events).
+
+    Emits one "meta" event with status/source/intelligence, then "token"
+    events with fragments of Arthur's reply as they arrive, then "done".
+    """
+    session_id = request.session_id
+    message = request.message
+    degraded = admit(api_key, session_id)
+
+    with admission.CONTROLLER.slot():
+        intelligence = utils.extract_intelligence(message)
+        threat_detected, threat_source, confidence = await detect_threat(
+            session_id, message, intelligence, degraded
+        )
+    count_outcome(threat_detected, threat_source)
+
+    async def events():
+        meta = {
             "intelligence": intelligence,
-            "threat_source": threat_source
+            "status": "engaged" if threat_detected else "ignored",
         }
-        DASHBOARD_LOGS.insert(0, log_entry)
-        if len(DASHBOARD_LOGS) > 50:
-            DASHBOARD_LOGS.pop()
+        if threat_detected:
+            meta["source"] = threat_source
+        if degraded:
+            meta["degraded"] = True
+        yield sse_event("meta", meta)
 
-    return response_data
+        if not threat_detected:
+            yield sse_event("token", "Message received (Safe).")
+            yield sse_event("done", {})
+            return
+
+        fragments = []
+        if degraded:
+            fragments.append(await memory.run_blocking(agent.degraded_reply, session_id, message))
+            yield sse_event("token", fragments[0])
+        else:
+            with admission.CONTROLLER.slot():
+                async for fragment in agent.stream_reply(session_id, message):
+                    fragments.append(fragment)
+                    yield sse_event("token", fragment)
+        yield sse_event("done", {})
+
+        bot_reply = "".join(fragments)
+        await memory.run_blocking(conversation.record_exchange, session_id, message, bot_reply, threat_source)
+        await log_engagement(session_id, message, bot_reply, intelligence, threat_source)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for handlers that keep reading the request body while
+    they respond. The stock class also listens for a client disconnect on
+    the same receive channel (ASGI < 2.4), which swallows the body messages.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+
+
+@app.post("/chat/batch")
+async def chat_batch_endpoint(request: Request, api_key: str = Depends(verify_api_key)):
+    """
+    Bulk variant of /chat for captured scam feeds.
+
+    The body is a JSON array or NDJSON of {"session_id", "message"}. Items
+    are classified in model-sized batches (see app/bulk.py) and results are
+    streamed back as NDJSON, one line per item, in input order. No replies
+    are generated. Under overload the whole request is refused (503) rather
+    than degraded.
+    """
+    admit(api_key, deferrable=True)
+
+    async def lines():
+        # One request in flight for the whole stream; bulk.analyze_chunk adds
+        # one per item while a chunk is classified
+        with admission.CONTROLLER.slot():
+            items = bulk.items_from_body(request.stream())
+            async for result in bulk.analyze_stream(items):
+                yield json.dumps(result) + "\n"
+
+    return DuplexStreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.get("/campaigns")
+def get_campaigns(limit: int = 20, api_key: str = Depends(verify_api_key)):
+    """The largest campaigns (sessions linked through shared indicators)."""
+    return {"stats": campaigns.GRAPH.stats(), "campaigns": campaigns.GRAPH.largest(limit)}
+
+
+@app.get("/campaigns/lookup")
+def lookup_campaign(key: str, limit: int = campaigns.DEFAULT_LIMIT, api_key: str = Depends(verify_api_key)):
+    """All indicators and sessions in the campaign of an indicator, session id or campaign id."""
+    campaign = campaigns.GRAPH.campaign(key, limit)
+    if campaign is None:
+        raise HTTPException(status_code=404, detail="Unknown indicator or session")
+    return campaign
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus scrape endpoint (text exposition format)."""
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/cache-stats")
+def get_cache_stats():
+    """Hit/miss counters for the verdict, reply and near-duplicate caches."""
+    return cache_stats()
+
+
+@app.get("/admission-stats")
+def get_admission_stats():
+    """Load signals, thresholds and outcome counters of admission control."""
+    return admission.CONTROLLER.stats()
+
+
+@app.get("/llm-stats")
+def get_llm_stats():
+    """Provider breakers, hedging and failover counters, and offline replies."""
+    return {**agent.PROVIDERS.stats(), "offline_replies": offline.ARTHUR.replies}
+
+
+@app.get("/pipeline-stats")
+def get_pipeline_stats():
+    """Per-stage timing and early-exit counters of the detection pipeline."""
+    return pipeline.PIPELINE.stats()
 
 
 @app.get("/")
 def health_check():
     """Health check endpoint."""
-    return {"status": "running"}
\ No newline at end of file
+    return {"status": "running"}
+
+
+@app.get("/ready")
+def readiness_check():
+    """Readiness endpoint. Returns 503 until the guard model has warmed up."""
+    state = security.status()
+    return JSONResponse(status_code=200 if security.is_ready() else 503, content=state)
\ No newline at end of file
@@ -2,137 +2,744 @@
 Database initialization and session management.
 """
 import os
+import asyncio
+import json
+import math
+import queue
 import sqlite3
+import threading
+import time
 from collections import OrderedDict
-from datetime import datetime
-from typing import Optional, Dict, Any
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, Callable, List, NamedTuple, Tuple
+
+from app import metrics
 
 # Global Session Storage (LRU Cache)
 SESSION_STORAGE = OrderedDict()
 MAX_SESSIONS = 500
-DB_PATH = os.path.join(
-    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-    "data",
-    "threats.db"
-)
-
 
-import sqlite3
-import os
+# Session Backend: "memory" (this process only) or "sqlite" (shared by all
+# workers on the host through the threat database)
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory").lower()
+SESSION_TTL = float(os.getenv("SESSION_TTL", str(6 * 3600)))
+SHARED_MAX_SESSIONS = int(os.getenv("SHARED_MAX_SESSIONS", "100000"))
 
 # Define the path relative to THIS file
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_FOLDER = os.path.join(BASE_DIR, "../data")
-DB_PATH = os.path.join(DB_FOLDER, "threats.db")
+DB_PATH = os.getenv("THREAT_DB_PATH", os.path.join(DB_FOLDER, "threats.db"))
 
-def init_db():
-    # 1. Create the 'data' folder if it is missing
-    if not os.path.exists(DB_FOLDER):
-        print(f"Creating: {DB_FOLDER}")
-        os.makedirs(DB_FOLDER)
-
-    # 2. Connect (creates the file automatically)
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # 3. Create Tables (Idempotent - safe to run multiple times)
-    # Session Table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS sessions (
-            session_id TEXT PRIMARY KEY,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            status TEXT DEFAULT 'active'
+# Writer Settings (overridable from the environment)
+FLUSH_INTERVAL_MS = float(os.getenv("THREAT_FLUSH_INTERVAL_MS", "50"))
+MAX_WRITE_BATCH = int(os.getenv("THREAT_MAX_WRITE_BATCH", "500"))
+
+# Threat Retention: an indicator's confidence halves every THREAT_HALF_LIFE_DAYS
+# without a re-sighting (more slowly the more often it has been seen). Rows
+# that decay below THREAT_MIN_CONFIDENCE, or go unseen for THREAT_TTL_DAYS, are
+# moved to threat_archive by the compactor, which keeps them THREAT_ARCHIVE_DAYS.
+HALF_LIFE_DAYS = float(os.getenv("THREAT_HALF_LIFE_DAYS", "7"))
+MIN_CONFIDENCE = float(os.getenv("THREAT_MIN_CONFIDENCE", "0.2"))
+THREAT_TTL_DAYS = float(os.getenv("THREAT_TTL_DAYS", "30"))
+ARCHIVE_DAYS = float(os.getenv("THREAT_ARCHIVE_DAYS", "90"))
+COMPACT_SECONDS = float(os.getenv("THREAT_COMPACT_SECONDS", "600"))
+COMPACT_CHUNK = int(os.getenv("THREAT_COMPACT_CHUNK", "200"))
+COMPACT_PAUSE_MS = float(os.getenv("THREAT_COMPACT_PAUSE_MS", "20"))
+DAY_SECONDS = 86400.0
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS sessions (
+        session_id TEXT PRIMARY KEY,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        status TEXT DEFAULT 'active'
+    )
+    ''',
+    # Threat Intel Cache (URLs, Emails, Phones, UPI IDs, Bank Accounts)
+    '''
+    CREATE TABLE IF NOT EXISTS threat_cache (
+        value TEXT PRIMARY KEY,
+        type TEXT,
+        confidence REAL,
+        last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        hits INTEGER DEFAULT 1,
+        first_seen TIMESTAMP,
+        expires_at REAL
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_threat_last_seen ON threat_cache(last_seen)",
+    # Indicators expired by the compactor (confidence decayed to archive time)
+    '''
+    CREATE TABLE IF NOT EXISTS threat_archive (
+        value TEXT PRIMARY KEY,
+        type TEXT,
+        confidence REAL,
+        hits INTEGER,
+        first_seen TIMESTAMP,
+        last_seen TIMESTAMP,
+        archived_at TIMESTAMP
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_archive_archived_at ON threat_archive(archived_at)",
+    # Campaign graph (app/campaigns.py): the session-indicator links that
+    # created a node or joined two campaigns, enough to rebuild the graph
+    '''
+    CREATE TABLE IF NOT EXISTS campaign_edges (
+        session_id TEXT,
+        value TEXT,
+        type TEXT,
+        seen TIMESTAMP,
+        PRIMARY KEY (session_id, value)
+    )
+    ''',
+    # Shared session state (SESSION_BACKEND=sqlite)
+    '''
+    CREATE TABLE IF NOT EXISTS session_state (
+        session_id TEXT PRIMARY KEY,
+        data TEXT,
+        last_access REAL,
+        expires_at REAL
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_session_last_access ON session_state(last_access)",
+    # Shared dashboard log (SESSION_BACKEND=sqlite)
+    '''
+    CREATE TABLE IF NOT EXISTS dashboard_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        body TEXT
+    )
+    ''',
+    # Offline corpus scans (scan_corpus.py): one verdict per input line, and
+    # the chunks already committed so an interrupted scan can resume
+    '''
+    CREATE TABLE IF NOT EXISTS scan_verdicts (
+        source TEXT,
+        line INTEGER,
+        record_id TEXT,
+        is_scam INTEGER,
+        score REAL,
+        PRIMARY KEY (source, line)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS scan_chunks (
+        source TEXT,
+        first_line INTEGER,
+        last_line INTEGER,
+        PRIMARY KEY (source, first_line)
+    )
+    ''',
+]
+
+# Columns added to tables created by older versions: (table, column, declaration)
+MIGRATIONS = [
+    ("threat_cache", "hits", "INTEGER DEFAULT 1"),
+    ("threat_cache", "first_seen", "TIMESTAMP"),
+    ("threat_cache", "expires_at", "REAL"),
+]
+# Indexes on migrated columns, created once the columns exist
+POST_MIGRATION = [
+    "CREATE INDEX IF NOT EXISTS idx_threat_expires ON threat_cache(expires_at)",
+]
+
+PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA busy_timeout=5000",
+]
+
+# Statements are reused verbatim so sqlite3's per-connection statement cache
+# prepares each one only once.
+SELECT_THREAT = '''
+    SELECT value, type, confidence, hits, last_seen FROM threat_cache
+    WHERE value = ? AND (expires_at IS NULL OR expires_at > ?)
+'''
+SELECT_ALL_THREATS = "SELECT value, type, confidence, last_seen FROM threat_cache ORDER BY last_seen DESC"
+SELECT_LIVE_THREATS = "SELECT value, type FROM threat_cache WHERE expires_at IS NULL OR expires_at > ?"
+# Parameters: (value, type, confidence, last_seen, hits). A re-sighting keeps
+# the higher of the new confidence and the old one decayed to now, adds the
+# hits and recomputes the expiry (decayed() / expiry() are registered per
+# connection). SET expressions all read the row as it was before the update.
+UPSERT_THREAT = '''
+    INSERT INTO threat_cache (value, type, confidence, last_seen, hits, first_seen, expires_at)
+    VALUES (?1, ?2, ?3, ?4, ?5, ?4, expiry(?3, ?5, ?4))
+    ON CONFLICT(value) DO UPDATE SET
+        type=excluded.type,
+        confidence=MAX(excluded.confidence, decayed(confidence, hits, last_seen, excluded.last_seen)),
+        hits=hits + excluded.hits,
+        first_seen=COALESCE(first_seen, last_seen),
+        last_seen=excluded.last_seen,
+        expires_at=expiry(
+            MAX(excluded.confidence, decayed(confidence, hits, last_seen, excluded.last_seen)),
+            hits + excluded.hits,
+            excluded.last_seen
         )
-    ''')
-
-    # Threat Intel Cache (URLs, Emails, Phones)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS threat_cache (
-            value TEXT PRIMARY KEY,
-            type TEXT,
-            confidence REAL,
-            last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+'''
+
+# Compaction statements, each run on at most COMPACT_CHUNK rows per transaction
+SELECT_EXPIRED = "SELECT value FROM threat_cache WHERE expires_at <= ? LIMIT ?"
+ARCHIVE_THREAT = '''
+    INSERT OR REPLACE INTO threat_archive
+    SELECT value, type, decayed(confidence, hits, last_seen, ?1), hits, first_seen, last_seen, ?1
+    FROM threat_cache WHERE value = ?2
+'''
+DELETE_THREAT = "DELETE FROM threat_cache WHERE value = ?"
+BACKFILL_EXPIRY = '''
+    UPDATE threat_cache SET
+        expires_at = expiry(confidence, hits, last_seen),
+        first_seen = COALESCE(first_seen, last_seen)
+    WHERE rowid IN (SELECT rowid FROM threat_cache WHERE expires_at IS NULL LIMIT ?)
+'''
+PRUNE_ARCHIVE = '''
+    DELETE FROM threat_archive WHERE rowid IN (
+        SELECT rowid FROM threat_archive WHERE archived_at < ? LIMIT ?
+    )
+'''
+SELECT_ARCHIVED_SINCE = "SELECT value FROM threat_archive WHERE archived_at >= ?"
+
+INSERT_CAMPAIGN_EDGE = "INSERT OR IGNORE INTO campaign_edges (session_id, value, type, seen) VALUES (?, ?, ?, ?)"
+SELECT_CAMPAIGN_EDGES = "SELECT rowid, session_id, value, type FROM campaign_edges WHERE rowid > ? ORDER BY rowid"
+
+SELECT_SESSION = "SELECT data, last_access FROM session_state WHERE session_id = ? AND expires_at > ?"
+TOUCH_SESSION = "UPDATE session_state SET last_access = ?, expires_at = ? WHERE session_id = ?"
+UPSERT_SESSION = '''
+    INSERT INTO session_state (session_id, data, last_access, expires_at)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(session_id) DO UPDATE SET
+        data=excluded.data,
+        last_access=excluded.last_access,
+        expires_at=excluded.expires_at
+'''
+DELETE_EXPIRED_SESSIONS = "DELETE FROM session_state WHERE expires_at <= ?"
+TRIM_SESSIONS = '''
+    DELETE FROM session_state WHERE session_id IN (
+        SELECT session_id FROM session_state ORDER BY last_access DESC LIMIT -1 OFFSET ?
+    )
+'''
+
+UPSERT_VERDICT = "INSERT OR REPLACE INTO scan_verdicts (source, line, record_id, is_scam, score) VALUES (?, ?, ?, ?, ?)"
+INSERT_SCAN_CHUNK = "INSERT OR REPLACE INTO scan_chunks (source, first_line, last_line) VALUES (?, ?, ?)"
+
+
+def _timestamp(now: Optional[float] = None) -> str:
+    """UTC timestamp in the same format as CURRENT_TIMESTAMP."""
+    moment = datetime.now(timezone.utc) if now is None else datetime.fromtimestamp(now, timezone.utc)
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _epoch(timestamp: str) -> float:
+    """Seconds since the epoch for a CURRENT_TIMESTAMP-style UTC string."""
+    try:
+        return datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+
+def half_life(hits: int) -> float:
+    """Seconds for confidence to halve; each doubling of hits adds one base half-life."""
+    return HALF_LIFE_DAYS * DAY_SECONDS * (1 + math.log2(max(1, hits or 1)))
+
+
+def decayed_confidence(confidence: float, hits: int, last_seen: float, now: float) -> float:
+    """
+    Confidence of an indicator last seen at `last_seen`, as of `now`.
+
+    Args:
+        confidence (float): Confidence recorded at the last sighting.
+        hits (int): Number of sightings so far.
+        last_seen (float): Epoch seconds of the last sighting.
+        now (float): Epoch seconds to decay to.
+
+    Returns:
+        float: The decayed confidence.
+    """
+    age = max(0.0, now - last_seen)
+    return (confidence or 0.0) * 0.5 ** (age / half_life(hits))
+
+
+def expiry(confidence: float, hits: int, last_seen: float) -> float:
+    """Epoch seconds at which an indicator decays below MIN_CONFIDENCE or hits the TTL."""
+    ttl = THREAT_TTL_DAYS * DAY_SECONDS
+    confidence = confidence or 0.0
+    if confidence <= MIN_CONFIDENCE:
+        return last_seen
+    return last_seen + min(ttl, half_life(hits) * math.log2(confidence / MIN_CONFIDENCE))
+
+
+def _register_functions(conn: sqlite3.Connection) -> None:
+    """SQL versions of decayed_confidence() / expiry() over timestamp strings."""
+    conn.create_function(
+        "decayed", 4, lambda c, h, seen, at: decayed_confidence(c, h, _epoch(seen), _epoch(at)),
+        deterministic=True,
+    )
+    conn.create_function(
+        "expiry", 3, lambda c, h, seen: expiry(c, h, _epoch(seen)), deterministic=True
+    )
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """Adds MIGRATIONS columns missing from tables created by older versions."""
+    for table, column, declaration in MIGRATIONS:
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+    for statement in POST_MIGRATION:
+        conn.execute(statement)
+
+
+class Statement(NamedTuple):
+    """A write for the background writer other than a threat upsert."""
+    sql: str
+    params: tuple
+
+
+class ThreatStore:
+    """
+    Pooled access to the threat database.
+
+    Every thread gets one long-lived connection (WAL mode, tuned pragmas).
+    Writes are queued and coalesced by a background writer that commits them
+    in batched transactions; reads see queued writes immediately.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, flush_interval_ms: float = FLUSH_INTERVAL_MS,
+                 max_batch: int = MAX_WRITE_BATCH):
+        self.db_path = db_path
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._schema_ready = False
+
+        # value -> (type, confidence, last_seen) not yet committed
+        self._pending: Dict[str, Tuple[str, float, str]] = {}
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+
+    # --- Connections ---
+
+    def _open(self) -> sqlite3.Connection:
+        folder = os.path.dirname(self.db_path)
+        if folder and not os.path.exists(folder):
+            print(f"Creating: {folder}")
+            os.makedirs(folder, exist_ok=True)
+
+        conn = sqlite3.connect(
+            self.db_path,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=128,
         )
-    ''')
-    
-    conn.commit()
-    conn.close()
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        _register_functions(conn)
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Returns this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            with self._lock:
+                if not self._schema_ready:
+                    for statement in SCHEMA:
+                        conn.execute(statement)
+                    _migrate(conn)
+                    self._schema_ready = True
+                self._connections.append(conn)
+            self._local.conn = conn
+        return conn
+
+    def init_schema(self) -> None:
+        """Creates tables (idempotent)."""
+        conn = self.connection()
+        for statement in SCHEMA:
+            conn.execute(statement)
+        _migrate(conn)
+
+    # --- Reads ---
+
+    def lookup(self, value: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Returns the threat record for value, including uncommitted writes.
+
+        Expired rows are not returned even before the compactor archives
+        them, and confidence is decayed to `now`.
+        """
+        pending = self._pending.get(value)
+        if pending:
+            return {"value": value, "type": pending[0], "confidence": pending[1]}
+
+        now = time.time() if now is None else now
+        row = self.connection().execute(SELECT_THREAT, (value, now)).fetchone()
+        if row:
+            confidence = decayed_confidence(row[2], row[3], _epoch(row[4]), now)
+            if confidence < MIN_CONFIDENCE:
+                # Written before expiry tracking and not yet dated by the compactor
+                return None
+            return {"value": row[0], "type": row[1], "confidence": confidence, "hits": row[3]}
+        return None
+
+    def all_threats(self) -> List[tuple]:
+        """Returns every committed threat row, newest first."""
+        self.flush()
+        return self.connection().execute(SELECT_ALL_THREATS).fetchall()
+
+    # --- Writes ---
+
+    def upsert(self, value: str, threat_type: str, confidence: float) -> None:
+        """Queues an insert-or-update (one sighting) for the background writer."""
+        record = (threat_type, confidence, _timestamp())
+        self._pending[value] = record
+        self._ensure_writer()
+        self._queue.put((value, record))
+
+    def enqueue(self, sql: str, params: tuple) -> None:
+        """Queues any other write; it is committed with the next threat batch."""
+        self._ensure_writer()
+        self._queue.put(Statement(sql, params))
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Blocks until every write queued so far has been committed."""
+        if self._writer is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def _ensure_writer(self) -> None:
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(
+                        target=self._write_loop, name="threat-writer", daemon=True
+                    )
+                    self._writer.start()
+
+    def _write_loop(self) -> None:
+        while True:
+            batch: Dict[str, Tuple[str, float, str]] = {}
+            hits: Dict[str, int] = {}
+            statements: Dict[str, List[tuple]] = {}
+            statement_count = 0
+            waiters: List[threading.Event] = []
+
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if isinstance(item, threading.Event):
+                    # A flush request commits whatever has been gathered so far
+                    waiters.append(item)
+                    break
+                if isinstance(item, Statement):
+                    statements.setdefault(item.sql, []).append(item.params)
+                    statement_count += 1
+                else:
+                    value, record = item
+                    # Coalesce sightings: keep the latest, count them all
+                    hits[value] = hits.get(value, 0) + 1
+                    batch[value] = record
+                remaining = deadline - time.monotonic()
+                if len(batch) + statement_count >= self.max_batch or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if batch or statements:
+                self._commit(batch, hits, statements)
+            for waiter in waiters:
+                waiter.set()
+
+    def _commit(self, batch: Dict[str, Tuple[str, float, str]], hits: Dict[str, int],
+                statements: Dict[str, List[tuple]]) -> None:
+        rows = [(value, t, c, seen, hits[value]) for value, (t, c, seen) in batch.items()]
+        conn = self.connection()
+        start = time.perf_counter()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if rows:
+                conn.executemany(UPSERT_THREAT, rows)
+            for sql, params in statements.items():
+                conn.executemany(sql, params)
+            conn.execute("COMMIT")
+            metrics.DB_COMMIT_SECONDS.since(start)
+            metrics.DB_COMMIT_ROWS.observe(len(rows) + sum(map(len, statements.values())))
+        except sqlite3.Error as e:
+            print(f"Database Update Error: {e}")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+        finally:
+            for value, record in batch.items():
+                if self._pending.get(value) is record:
+                    self._pending.pop(value, None)
+
+    def queue_depth(self) -> int:
+        """Writes queued but not yet committed."""
+        return self._queue.qsize()
+
+    def write_batch(self, statements: List[Tuple[str, List[tuple]]]) -> None:
+        """
+        Runs several executemany() calls in one transaction, synchronously.
+
+        For bulk loads that bypass the queued writer (e.g. offline scans).
+
+        Args:
+            statements (List[Tuple[str, List[tuple]]]): (SQL, rows) pairs.
+        """
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for sql, rows in statements:
+                if rows:
+                    conn.executemany(sql, rows)
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+
+    # --- Retention ---
+
+    def compact(self, now: Optional[float] = None, chunk_size: int = COMPACT_CHUNK,
+                pause_ms: float = COMPACT_PAUSE_MS) -> Dict[str, Any]:
+        """
+        Archives expired indicators in short transactions of chunk_size rows.
+
+        Also dates rows written before expiry tracking existed and drops
+        archive rows older than ARCHIVE_DAYS. Sleeps pause_ms between chunks
+        so the queued writer and other workers get the write lock.
+
+        Args:
+            now (Optional[float]): Epoch seconds to expire against (default: now).
+            chunk_size (int): Rows per transaction.
+            pause_ms (float): Pause between transactions.
+
+        Returns:
+            Dict[str, Any]: "expired" (values archived), "backfilled", "pruned",
+                "chunks" and "max_lock_ms" (longest transaction).
+        """
+        now = time.time() if now is None else now
+        stamp = _timestamp(now)
+        conn = self.connection()
+        stats: Dict[str, Any] = {"expired": [], "backfilled": 0, "pruned": 0, "chunks": 0, "max_lock_ms": 0.0}
+
+        def in_chunk(work) -> int:
+            start = time.perf_counter()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                count = work()
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+            stats["chunks"] += 1
+            stats["max_lock_ms"] = max(stats["max_lock_ms"], (time.perf_counter() - start) * 1000)
+            if pause_ms:
+                time.sleep(pause_ms / 1000.0)
+            return count
+
+        def expire_chunk() -> int:
+            values = [row[0] for row in conn.execute(SELECT_EXPIRED, (now, chunk_size))]
+            conn.executemany(ARCHIVE_THREAT, [(stamp, value) for value in values])
+            conn.executemany(DELETE_THREAT, [(value,) for value in values])
+            # A queued re-sighting will re-insert the row; keep it in the index
+            stats["expired"].extend(v for v in values if v not in self._pending)
+            return len(values)
+
+        while True:
+            count = in_chunk(lambda: conn.execute(BACKFILL_EXPIRY, (chunk_size,)).rowcount)
+            stats["backfilled"] += count
+            if count < chunk_size:
+                break
+        while in_chunk(expire_chunk) == chunk_size:
+            pass
+        if ARCHIVE_DAYS > 0:
+            cutoff = _timestamp(now - ARCHIVE_DAYS * DAY_SECONDS)
+            while True:
+                count = in_chunk(lambda: conn.execute(PRUNE_ARCHIVE, (cutoff, chunk_size)).rowcount)
+                stats["pruned"] += count
+                if count < chunk_size:
+                    break
+        return stats
+
+    def archived_since(self, timestamp: str) -> List[str]:
+        """Values archived at or after a CURRENT_TIMESTAMP-style timestamp."""
+        return [row[0] for row in self.connection().execute(SELECT_ARCHIVED_SINCE, (timestamp,))]
+
+    def close(self) -> None:
+        """Flushes queued writes and closes every pooled connection."""
+        self.flush()
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+STORE = ThreatStore(DB_PATH)
+
+
+def init_db():
+    """Creates the data folder and tables (idempotent - safe to run multiple times)."""
+    STORE.init_schema()
     print("Database initialized successfully.")
 
+
 def get_db_connection():
-    if not os.path.exists(DB_PATH):
-        init_db()
-    return sqlite3.connect(DB_PATH)
+    """Returns the calling thread's pooled connection."""
+    return STORE.connection()
+
+
+def check_cache(value: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up a known threat indicator.
 
+    Args:
+        value (str): The indicator (domain, email, phone, ...).
 
-def check_cache(domain: str) -> Optional[Dict[str, Any]]:
-    if not domain:
+    Returns:
+        Optional[Dict[str, Any]]: The threat record, or None if unknown.
+    """
+    if not value:
         return None
-        
+
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT domain, type, confidence FROM threats WHERE domain = ?",
-            (domain,)
-        )
-        row = cursor.fetchone()
-        conn.close()
-        
-        if row:
-            return {
-                "domain": row[0],
-                "type": row[1],
-                "confidence": row[2]
-            }
-        return None
+        return STORE.lookup(value)
     except sqlite3.Error:
         return None
 
 
-def update_cache(domain: str, threat_type: str, confidence: float) -> None:
+def update_cache(value: str, threat_type: str, confidence: float) -> None:
     """
     Update or insert a threat into the database.
 
+    The write is queued and committed in a batch by the background writer.
+
     Args:
-        domain (str): The domain identifier.
+        value (str): The indicator (domain, email, phone, ...).
         threat_type (str): The classification of the threat.
         confidence (float): The confidence score of the detection.
     """
-    if not domain:
+    if not value:
         return
 
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO threats (domain, type, confidence, last_seen)
-            VALUES (?, ?, ?, ?)
-            ON CONFLICT(domain) DO UPDATE SET
-                type=excluded.type,
-                confidence=excluded.confidence,
-                last_seen=excluded.last_seen
-        ''', (domain, threat_type, confidence, datetime.now()))
-        conn.commit()
-        conn.close()
-    except sqlite3.Error as e:
-        print(f"Database Update Error: {e}")
+    STORE.upsert(value, threat_type, confidence)
+
+
+class InProcessSessions:
+    """Single-worker backend: the SESSION_STORAGE OrderedDict LRU."""
+
+    name = "memory"
+    blocking = False
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        if session_id in SESSION_STORAGE:
+            SESSION_STORAGE.move_to_end(session_id)
+            return SESSION_STORAGE[session_id]
+        return None
+
+    def put(self, session_id: str, data: Dict[str, Any]) -> None:
+        if session_id in SESSION_STORAGE:
+            SESSION_STORAGE.move_to_end(session_id)
+            SESSION_STORAGE[session_id] = data
+        else:
+            SESSION_STORAGE[session_id] = data
+            if len(SESSION_STORAGE) > MAX_SESSIONS:
+                SESSION_STORAGE.popitem(last=False)
+
+
+class SqliteSessions:
+    """
+    Multi-worker backend: sessions live in the shared WAL database as JSON.
+
+    Every worker on the host sees the same sessions. Entries expire after
+    SESSION_TTL seconds; past SHARED_MAX_SESSIONS the least recently used
+    are evicted. Writes are synchronous so a follow-up routed to another
+    worker sees them at once. Being blocking I/O, calls from async code go
+    through run_blocking().
+    """
+
+    name = "sqlite"
+    blocking = True
+    TOUCH_INTERVAL = 5.0
+    SWEEP_EVERY = 64
+
+    def __init__(self, store: ThreatStore, ttl: float, max_sessions: int):
+        self.store = store
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._writes = 0
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        conn = self.store.connection()
+        row = conn.execute(SELECT_SESSION, (session_id, now)).fetchone()
+        if row is None:
+            return None
+        data, last_access = row
+        if now - last_access > self.TOUCH_INTERVAL:
+            conn.execute(TOUCH_SESSION, (now, now + self.ttl, session_id))
+        return json.loads(data)
+
+    def put(self, session_id: str, data: Dict[str, Any]) -> None:
+        now = time.time()
+        conn = self.store.connection()
+        conn.execute(UPSERT_SESSION, (session_id, json.dumps(data), now, now + self.ttl))
+        self._writes += 1
+        if self._writes % self.SWEEP_EVERY == 0:
+            self.sweep(now)
+
+    def sweep(self, now: Optional[float] = None) -> None:
+        """Deletes expired sessions, then the LRU overflow."""
+        conn = self.store.connection()
+        conn.execute(DELETE_EXPIRED_SESSIONS, (now or time.time(),))
+        conn.execute(TRIM_SESSIONS, (self.max_sessions,))
+
+
+def load_session_backend(name: str = SESSION_BACKEND):
+    """Builds the session backend named by SESSION_BACKEND."""
+    if name == "sqlite":
+        return SqliteSessions(STORE, SESSION_TTL, SHARED_MAX_SESSIONS)
+    if name != "memory":
+        print(f"Unknown SESSION_BACKEND '{name}', using memory.")
+    return InProcessSessions()
+
+
+SESSIONS = load_session_backend()
 
 
 def get_session(session_id: str) -> Optional[Dict[str, Any]]:
-    """Retrieve session from LRU cache, moving it to the end."""
-    if session_id in SESSION_STORAGE:
-        SESSION_STORAGE.move_to_end(session_id)
-        return SESSION_STORAGE[session_id]
-    return None
+    """Retrieve session from the session backend (refreshing its LRU position)."""
+    try:
+        return SESSIONS.get(session_id)
+    except sqlite3.Error as e:
+        print(f"Session Read Error: {e}")
+        return None
 
 
 def create_session(session_id: str, data: Dict[str, Any]) -> None:
-    """Create a new session. Evict oldest if limit reached."""
-    if session_id in SESSION_STORAGE:
-        SESSION_STORAGE.move_to_end(session_id)
-        SESSION_STORAGE[session_id] = data
-    else:
-        SESSION_STORAGE[session_id] = data
-        if len(SESSION_STORAGE) > MAX_SESSIONS:
-            SESSION_STORAGE.popitem(last=False)
+    """Create or replace a session. Evict oldest if limit reached."""
+    try:
+        SESSIONS.put(session_id, data)
+    except sqlite3.Error as e:
+        print(f"Session Write Error: {e}")
+
+
+async def run_blocking(func: Callable, *args):
+    """
+    Calls func(*args) from async code that touches the session backend or
+    the shared dashboard log.
+
+    With SESSION_BACKEND=sqlite those are blocking SQLite calls, so they run
+    in a worker thread and leave the event loop free. The in-process backend
+    is called inline: a dict lookup is far cheaper than a thread hop.
+    """
+    if SESSIONS.blocking:
+        return await asyncio.to_thread(func, *args)
+    return func(*args)
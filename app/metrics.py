@@ -0,0 +1,246 @@
+"""
+Minimal Prometheus-style metrics (text exposition format 0.0.4).
+
+Counters, gauges and histograms are plain Python objects: recording a value
+is an attribute increment and, for histograms, one bisect over the bucket
+bounds. Values that other modules already count (cache hits, pipeline exits,
+queue depths) are read at scrape time through callbacks, so they cost
+nothing on the request path. Set METRICS_ENABLED=0 to turn recording off.
+
+Increments are not locked. Each metric is written from one thread in
+practice (the event loop, the inference worker or the DB writer), so
+updates are not lost; a scrape may see a histogram mid-update.
+"""
+import os
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# Seconds: 0.5 ms to 30 s, covering regex tiers up to Groq round-trips
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+Labels = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric:
+    """Base class: a named family of children, one per label combination."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._children: Dict[Labels, object] = {}
+        if not self.label_names:
+            self._default = self.labels()
+        REGISTRY.append(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """The child for these label values (cache it on hot paths)."""
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return lines
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        if ENABLED:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        if ENABLED:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(Metric):
+    """Monotonic count (e.g. threats detected by source)."""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.label_names, values)} {_format_value(child.value)}"
+
+
+class Gauge(Counter):
+    """Value that goes up and down (e.g. LLM calls in flight)."""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+
+class _Buckets:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        if ENABLED:
+            self.counts[bisect_left(self.bounds, value)] += 1
+            self.sum += value
+
+    def since(self, start: float, _now=time.perf_counter) -> None:
+        """Observes the seconds elapsed since a time.perf_counter() start."""
+        if ENABLED:
+            value = _now() - start
+            self.counts[bisect_left(self.bounds, value)] += 1
+            self.sum += value
+
+
+class Histogram(Metric):
+    """Bucketed distribution (latencies, batch sizes)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, labels)
+
+    def _new_child(self):
+        return _Buckets(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def since(self, start: float) -> None:
+        self._default.since(start)
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.label_names, values, le)} {cumulative}"
+            labels = _format_labels(self.label_names, values)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class CallbackMetric(Metric):
+    """
+    Counter or gauge whose values are read from other modules at scrape time.
+
+    The callback returns {label values tuple: value}.
+    """
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str],
+                 callback: Callable[[], Dict[Labels, float]], kind: str = "gauge"):
+        self.callback = callback
+        self.kind = kind
+        super().__init__(name, help_text, labels)
+
+    def _new_child(self):
+        return None
+
+    def samples(self):
+        try:
+            values = self.callback()
+        except Exception as e:
+            print(f"Metrics Callback Error ({self.name}): {e}")
+            return
+        for label_values, value in values.items():
+            yield f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}"
+
+
+REGISTRY: List[Metric] = []
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text format."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Request path ---
+
+REQUEST_SECONDS = Histogram(
+    "honeypot_request_seconds", "End-to-end handler latency.", ["endpoint"]
+)
+CHAT_STAGE_SECONDS = Histogram(
+    "honeypot_chat_stage_seconds",
+    "Latency of each step of the chat handler (extract, detect, reply, record, log).",
+    ["stage"],
+)
+PIPELINE_STAGE_SECONDS = Histogram(
+    "honeypot_pipeline_stage_seconds", "Latency of the expensive detection tiers (model, LLM).", ["stage"]
+)
+THREATS = Counter(
+    "honeypot_threats_total", "Messages classified as threats, by deciding source.", ["source"]
+)
+
+# --- Groq ---
+
+LLM_IN_FLIGHT = Gauge("honeypot_llm_in_flight", "Groq calls currently in flight.", ["call"])
+LLM_SECONDS = Histogram("honeypot_llm_seconds", "Groq call latency, retries included.", ["call"])
+LLM_CALLS = Counter("honeypot_llm_calls_total", "Groq calls by outcome.", ["call", "outcome"])
+
+# --- Guard model ---
+
+MODEL_BATCH_SIZE = Histogram(
+    "honeypot_model_batch_size", "Messages per guard-model forward pass.", buckets=BATCH_BUCKETS
+)
+MODEL_BATCH_SECONDS = Histogram("honeypot_model_batch_seconds", "Guard-model forward pass latency.")
+
+# --- SQLite ---
+
+DB_COMMIT_SECONDS = Histogram("honeypot_db_commit_seconds", "Batched threat-store commit latency.")
+DB_COMMIT_ROWS = Histogram(
+    "honeypot_db_commit_rows", "Rows per batched threat-store commit.",
+    buckets=(1, 4, 16, 64, 256, 1024),
+)
@@ -0,0 +1,251 @@
+"""
+Near-duplicate index of classified scam scripts (MinHash + LSH).
+
+The exact verdict cache (app.cache) only helps when a replayed script
+normalizes to the same key. Campaigns also send edited copies of a
+template: another name, a reworded line, an extra sentence. Each of those
+would cost a full model pass.
+
+Messages are normalized (cache.normalize), cut into character shingles and
+reduced to a MinHash signature of NEARDUP_PERMUTATIONS values; the share of
+equal values between two signatures estimates the Jaccard similarity of
+their shingle sets. Signatures are split into NEARDUP_BANDS bands and each
+band is hashed into a bucket, so only messages sharing at least one whole
+band are compared (locality-sensitive hashing). A candidate whose estimated
+similarity reaches NEARDUP_THRESHOLD hands back its stored verdict.
+
+Only confident scam verdicts (probability >= NEARDUP_MIN_SCORE) are
+indexed: a clean message resembling a clean one proves little, and a
+borderline verdict should not spread to its neighbours. The index holds at
+most NEARDUP_MAX_ENTRIES signatures and evicts the least recently matched.
+"""
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from app import cache
+
+# Set NEARDUP=0 to send every exact-cache miss to the model
+NEARDUP_ENABLED = os.getenv("NEARDUP", "1") == "1"
+NEARDUP_MAX_ENTRIES = int(os.getenv("NEARDUP_MAX_ENTRIES", "20000"))
+NEARDUP_THRESHOLD = float(os.getenv("NEARDUP_THRESHOLD", "0.7"))
+NEARDUP_MIN_SCORE = float(os.getenv("NEARDUP_MIN_SCORE", "0.8"))
+NEARDUP_PERMUTATIONS = int(os.getenv("NEARDUP_PERMUTATIONS", "64"))
+NEARDUP_BANDS = int(os.getenv("NEARDUP_BANDS", "16"))
+SHINGLE_SIZE = int(os.getenv("NEARDUP_SHINGLE_SIZE", "5"))
+# Messages with fewer shingles than this carry too little text to compare
+MIN_SHINGLES = 8
+MAX_CANDIDATES = 64
+
+MASK64 = (1 << 64) - 1
+MASK31 = (1 << 31) - 1
+# Top bit of a packed bin: set only on values borrowed by _densify
+BORROWED = 1 << 31
+# Marks a bin no shingle landed in; never survives into a signature
+EMPTY = 1 << 64
+
+# Bin minima truncated to 31 bits, packed ("I" is 4 bytes on supported platforms)
+Signature = array
+
+
+def _densify(bins: List[int]) -> None:
+    """
+    Fills empty bins from the next real minimum to the right (wrapping),
+    offset by the distance, so two messages with the same shingles still
+    agree bin for bin (rotation densification).
+    """
+    k = len(bins)
+    for i in range(k):
+        if bins[i] == EMPTY:
+            for step in range(1, k):
+                value = bins[(i + step) % k]
+                if value < BORROWED:
+                    # The top bit keeps borrowed values apart from every real
+                    # minimum, and the offset apart from the bin they copy
+                    bins[i] = BORROWED | ((value + step) & MASK31)
+                    break
+
+
+def shingles(message: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """Character shingles of the normalized message."""
+    text = cache.normalize(message)
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class NearDupIndex:
+    """
+    LRU-bounded MinHash/LSH index from message signatures to verdicts.
+
+    `permutations` must be a multiple of `bands`; rows per band trade recall
+    (fewer rows) against candidate count (more rows).
+    """
+
+    def __init__(self, max_entries: int = NEARDUP_MAX_ENTRIES, threshold: float = NEARDUP_THRESHOLD,
+                 permutations: int = NEARDUP_PERMUTATIONS, bands: int = NEARDUP_BANDS,
+                 min_score: float = NEARDUP_MIN_SCORE):
+        if permutations % bands:
+            raise ValueError("permutations must be a multiple of bands")
+        self.max_entries = max(1, max_entries)
+        self.threshold = threshold
+        self.min_score = min_score
+        self.permutations = permutations
+        self.bands = bands
+        self.rows = permutations // bands
+        self._lock = threading.Lock()
+        # entry id -> (signature, verdict), least recently matched first
+        self._entries: "OrderedDict[int, Tuple[Signature, Tuple[bool, float]]]" = OrderedDict()
+        # band key -> entry id, or a list of ids once two entries share it
+        self._buckets: Dict[int, Union[int, List[int]]] = {}
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def signature(self, message: str) -> Optional[Signature]:
+        """MinHash signature of a message, or None if it is too short to compare."""
+        grams = shingles(message)
+        if len(grams) < MIN_SHINGLES:
+            return None
+        # One permutation hashing: each shingle hash lands in one of k bins
+        # (its low bits) and every bin keeps its minimum; one pass instead of
+        # k min-hashes
+        k = self.permutations
+        bins = [EMPTY] * k
+        for gram in grams:
+            h = hash(gram) & MASK64
+            b, v = h % k, h // k
+            if v < bins[b]:
+                bins[b] = v
+        bins = [value if value == EMPTY else value & MASK31 for value in bins]
+        if EMPTY in bins:
+            _densify(bins)
+        return array("I", bins)
+
+    def _band_keys(self, signature: Signature) -> List[int]:
+        """One bucket key per band (band number included, so bands share a dict)."""
+        raw = signature.tobytes()
+        width = self.rows * signature.itemsize
+        return [hash((b, raw[b * width:(b + 1) * width])) for b in range(self.bands)]
+
+    def similarity(self, a: Signature, b: Signature) -> float:
+        """Estimated Jaccard similarity of two signatures."""
+        return sum(x == y for x, y in zip(a, b)) / self.permutations
+
+    def _best_match(self, signature: Signature, keys: List[int]) -> Tuple[Optional[int], float]:
+        candidates: Set[int] = set()
+        for key in keys:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                continue
+            if isinstance(bucket, int):
+                candidates.add(bucket)
+            else:
+                candidates.update(bucket)
+            if len(candidates) >= MAX_CANDIDATES:
+                break
+        best, best_sim = None, 0.0
+        for entry_id in candidates:
+            sim = self.similarity(signature, self._entries[entry_id][0])
+            if sim > best_sim:
+                best, best_sim = entry_id, sim
+        return best, best_sim
+
+    def lookup(self, message: str, signature: Optional[Signature] = None) -> Optional[Tuple[bool, float]]:
+        """
+        Verdict of the closest indexed message, if it is similar enough.
+
+        Args:
+            message (str): The incoming message text.
+            signature (Optional[Signature]): Precomputed signature of message.
+
+        Returns:
+            Optional[Tuple[bool, float]]: The stored (is_scam, probability),
+                or None when no indexed message reaches the threshold.
+        """
+        if signature is None:
+            signature = self.signature(message)
+        if signature is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        keys = self._band_keys(signature)
+        with self._lock:
+            best, sim = self._best_match(signature, keys)
+            if best is None or sim < self.threshold:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best)
+            self.hits += 1
+            return self._entries[best][1]
+
+    def add(self, message: str, verdict: Tuple[bool, float],
+            signature: Optional[Signature] = None) -> bool:
+        """
+        Indexes a classified message if its verdict is a confident scam.
+
+        Returns:
+            bool: True if the message was added.
+        """
+        is_scam, score = verdict
+        if not is_scam or score < self.min_score:
+            return False
+        if signature is None:
+            signature = self.signature(message)
+        if signature is None:
+            return False
+        keys = self._band_keys(signature)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (signature, verdict)
+            buckets = self._buckets
+            for key in keys:
+                bucket = buckets.get(key)
+                if bucket is None:
+                    buckets[key] = entry_id
+                elif isinstance(bucket, int):
+                    buckets[key] = [bucket, entry_id]
+                else:
+                    bucket.append(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._evict()
+        return True
+
+    def _evict(self) -> None:
+        entry_id, (signature, _) = self._entries.popitem(last=False)
+        buckets = self._buckets
+        for key in self._band_keys(signature):
+            bucket = buckets.get(key)
+            if bucket == entry_id:
+                del buckets[key]
+            elif isinstance(bucket, list) and entry_id in bucket:
+                bucket.remove(entry_id)
+                if len(bucket) == 1:
+                    buckets[key] = bucket[0]
+        self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "buckets": len(self._buckets),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+INDEX = NearDupIndex()
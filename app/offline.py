@@ -0,0 +1,225 @@
+"""
+Offline Arthur: persona replies without any LLM.
+
+Used when no provider can answer (all failing, circuit breakers open or no
+API key, see app/providers.py) and on the degraded path of admission
+control. A reply is a template picked by what the scammer is pushing
+(a link, a payment, a code, an ID check, a threat), its slots filled from
+Arthur's little world, and now and then followed by one sentence from a
+word-level Markov chain trained on Arthur's own lines, so a long outage
+does not read like a loop.
+
+Every line follows the persona rules in agent.SYSTEM_PROMPT: short, polite,
+confused by links, never admits to being an AI, and offers a cheque or a
+mailing address instead of a digital transfer.
+"""
+import os
+import random
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+MARKOV_RATE = float(os.getenv("OFFLINE_MARKOV_RATE", "0.4"))
+MARKOV_ORDER = 2
+MIN_MARKOV_WORDS = 6
+MAX_MARKOV_WORDS = 22
+MAX_ATTEMPTS = 8
+
+# Arthur stalling without an LLM (also the training text of the chain)
+STALL_REPLIES = [
+    "Hold on dear, I need to find my reading glasses. Where did I put them...",
+    "Sorry, the kettle was whistling. Can you say that again, slowly?",
+    "Oh my, that sounds important. Let me fetch a pen and write it down.",
+    "Just a moment, my grandson set up this phone and I keep pressing the wrong button.",
+    "I am listening, young man. My typing is slow, please bear with me.",
+    "Now which bank did you say? I have accounts in a few places, you see.",
+]
+
+CORPUS = STALL_REPLIES + [
+    "Which button do I press? Is it the blue one at the top?",
+    "My grandson usually helps me with the computer, but he is at work today.",
+    "I would rather post a cheque. What is your mailing address?",
+    "I have my checkbook here somewhere, let me have a look in the drawer.",
+    "Is it the blue one? The screen just went all grey on me.",
+    "I pressed the link but nothing happened, or maybe I pressed the wrong thing.",
+    "Can you explain it slowly? I wrote the first part down on the back of an envelope.",
+    "My wife used to handle the bank letters, you see, so I am a bit lost.",
+    "Let me write that down, my memory is not what it used to be.",
+    "I do want to sort this out, I just need you to tell me one step at a time.",
+    "The little code came on my phone but the numbers are very small.",
+    "Should I go down to the bank in person? It is only a short walk from here.",
+    "I was an accountant for forty years, so I like to have things on paper.",
+    "Do you have a mailing address? I always pay by cheque, it is safer.",
+    "Oh dear, the screen is asking me something again and I do not know what it means.",
+]
+
+TOPICS: List[Tuple[str, "re.Pattern"]] = [
+    ("credentials", re.compile(r"\b(otp|pin|password|passcode|cvv|code|card number)\b", re.I)),
+    ("link", re.compile(r"https?://|www\.|\b(link|click|app|download|install|website|apk)\b", re.I)),
+    ("payment", re.compile(r"\b(pay|fee|fees|transfer|upi|money|amount|deposit|refund|charge|rs|inr|usd)\b|[₹$£]", re.I)),
+    ("identity", re.compile(r"\b(kyc|aadhaar|aadhar|pan|verify|verification|id|identity|documents?)\b", re.I)),
+    ("threat", re.compile(r"\b(block(ed)?|suspend(ed)?|police|arrest|legal|penalty|urgent|immediately|expire[sd]?)\b", re.I)),
+]
+
+TEMPLATES: Dict[str, List[str]] = {
+    "link": [
+        "Which button do I press? Is it the {color} one?",
+        "I clicked on it but the screen went {color}. Did I break something?",
+        "My {relative} told me never to press links, but you seem nice. Which part do I press?",
+        "The link is very small on my screen, can you tell me what it says, slowly?",
+        "Is it the {color} writing or the underlined bit? I have my {thing} on now.",
+    ],
+    "payment": [
+        "I would rather post a cheque. What is your mailing address?",
+        "Let me find my checkbook, it is in the {place} somewhere. Who do I make it out to?",
+        "My {relative} does the online banking for me. Can I send a cheque in the post instead?",
+        "How much did you say? I will write it down on the back of an envelope.",
+        "I do not trust these phone payments. Could you give me an address for a cheque?",
+    ],
+    "credentials": [
+        "A code? The numbers on my phone are so small, let me find my {thing}.",
+        "My {relative} said never to read out the code, but you are from the bank, aren't you?",
+        "Which code do you mean, the one on the card or the one on the little screen?",
+        "Hold on, the phone is in the {place}. Don't go anywhere, young man.",
+    ],
+    "identity": [
+        "Verify? I have my papers in a folder in the {place}, give me a moment.",
+        "Do you need my card or the letter? I keep everything in the {place}.",
+        "My {relative} set up the account for me. What was it you needed me to check?",
+        "I can bring my documents to the branch. Which one is yours?",
+    ],
+    "threat": [
+        "Oh dear, blocked? I have had that account since 1971, what do I do now?",
+        "That sounds very serious. Let me fetch my {thing} and write this down.",
+        "Please don't shout, young man, I want to help. Tell me one step at a time.",
+        "Oh my, I don't want any trouble. Should I call my {relative} first?",
+    ],
+    "general": [
+        "Sorry, could you say that again? My {thing} is playing up.",
+        "I am listening, dear. My typing is slow, please bear with me.",
+        "Now what was it you wanted me to do? I wrote some of it on a notepad.",
+        "Let me ask my {relative} about this, they know all about computers.",
+        "Just a moment, the kettle is on. What were you saying?",
+    ],
+}
+
+SLOTS: Dict[str, List[str]] = {
+    "color": ["blue", "green", "grey", "red"],
+    "relative": ["grandson", "granddaughter", "nephew", "neighbour"],
+    "thing": ["reading glasses", "hearing aid", "pen", "magnifying glass"],
+    "place": ["desk drawer", "kitchen", "bureau", "hall cupboard"],
+}
+
+# Words Arthur never says, whatever the chain stitches together
+FORBIDDEN = re.compile(r"\b(ai|bot|robot|model|assistant|language|scam|honeypot)\b", re.I)
+SENTENCE_END = re.compile(r"[.?!]$")
+SLOT = re.compile(r"\{(\w+)\}")
+
+
+def topic_of(message: str) -> str:
+    """The first topic whose pattern matches the message, else 'general'."""
+    for topic, pattern in TOPICS:
+        if pattern.search(message):
+            return topic
+    return "general"
+
+
+class MarkovChain:
+    """
+    Word-level Markov chain of fixed order over a list of lines.
+
+    States are the previous `order` words; a line starts from a state padded
+    with empty strings and ends on a word closing a sentence.
+    """
+
+    def __init__(self, lines: Sequence[str], order: int = MARKOV_ORDER):
+        self.order = order
+        self._next: Dict[Tuple[str, ...], List[str]] = defaultdict(list)
+        self._lines = set()
+        for line in lines:
+            self.learn(line)
+
+    def learn(self, line: str) -> None:
+        """Adds one line's transitions (a line is split into its sentences)."""
+        for sentence in re.split(r"(?<=[.?!])\s+", line.strip()):
+            words = sentence.split()
+            if not words:
+                continue
+            self._lines.add(" ".join(words))
+            state = ("",) * self.order
+            for word in words:
+                self._next[state].append(word)
+                state = state[1:] + (word,)
+
+    def sentence(self, rng: random.Random, max_words: int = MAX_MARKOV_WORDS) -> Optional[str]:
+        """One generated sentence, or None if the walk ran too long."""
+        state = ("",) * self.order
+        words: List[str] = []
+        while len(words) < max_words:
+            choices = self._next.get(state)
+            if not choices:
+                break
+            word = rng.choice(choices)
+            words.append(word)
+            if SENTENCE_END.search(word):
+                return " ".join(words)
+            state = state[1:] + (word,)
+        return None
+
+    def is_copy(self, sentence: str) -> bool:
+        """True if the sentence is verbatim one of the training sentences."""
+        return sentence in self._lines
+
+
+class OfflinePersona:
+    """Arthur's replies from templates and the Markov chain."""
+
+    def __init__(self, corpus: Sequence[str] = CORPUS, templates: Dict[str, List[str]] = TEMPLATES,
+                 slots: Dict[str, List[str]] = SLOTS, markov_rate: float = MARKOV_RATE,
+                 rng: Optional[random.Random] = None):
+        self.templates = templates
+        self.slots = slots
+        self.markov_rate = markov_rate
+        self.chain = MarkovChain(corpus)
+        self.rng = rng or random.Random()
+        self.replies = 0
+
+    def _fill(self, template: str) -> str:
+        return SLOT.sub(lambda m: self.rng.choice(self.slots[m.group(1)]), template)
+
+    def _markov(self) -> Optional[str]:
+        """A fresh sentence (not a corpus copy) of sensible length, if one turns up."""
+        for _ in range(MAX_ATTEMPTS):
+            sentence = self.chain.sentence(self.rng)
+            if (sentence and len(sentence.split()) >= MIN_MARKOV_WORDS
+                    and not self.chain.is_copy(sentence) and not FORBIDDEN.search(sentence)):
+                return sentence
+        return None
+
+    def reply(self, message: str, avoid: Optional[str] = None) -> str:
+        """
+        A persona-consistent reply to a scammer message.
+
+        Args:
+            message (str): The scammer message.
+            avoid (Optional[str]): A reply not to repeat (e.g. Arthur's last one).
+
+        Returns:
+            str: One or two short sentences in Arthur's voice.
+        """
+        self.replies += 1
+        candidates = self.templates.get(topic_of(message)) or self.templates["general"]
+        reply = avoid
+        for _ in range(MAX_ATTEMPTS):
+            reply = self._fill(self.rng.choice(candidates))
+            # Two sentences at most: only single-sentence templates get a Markov tail
+            if self.rng.random() < self.markov_rate and len(re.findall(r"[.?!](\s|$)", reply)) == 1:
+                extra = self._markov()
+                if extra:
+                    reply = f"{reply} {extra}"
+            if reply != avoid:
+                break
+        return reply
+
+
+ARTHUR = OfflinePersona()
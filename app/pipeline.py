@@ -0,0 +1,272 @@
+"""
+Tiered early-exit threat detection pipeline.
+
+Stages run cheapest first. Each one returns a scam score in [0, 1], or None
+when it has no opinion. A score at or above the stage's `scam_at` (or at or
+below its `clean_at`) ends the pipeline right there; anything in between
+falls through to the next, more expensive stage. If no stage exits, the last
+score seen is compared with that stage's `threshold`.
+
+Thresholds are read from the environment (PIPELINE_<STAGE>_SCAM_AT,
+PIPELINE_<STAGE>_CLEAN_AT, PIPELINE_<STAGE>_THRESHOLD); tune_pipeline.py
+picks values offline from labelled traffic.
+"""
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app import agent, indicators, memory, metrics, security, utils
+
+# Set PIPELINE_LLM_ADJUDICATION=1 to let Groq decide the model's grey zone
+LLM_ADJUDICATION = os.getenv("PIPELINE_LLM_ADJUDICATION", "0") == "1"
+
+ScoreFunc = Callable[[str, str, dict], Awaitable[Optional[float]]]
+# (session_id, message, intelligence) items -> one score (or None) per item
+Item = Tuple[str, str, dict]
+BatchScoreFunc = Callable[[List[Item]], Awaitable[List[Optional[float]]]]
+Decision = Tuple[bool, str, float, Optional["Stage"]]
+
+
+def _env_float(name: str, default: Optional[float]) -> Optional[float]:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    if value.lower() == "none":
+        return None
+    return float(value)
+
+
+class Stage:
+    """
+    One detection tier with its early-exit band and counters.
+
+    `cost` is a rough per-call cost in milliseconds; stages run in cost order.
+    `record` marks stages whose scam verdicts are saved to the indicator DB
+    (the model and LLM tiers only).
+    `score_batch`, if given, scores many items in one call (see run_batch).
+    """
+
+    def __init__(self, name: str, source: str, score: ScoreFunc, cost: float,
+                 scam_at: Optional[float] = None, clean_at: Optional[float] = None,
+                 threshold: float = 0.5, record: bool = False,
+                 score_batch: Optional[BatchScoreFunc] = None):
+        prefix = f"PIPELINE_{name.upper()}_"
+        self.name = name
+        self.source = source
+        self.score = score
+        self.cost = cost
+        self.scam_at = _env_float(prefix + "SCAM_AT", scam_at)
+        self.clean_at = _env_float(prefix + "CLEAN_AT", clean_at)
+        self.threshold = _env_float(prefix + "THRESHOLD", threshold)
+        self.record = record
+        self.score_batch = score_batch
+        # Microsecond tiers are covered by total_seconds; a histogram would
+        # cost them more than they take
+        self.latency = metrics.PIPELINE_STAGE_SECONDS.labels(name) if cost >= 1.0 else None
+
+        self.runs = 0
+        self.abstained = 0
+        self.scam_exits = 0
+        self.clean_exits = 0
+        self.total_seconds = 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "cost": self.cost,
+            "scam_at": self.scam_at,
+            "clean_at": self.clean_at,
+            "runs": self.runs,
+            "abstained": self.abstained,
+            "scam_exits": self.scam_exits,
+            "clean_exits": self.clean_exits,
+            "exit_rate": round((self.scam_exits + self.clean_exits) / self.runs, 4) if self.runs else 0.0,
+            "avg_ms": round(self.total_seconds / self.runs * 1000, 3) if self.runs else 0.0,
+        }
+
+
+class Pipeline:
+    """Runs stages in cost order until one of them is confident."""
+
+    def __init__(self, stages: List[Stage]):
+        self.stages = sorted(stages, key=lambda stage: stage.cost)
+        self.decisions = 0
+        self.fallthrough = 0
+
+    async def run(self, session_id: str, message: str, intelligence: dict,
+                  max_cost: Optional[float] = None) -> Tuple[bool, str, float, Optional[Stage]]:
+        """
+        Decides whether a message is a threat.
+
+        Args:
+            max_cost (Optional[float]): Skip stages costing more than this
+                (the degraded path under overload); None runs every stage.
+
+        Returns:
+            Tuple[bool, str, float, Optional[Stage]]: (threat_detected,
+            threat_source, confidence, deciding stage or None if clean by default)
+        """
+        self.decisions += 1
+        last: Optional[Tuple[Stage, float]] = None
+
+        for stage in self.stages:
+            if max_cost is not None and stage.cost > max_cost:
+                break
+            start = time.perf_counter()
+            score = await stage.score(session_id, message, intelligence)
+            elapsed = time.perf_counter() - start
+            stage.total_seconds += elapsed
+            if stage.latency is not None:
+                stage.latency.observe(elapsed)
+            stage.runs += 1
+
+            if score is None:
+                stage.abstained += 1
+                continue
+            last = (stage, score)
+            if stage.scam_at is not None and score >= stage.scam_at:
+                stage.scam_exits += 1
+                return True, stage.source, score, stage
+            if stage.clean_at is not None and score <= stage.clean_at:
+                stage.clean_exits += 1
+                return False, "clean", score, stage
+
+        self.fallthrough += 1
+        return self._fallback(last)
+
+    @staticmethod
+    def _fallback(last: Optional[Tuple["Stage", float]]) -> Decision:
+        if last is None:
+            return False, "clean", 0.0, None
+        stage, score = last
+        if score >= stage.threshold:
+            return True, stage.source, score, stage
+        return False, "clean", score, stage
+
+    async def run_batch(self, items: List[Item]) -> List[Decision]:
+        """
+        Decides many messages at once, stage by stage.
+
+        Each stage scores every item still undecided in one call (its
+        `score_batch`, else `score` per item), so the model sees whole
+        batches. Decisions are identical to calling run() per item.
+
+        Args:
+            items (List[Item]): (session_id, message, intelligence) tuples.
+
+        Returns:
+            List[Decision]: One run()-style result per item, in input order.
+        """
+        self.decisions += len(items)
+        results: List[Optional[Decision]] = [None] * len(items)
+        last: List[Optional[Tuple[Stage, float]]] = [None] * len(items)
+        open_items = list(range(len(items)))
+
+        for stage in self.stages:
+            if not open_items:
+                break
+            batch = [items[i] for i in open_items]
+            start = time.perf_counter()
+            if stage.score_batch is not None:
+                scores = await stage.score_batch(batch)
+            else:
+                scores = [await stage.score(*item) for item in batch]
+            stage.total_seconds += time.perf_counter() - start
+            stage.runs += len(batch)
+
+            still_open = []
+            for i, score in zip(open_items, scores):
+                if score is None:
+                    stage.abstained += 1
+                    still_open.append(i)
+                    continue
+                last[i] = (stage, score)
+                if stage.scam_at is not None and score >= stage.scam_at:
+                    stage.scam_exits += 1
+                    results[i] = (True, stage.source, score, stage)
+                elif stage.clean_at is not None and score <= stage.clean_at:
+                    stage.clean_exits += 1
+                    results[i] = (False, "clean", score, stage)
+                else:
+                    still_open.append(i)
+            open_items = still_open
+
+        self.fallthrough += len(open_items)
+        for i in open_items:
+            results[i] = self._fallback(last[i])
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "decisions": self.decisions,
+            "fallthrough": self.fallthrough,
+            "stages": {stage.name: stage.stats() for stage in self.stages},
+        }
+
+
+# --- Stage scorers ---
+
+async def session_score(session_id: str, message: str, intelligence: dict) -> Optional[float]:
+    """1.0 for an ongoing engaged session, else no opinion."""
+    return 1.0 if await memory.run_blocking(memory.get_session, session_id) else None
+
+
+async def indicator_score(session_id: str, message: str, intelligence: dict) -> Optional[float]:
+    """1.0 if any extracted indicator is already known, else no opinion."""
+    return 1.0 if indicators.INDEX.match(intelligence) else None
+
+
+async def heuristic_score(session_id: str, message: str, intelligence: dict) -> Optional[float]:
+    """Keyword / indicator score from utils.heuristic_score."""
+    return utils.heuristic_score(intelligence)
+
+
+async def model_score(session_id: str, message: str, intelligence: dict) -> Optional[float]:
+    """Guard model probability; no opinion while the model is warming up."""
+    if not security.is_ready():
+        return None
+    _, score = await security.predict_scam(message)
+    return score
+
+
+async def model_score_batch(items: List[Item]) -> List[Optional[float]]:
+    """model_score for a whole batch, sent to the engine in one go."""
+    if not security.is_ready():
+        return [None] * len(items)
+    verdicts = await security.predict_scam_batch([message for _, message, _ in items])
+    return [score for _, score in verdicts]
+
+
+async def llm_score(session_id: str, message: str, intelligence: dict) -> Optional[float]:
+    """Groq adjudication for the grey zone the model left open."""
+    return await agent.adjudicate(message)
+
+
+async def llm_score_batch(items: List[Item]) -> List[Optional[float]]:
+    """llm_score for a batch; requests run concurrently (bounded by agent.LLM_SLOTS)."""
+    return await asyncio.gather(*(llm_score(*item) for item in items))
+
+
+def build_default_pipeline() -> Pipeline:
+    """session -> indicator index -> heuristic -> model (-> LLM adjudication)."""
+    model_band = (0.8, 0.2) if LLM_ADJUDICATION else (None, None)
+    stages = [
+        Stage("session", "ongoing_session", session_score, cost=0.001, scam_at=1.0),
+        Stage("indicators", "known_database", indicator_score, cost=0.01, scam_at=1.0),
+        # Conservative default: only messages with no indicator and no keyword
+        # (score 0.0) exit here; tune_pipeline.py widens the band from traffic.
+        # Not recorded: one link and one keyword reach the threshold, and a
+        # recorded domain would flag every later message that mentions it
+        Stage("heuristic", "heuristic", heuristic_score, cost=0.05,
+              scam_at=None, clean_at=0.0, threshold=utils.HEURISTIC_THRESHOLD),
+        Stage("model", "ai_guard", model_score, cost=10.0,
+              scam_at=model_band[0], clean_at=model_band[1],
+              threshold=security.SCAM_THRESHOLD, record=True, score_batch=model_score_batch),
+    ]
+    if LLM_ADJUDICATION:
+        stages.append(Stage("llm", "llm_adjudicator", llm_score, cost=500.0,
+                            scam_at=0.5, clean_at=0.5, record=True, score_batch=llm_score_batch))
+    return Pipeline(stages)
+
+
+PIPELINE = build_default_pipeline()
@@ -0,0 +1,370 @@
+"""
+LLM providers for Arthur: an ordered list of chat-completion backends with
+hedging, failover and circuit breakers.
+
+Every backend speaks the OpenAI-compatible chat API through the Groq
+client. A call goes to the first provider whose breaker is closed; if it
+fails, the next provider is tried straight away, and after a full round of
+failures the round is retried with jittered backoff (LLM_MAX_RETRIES rounds
+at most). If a request is still running after LLM_HEDGE_AFTER seconds, one
+hedged copy goes to the next provider and whichever answers first wins; the
+loser is cancelled. Hedges are capped at LLM_MAX_HEDGES in flight so a slow
+backend cannot double the load on the others.
+
+A provider that fails LLM_BREAKER_FAILURES times in a row is skipped for
+LLM_BREAKER_RESET seconds, then gets a single probe request: success
+closes the breaker, failure opens it again. With every breaker open a call
+fails at once, and the caller falls back to offline replies (app/offline.py).
+
+Providers come from LLM_PROVIDERS, a comma-separated list of
+`model|base_url|API_KEY_ENV` entries (base URL and key variable optional:
+Groq's endpoint and GROQ_API_KEY). By default that is GROQ_MODEL, then
+LLM_FALLBACK_MODEL on the same endpoint.
+
+Everything here runs on the event loop thread, so no locking is needed.
+"""
+import asyncio
+import os
+import random
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import groq
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Client Settings (overridable from the environment)
+API_KEY = os.getenv("GROQ_API_KEY")
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")  # None -> Groq's public endpoint
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+# Smaller, faster model tried when GROQ_MODEL fails or is slow ("" to disable)
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "llama-3.1-8b-instant")
+LLM_PROVIDERS = os.getenv("LLM_PROVIDERS", "")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "20"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.25"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "4"))
+# Seconds before a hedged second request is sent (0 disables hedging)
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "2.0"))
+LLM_MAX_HEDGES = int(os.getenv("LLM_MAX_HEDGES", str(max(1, LLM_MAX_CONNECTIONS // 4))))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+
+RETRYABLE_ERRORS = (
+    groq.APIConnectionError,   # includes APITimeoutError
+    groq.RateLimitError,
+    groq.InternalServerError,
+)
+
+T = TypeVar("T")
+
+
+class ProvidersUnavailable(Exception):
+    """No provider is configured, or every circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker: closed -> open after `failures` errors in
+    a row, half-open (one probe at a time) once `reset_after` seconds have
+    passed, closed again on the first success.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failures: int = LLM_BREAKER_FAILURES, reset_after: float = LLM_BREAKER_RESET):
+        self.threshold = max(1, failures)
+        self.reset_after = reset_after
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.trips = 0
+
+    def available(self, now: Optional[float] = None) -> bool:
+        """True if allow() would let a request through (without taking the probe)."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            now = time.monotonic() if now is None else now
+            return now - self.opened_at >= self.reset_after
+        return not self.probing
+
+    def allow(self, now: Optional[float] = None) -> bool:
+        """Lets a request through; past the reset time it becomes the probe."""
+        if not self.available(now):
+            return False
+        if self.state != self.CLOSED:
+            self.state = self.HALF_OPEN
+            self.probing = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self.probing = False
+
+    def record_failure(self, now: Optional[float] = None) -> None:
+        self.failures += 1
+        self.probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+            if self.state != self.OPEN:
+                self.trips += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic() if now is None else now
+
+    def release(self) -> None:
+        """Gives back the probe of a request that was cancelled, not failed."""
+        self.probing = False
+
+
+class Provider:
+    """One chat-completion backend: a client, a model and its breaker."""
+
+    def __init__(self, name: str, client, model: str, breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.client = client
+        self.model = model
+        self.breaker = breaker or CircuitBreaker()
+        self.outcomes = {"ok": 0, "error": 0, "cancelled": 0}
+        self.hedges = 0
+
+    def create(self, **kwargs) -> Awaitable:
+        return self.client.chat.completions.create(model=self.model, **kwargs)
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "breaker": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "trips": self.breaker.trips,
+            "requests": dict(self.outcomes),
+            "hedges": self.hedges,
+        }
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for the given retry attempt (0-based)."""
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+
+class ProviderPool:
+    """The ordered providers and the hedge / failover logic around them."""
+
+    def __init__(self, providers: List[Provider], hedge_after: float = LLM_HEDGE_AFTER,
+                 max_hedges: int = LLM_MAX_HEDGES, max_retries: int = LLM_MAX_RETRIES):
+        self.providers = providers
+        self.hedge_after = hedge_after
+        self.max_hedges = max_hedges
+        self.max_retries = max_retries
+        self.hedges_in_flight = 0
+        self.counts = {"calls": 0, "failovers": 0, "hedges": 0, "hedge_wins": 0, "unavailable": 0}
+
+    def available(self) -> bool:
+        """True if at least one provider would take a request now."""
+        return any(provider.breaker.available() for provider in self.providers)
+
+    def _plan(self):
+        """Providers in try order: each round walks the list once."""
+        for attempt in range(self.max_retries + 1):
+            for provider in self.providers:
+                yield attempt, provider
+
+    async def _attempt(self, provider: Provider, attempt: Callable[[Provider], Awaitable[T]],
+                       hedge: bool) -> T:
+        if hedge:
+            self.hedges_in_flight += 1
+            provider.hedges += 1
+        try:
+            result = await attempt(provider)
+        except asyncio.CancelledError:
+            provider.outcomes["cancelled"] += 1
+            provider.breaker.release()
+            raise
+        except Exception:
+            provider.outcomes["error"] += 1
+            provider.breaker.record_failure()
+            raise
+        finally:
+            if hedge:
+                self.hedges_in_flight -= 1
+        provider.outcomes["ok"] += 1
+        provider.breaker.record_success()
+        return result
+
+    async def race(self, attempt: Callable[[Provider], Awaitable[T]], hedge: bool = True) -> T:
+        """
+        Runs attempt(provider) until one succeeds: failing over down the
+        provider list, hedging a slow request once, retrying rounds of
+        transient failures with backoff.
+
+        Args:
+            attempt: Makes one request to the given provider.
+            hedge (bool): Allow a hedged second request.
+
+        Returns:
+            The first successful attempt's result.
+
+        Raises:
+            ProvidersUnavailable: No provider would take the request.
+            Exception: The last provider error once every attempt failed.
+        """
+        self.counts["calls"] += 1
+        plan = list(self._plan())
+        position = 0
+        tasks: Dict[asyncio.Task, bool] = {}
+        last_error: Optional[Exception] = None
+        last_round = 0
+        hedged = not hedge or self.hedge_after <= 0
+
+        async def launch(as_hedge: bool) -> bool:
+            nonlocal position, last_round
+            while position < len(plan):
+                attempt_round, provider = plan[position]
+                if attempt_round > last_round and not as_hedge:
+                    # A new round: only worth it for transient errors, after a pause
+                    if not isinstance(last_error, RETRYABLE_ERRORS):
+                        return False
+                    delay = backoff_delay(attempt_round - 1)
+                    print(f"LLM retry {attempt_round}/{self.max_retries} in {delay:.2f}s: {last_error}")
+                    await asyncio.sleep(delay)
+                # A hedge may run into the next round (with one provider it is a second copy)
+                last_round = max(last_round, attempt_round)
+                position += 1
+                if provider.breaker.allow():
+                    task = asyncio.ensure_future(self._attempt(provider, attempt, as_hedge))
+                    tasks[task] = as_hedge
+                    return True
+            return False
+
+        if not await launch(False):
+            self.counts["unavailable"] += 1
+            raise ProvidersUnavailable("no LLM provider available")
+        try:
+            while tasks:
+                wait = None if hedged else self.hedge_after
+                done, _ = await asyncio.wait(tasks, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Latency budget spent: one hedged copy, if the cap allows
+                    hedged = True
+                    if self.hedges_in_flight < self.max_hedges and await launch(True):
+                        self.counts["hedges"] += 1
+                    continue
+                for task in done:
+                    was_hedge = tasks.pop(task)
+                    if task.exception() is None:
+                        if was_hedge:
+                            self.counts["hedge_wins"] += 1
+                        return task.result()
+                    last_error = task.exception()
+                if not tasks:
+                    self.counts["failovers"] += 1
+                    if not await launch(False):
+                        break
+            raise last_error or ProvidersUnavailable("no LLM provider available")
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                # Let the losers close their connections before returning
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def complete(self, messages: List[dict], hedge: bool = True, **kwargs) -> str:
+        """The reply text of a chat completion, from whichever provider answers first."""
+        async def attempt(provider: Provider) -> str:
+            completion = await provider.create(messages=messages, **kwargs)
+            return completion.choices[0].message.content
+
+        return await self.race(attempt, hedge)
+
+    async def stream(self, messages: List[dict], hedge: bool = True, **kwargs) -> AsyncIterator[str]:
+        """
+        Streams a chat completion as text fragments.
+
+        The race (failover and hedging) covers opening the stream and its
+        first fragment; once a provider has produced text the stream stays
+        with it, and a later failure just ends the stream.
+        """
+        async def attempt(provider: Provider) -> Tuple[str, AsyncIterator]:
+            stream = await provider.create(messages=messages, stream=True, **kwargs)
+            try:
+                fragments = stream.__aiter__()
+                async for chunk in fragments:
+                    fragment = chunk.choices[0].delta.content if chunk.choices else None
+                    if fragment:
+                        return fragment, fragments
+                return "", fragments
+            except BaseException:
+                await stream.close()
+                raise
+
+        first, fragments = await self.race(attempt, hedge)
+        if first:
+            yield first
+        async for chunk in fragments:
+            fragment = chunk.choices[0].delta.content if chunk.choices else None
+            if fragment:
+                yield fragment
+
+    def stats(self) -> dict:
+        return {
+            **self.counts,
+            "hedge_after_s": self.hedge_after,
+            "hedges_in_flight": self.hedges_in_flight,
+            "providers": {provider.name: provider.stats() for provider in self.providers},
+        }
+
+
+def parse_providers(spec: str) -> List[Tuple[str, Optional[str], str]]:
+    """(model, base_url, key env) for each `model|base_url|API_KEY_ENV` entry."""
+    entries = []
+    for entry in spec.split(","):
+        parts = [part.strip() for part in entry.split("|")]
+        if not parts[0]:
+            continue
+        base_url = parts[1] if len(parts) > 1 and parts[1] else GROQ_BASE_URL
+        key_env = parts[2] if len(parts) > 2 and parts[2] else "GROQ_API_KEY"
+        entries.append((parts[0], base_url, key_env))
+    return entries
+
+
+def make_client(base_url: Optional[str], api_key: str, max_connections: int = LLM_MAX_CONNECTIONS):
+    """A pooled async client (retries are ours, not the SDK's)."""
+    return groq.AsyncGroq(
+        api_key=api_key,
+        base_url=base_url,
+        max_retries=0,
+        http_client=httpx.AsyncClient(
+            timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        ),
+    )
+
+
+def load_pool() -> ProviderPool:
+    """Builds the pool from LLM_PROVIDERS (or GROQ_MODEL + LLM_FALLBACK_MODEL)."""
+    spec = LLM_PROVIDERS or ",".join(m for m in (GROQ_MODEL, LLM_FALLBACK_MODEL) if m)
+    clients = {}
+    providers = []
+    for model, base_url, key_env in parse_providers(spec):
+        api_key = os.getenv(key_env)
+        if not api_key:
+            print(f"LLM provider {model} skipped: {key_env} is not set")
+            continue
+        # Models on the same endpoint share one connection pool
+        if (base_url, api_key) not in clients:
+            try:
+                clients[(base_url, api_key)] = make_client(base_url, api_key)
+            except Exception as e:
+                print(f"LLM Client Initialization Error ({model}): {e}")
+                continue
+        name = model if base_url == GROQ_BASE_URL else f"{model}@{base_url}"
+        providers.append(Provider(name, clients[(base_url, api_key)], model))
+    return ProviderPool(providers)
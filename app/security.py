@@ -1,29 +1,581 @@
 import os
-from transformers import AutoModelForSequenceClassification, AutoTokenizer
+import asyncio
+import math
+import queue
+import re
+import threading
+import time
+from array import array
+from concurrent.futures import Future
+from typing import List, Optional, Sequence, Tuple
+
+from app import cache, metrics, neardup
+
+# NOTE: torch / transformers / onnxruntime are imported lazily inside the
+# loaders so that importing this module (and app.main) stays cheap.
 
 # 1. Define Paths
 # Uses relative path so it works on any computer
 local_model_path = os.path.join(os.path.dirname(__file__), "../ml_assets/scam_model")
 
 # CHANGE THIS LINE TO YOUR NEW ID:
-cloud_model_name = "RajB1003/honey-pot-guard" 
+cloud_model_name = "RajB1003/honey-pot-guard"
+
+# Inference Settings (overridable from the environment)
+MAX_BATCH_SIZE = int(os.getenv("GUARD_MAX_BATCH_SIZE", "8"))
+MAX_WAIT_MS = float(os.getenv("GUARD_MAX_WAIT_MS", "5"))
+MAX_SEQ_LENGTH = int(os.getenv("GUARD_MAX_SEQ_LENGTH", "256"))
+SCAM_THRESHOLD = float(os.getenv("GUARD_SCAM_THRESHOLD", "0.5"))
+
+# Long messages: "window" scores overlapping MAX_SEQ_LENGTH token windows and
+# pools them ("max" or "attention"); "truncate" keeps only the head
+CHUNKING = os.getenv("GUARD_CHUNKING", "window").lower()
+WINDOW_OVERLAP = int(os.getenv("GUARD_WINDOW_OVERLAP", "64"))
+WINDOW_POOLING = os.getenv("GUARD_WINDOW_POOLING", "max").lower()
+WINDOW_TEMPERATURE = float(os.getenv("GUARD_WINDOW_TEMPERATURE", "0.1"))
+MAX_WINDOWS = int(os.getenv("GUARD_MAX_WINDOWS", "16"))
+
+# Backend Selection: "torch" (fp32), "int8" (dynamic quantized), "onnx", or
+# "stub" (no model; fixed latency, heuristic scores - for offline load tests)
+BACKEND = os.getenv("GUARD_BACKEND", "torch").lower()
+STUB_BATCH_MS = float(os.getenv("GUARD_STUB_BATCH_MS", "5"))
+STUB_ITEM_MS = float(os.getenv("GUARD_STUB_ITEM_MS", "0.5"))
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), "../ml_assets")
+INT8_MODEL_PATH = os.path.join(ASSETS_DIR, "scam_model_int8.pt")
+ONNX_MODEL_PATH = os.path.join(ASSETS_DIR, "scam_model.onnx")
 
 # 2. Smart Loader
-def load_security_model():    
+def model_source() -> str:
+    """Returns the local checkpoint folder if present, else the hub id."""
     # CHECK: Does the local folder exist?
     if os.path.exists(local_model_path) and os.listdir(local_model_path):
         print(f"Found local model at: {local_model_path}")
-        return (
-            AutoTokenizer.from_pretrained(local_model_path),
-            AutoModelForSequenceClassification.from_pretrained(local_model_path)
+        return local_model_path
+    # This now downloads YOUR specific model, not the generic one
+    print(f"Local model not found. Downloading {cloud_model_name}")
+    return cloud_model_name
+
+
+def load_security_model():
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    source = model_source()
+    return (
+        AutoTokenizer.from_pretrained(source),
+        AutoModelForSequenceClassification.from_pretrained(source)
+    )
+
+
+def scam_label_index(config) -> int:
+    """Finds the output column of the 'scam' class from the model config."""
+    label2id = {str(k).lower(): v for k, v in (config.label2id or {}).items()}
+    for name in ("scam", "spam", "phishing", "label_1"):
+        if name in label2id:
+            return int(label2id[name])
+    return 1
+
+
+def quantize_model(model):
+    """Applies dynamic int8 quantization to every Linear layer."""
+    import torch
+
+    return torch.quantization.quantize_dynamic(
+        model.eval(), {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+# 3. Runtime Backends
+# Whitespace "tokens" of the stub backend
+WORD = re.compile(r'\S+')
+
+
+def _tokenize(tokenizer, texts: List[str]) -> List[List[int]]:
+    return tokenizer(texts, add_special_tokens=False, truncation=False, verbose=False)["input_ids"]
+
+
+def _pad_windows(tokenizer, windows: List[Sequence[int]], tensors: str):
+    """Adds special tokens to each window and pads them into one batch."""
+    ids = [tokenizer.build_inputs_with_special_tokens(list(window)) for window in windows]
+    return tokenizer.pad({"input_ids": ids}, padding=True, return_tensors=tensors)
+
+
+class TorchBackend:
+    """Full-precision PyTorch runtime."""
+
+    name = "torch"
+
+    def __init__(self, tokenizer, model):
+        self.tokenizer = tokenizer
+        self.model = model.eval()
+        self.scam_index = scam_label_index(model.config)
+        self.window_size = MAX_SEQ_LENGTH - tokenizer.num_special_tokens_to_add()
+
+    def tokenize(self, texts: List[str]) -> List[List[int]]:
+        """Token ids per text, without special tokens or truncation."""
+        return _tokenize(self.tokenizer, texts)
+
+    def classify_batch(self, texts: List[str]) -> List[float]:
+        """Runs one padded forward pass and returns the scam probability per text."""
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=MAX_SEQ_LENGTH,
+            return_tensors="pt",
         )
-    else:
-        # This now downloads YOUR specific model, not the generic one
-        print(f"Local model not found. Downloading {cloud_model_name}")
-        return (
-            AutoTokenizer.from_pretrained(cloud_model_name),
-            AutoModelForSequenceClassification.from_pretrained(cloud_model_name)
+        return self._forward(encoded)
+
+    def classify_ids(self, windows: List[Sequence[int]]) -> List[float]:
+        """Like classify_batch, for token windows of at most window_size ids."""
+        return self._forward(_pad_windows(self.tokenizer, windows, "pt"))
+
+    def _forward(self, encoded) -> List[float]:
+        import torch
+
+        with torch.inference_mode():
+            logits = self.model(**encoded).logits
+            probs = torch.softmax(logits, dim=-1)[:, self.scam_index]
+        return probs.tolist()
+
+
+class StubBackend:
+    """
+    Model-free stand-in: sleeps like a forward pass would and scores with
+    the keyword/indicator heuristic. Lets load tests run without weights.
+
+    Whitespace-separated words stand in for tokens, so long messages are
+    truncated (or windowed) at MAX_SEQ_LENGTH the way the model's are.
+    """
+
+    name = "stub"
+
+    def __init__(self, batch_ms: float = STUB_BATCH_MS, item_ms: float = STUB_ITEM_MS):
+        self.batch_s = batch_ms / 1000.0
+        self.item_s = item_ms / 1000.0
+        self.window_size = MAX_SEQ_LENGTH - 2
+        self._vocab = {}
+        self._words: List[str] = []
+        self._vocab_lock = threading.Lock()
+
+    def tokenize(self, texts: List[str]) -> List[List[int]]:
+        out = []
+        with self._vocab_lock:
+            for text in texts:
+                ids = []
+                for word in WORD.findall(text):
+                    token = self._vocab.get(word)
+                    if token is None:
+                        token = self._vocab[word] = len(self._words)
+                        self._words.append(word)
+                    ids.append(token)
+                out.append(ids)
+        return out
+
+    def classify_batch(self, texts: List[str]) -> List[float]:
+        return self._score([" ".join(WORD.findall(text)[:self.window_size]) for text in texts])
+
+    def classify_ids(self, windows: List[Sequence[int]]) -> List[float]:
+        words = self._words
+        return self._score([" ".join(words[token] for token in window) for window in windows])
+
+    def _score(self, texts: List[str]) -> List[float]:
+        from app import utils
+
+        time.sleep(self.batch_s + self.item_s * len(texts))
+        return [utils.heuristic_score(intel) for intel in utils.extract_intelligence_batch(texts)]
+
+
+class QuantizedTorchBackend(TorchBackend):
+    """Dynamic int8 PyTorch runtime. Uses the exported module when available."""
+
+    name = "int8"
+
+    def __init__(self, tokenizer, model, prequantized: bool = False):
+        super().__init__(tokenizer, model if prequantized else quantize_model(model))
+
+
+class OnnxBackend:
+    """ONNX Runtime session over the exported graph."""
+
+    name = "onnx"
+
+    def __init__(self, tokenizer, onnx_path: str, config):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            onnx_path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = tokenizer
+        self.scam_index = scam_label_index(config)
+        self.window_size = MAX_SEQ_LENGTH - tokenizer.num_special_tokens_to_add()
+
+    def tokenize(self, texts: List[str]) -> List[List[int]]:
+        """Token ids per text, without special tokens or truncation."""
+        return _tokenize(self.tokenizer, texts)
+
+    def classify_batch(self, texts: List[str]) -> List[float]:
+        """Runs the exported graph and returns the scam probability per text."""
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=MAX_SEQ_LENGTH,
+            return_tensors="np",
         )
+        return self._run(encoded)
+
+    def classify_ids(self, windows: List[Sequence[int]]) -> List[float]:
+        """Like classify_batch, for token windows of at most window_size ids."""
+        return self._run(_pad_windows(self.tokenizer, windows, "np"))
+
+    def _run(self, encoded) -> List[float]:
+        import numpy as np
+
+        feeds = {k: v.astype("int64") for k, v in encoded.items() if k in self.input_names}
+        if "token_type_ids" in self.input_names and "token_type_ids" not in feeds:
+            feeds["token_type_ids"] = np.zeros_like(feeds["input_ids"])
+        logits = self.session.run(None, feeds)[0]
+        logits = logits - logits.max(axis=-1, keepdims=True)
+        exp = np.exp(logits)
+        probs = exp[:, self.scam_index] / exp.sum(axis=-1)
+        return probs.tolist()
+
+
+def load_backend(name: str = BACKEND):
+    """
+    Builds the requested runtime backend.
+
+    Args:
+        name (str): One of "torch", "int8", "onnx" or "stub".
+
+    Returns:
+        The backend instance exposing classify_batch(texts).
+    """
+    if name == "stub":
+        return StubBackend()
+
+    import torch
+    from transformers import AutoConfig, AutoModelForSequenceClassification, AutoTokenizer
+
+    source = model_source()
+    guard_tokenizer = AutoTokenizer.from_pretrained(source)
+
+    if name == "onnx":
+        if not os.path.exists(ONNX_MODEL_PATH):
+            raise FileNotFoundError(
+                f"{ONNX_MODEL_PATH} missing. Run: python export_model.py"
+            )
+        return OnnxBackend(guard_tokenizer, ONNX_MODEL_PATH, AutoConfig.from_pretrained(source))
+
+    if name == "int8" and os.path.exists(INT8_MODEL_PATH):
+        print(f"Found quantized model at: {INT8_MODEL_PATH}")
+        quantized = torch.load(INT8_MODEL_PATH, weights_only=False)
+        return QuantizedTorchBackend(guard_tokenizer, quantized, prequantized=True)
+
+    guard_model = AutoModelForSequenceClassification.from_pretrained(source)
+    if name == "int8":
+        return QuantizedTorchBackend(guard_tokenizer, guard_model)
+    if name != "torch":
+        print(f"Unknown GUARD_BACKEND '{name}', using torch.")
+    return TorchBackend(guard_tokenizer, guard_model)
+
+
+# 3b. Long Messages
+# Pasted scam emails run past MAX_SEQ_LENGTH, and truncation drops payloads
+# near the end. In "window" mode every message is tokenized once (cached on
+# its digest), cut into windows overlapping by WINDOW_OVERLAP tokens, and
+# all windows of a batch go through the model together.
+def token_ids(backend, texts: List[str]) -> List[array]:
+    """
+    Token ids of each text, from cache.TOKENS where possible. Misses are
+    tokenized in one call.
+    """
+    keys = [cache.text_digest(text) for text in texts]
+    out = [cache.TOKENS.get(key) for key in keys]
+    missing = [i for i, ids in enumerate(out) if ids is None]
+    if missing:
+        for i, ids in zip(missing, backend.tokenize([texts[i] for i in missing])):
+            out[i] = array("I", ids)
+            cache.TOKENS.set(keys[i], out[i])
+    return out
+
+
+def split_windows(ids: Sequence[int], size: int, overlap: int = WINDOW_OVERLAP,
+                  max_windows: int = MAX_WINDOWS) -> List[Sequence[int]]:
+    """
+    Overlapping windows of at most `size` ids covering the whole sequence.
+
+    Past max_windows, windows are picked evenly across the message, always
+    keeping the first and the last.
+
+    Args:
+        ids (Sequence[int]): Token ids without special tokens.
+        size (int): Window length (MAX_SEQ_LENGTH minus special tokens).
+        overlap (int): Ids shared by neighbouring windows.
+        max_windows (int): Upper bound on windows per message.
+
+    Returns:
+        List[Sequence[int]]: The windows, in message order.
+    """
+    if len(ids) <= size:
+        return [ids]
+    stride = max(1, size - min(overlap, size // 2))
+    starts = list(range(0, len(ids) - size, stride)) + [len(ids) - size]
+    if len(starts) > max_windows > 1:
+        step = (len(starts) - 1) / (max_windows - 1)
+        starts = [starts[round(i * step)] for i in range(max_windows)]
+    return [ids[start:start + size] for start in starts]
+
+
+def pool_scores(scores: List[float], pooling: str = WINDOW_POOLING,
+                temperature: float = WINDOW_TEMPERATURE) -> float:
+    """
+    Combines window scores into one message score.
+
+    "max" flags a message if any window is a scam. "attention" weights each
+    window by softmax(score / temperature), so the most suspicious windows
+    dominate but one borderline window among clean ones is damped.
+    """
+    if len(scores) == 1:
+        return scores[0]
+    if pooling == "attention":
+        top = max(scores)
+        weights = [math.exp((score - top) / temperature) for score in scores]
+        return sum(w * score for w, score in zip(weights, scores)) / sum(weights)
+    return max(scores)
+
+
+def classify_texts(backend, texts: List[str], chunking: str = CHUNKING,
+                   pooling: str = WINDOW_POOLING) -> List[float]:
+    """
+    Scam probability per text, windowing long texts when chunking is
+    "window" and the backend can score token ids; plain classify_batch
+    (head truncation) otherwise.
+    """
+    if chunking != "window" or not hasattr(backend, "classify_ids"):
+        return backend.classify_batch(texts)
+    windows, owners = [], []
+    for i, ids in enumerate(token_ids(backend, texts)):
+        for window in split_windows(ids, backend.window_size):
+            windows.append(window)
+            owners.append(i)
+    window_scores = backend.classify_ids(windows)
+    grouped: List[List[float]] = [[] for _ in texts]
+    for i, score in zip(owners, window_scores):
+        grouped[i].append(score)
+    return [pool_scores(scores, pooling) for scores in grouped]
+
+
+# 4. Batched Inference Engine
+class BatchInferenceEngine:
+    """
+    Micro-batching front for the guard model.
+
+    Callers submit single messages and receive their own Future. A dedicated
+    worker thread drains the queue into batches of at most `max_batch_size`,
+    waiting no longer than `max_wait_ms` after the first message arrives, and
+    runs one padded forward pass per batch (one row per token window of each
+    message, see classify_texts).
+    """
+
+    def __init__(self, backend, max_batch_size: int = MAX_BATCH_SIZE,
+                 max_wait_ms: float = MAX_WAIT_MS):
+        self.backend = backend
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._worker = threading.Thread(
+            target=self._run, name="guard-inference", daemon=True
+        )
+        self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        """Queues a message and returns a Future resolving to (is_scam, score)."""
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def queue_depth(self) -> int:
+        """Messages waiting for a batch slot."""
+        return self._queue.qsize()
+
+    def _collect(self) -> List[Tuple[str, Future]]:
+        """Blocks for the first item, then gathers more until full or timed out."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            # Skip callers that gave up while queued
+            batch = [(text, fut) for text, fut in batch if fut.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            start = time.perf_counter()
+            try:
+                scores = classify_texts(self.backend, [text for text, _ in batch])
+                metrics.MODEL_BATCH_SECONDS.since(start)
+                metrics.MODEL_BATCH_SIZE.observe(len(batch))
+            except Exception as e:
+                print(f"Guard Inference Error: {e}")
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            for (_, fut), score in zip(batch, scores):
+                fut.set_result((score >= SCAM_THRESHOLD, float(score)))
+
+
+# 5. Background Warm-up
+# The model is never loaded at import time. warm_up() runs on a background
+# thread started from the API startup hook; until it finishes, callers must
+# fall back to the cache and heuristic tiers (see is_ready()).
+ENGINE: Optional[BatchInferenceEngine] = None
+READY = threading.Event()
+WARMUP_ERROR: Optional[str] = None
+WARMUP_SECONDS: Optional[float] = None
+_WARMUP_LOCK = threading.Lock()
+_WARMUP_THREAD: Optional[threading.Thread] = None
+
+
+def warm_up() -> None:
+    """Loads the backend, runs one dummy batch, then marks the engine ready."""
+    global ENGINE, WARMUP_ERROR, WARMUP_SECONDS
+    start = time.perf_counter()
+    try:
+        engine = BatchInferenceEngine(load_backend())
+        classify_texts(engine.backend, ["warm up"])
+        ENGINE = engine
+        WARMUP_SECONDS = time.perf_counter() - start
+        READY.set()
+        print(f"Guard model ready in {WARMUP_SECONDS:.1f}s ({engine.backend.name}).")
+    except Exception as e:
+        WARMUP_ERROR = str(e)
+        print(f"Guard Model Warm-up Failure: {e}")
+
+
+def start_warmup() -> None:
+    """Starts warm_up() on a daemon thread. Safe to call more than once."""
+    global _WARMUP_THREAD
+    with _WARMUP_LOCK:
+        if _WARMUP_THREAD is None:
+            _WARMUP_THREAD = threading.Thread(
+                target=warm_up, name="guard-warmup", daemon=True
+            )
+            _WARMUP_THREAD.start()
+
+
+def is_ready() -> bool:
+    """True once the guard model can serve predictions."""
+    return READY.is_set()
+
+
+def status() -> dict:
+    """Warm-up state for the readiness endpoint."""
+    if READY.is_set():
+        state = "ready"
+    elif WARMUP_ERROR:
+        state = "failed"
+    else:
+        state = "warming"
+    return {
+        "model": state,
+        "backend": ENGINE.backend.name if ENGINE else BACKEND,
+        "warmup_seconds": WARMUP_SECONDS,
+        "error": WARMUP_ERROR,
+    }
+
+
+def _near_duplicate(message: str) -> Optional[Tuple[bool, float]]:
+    """Verdict of an already-classified near copy of the message, if any."""
+    if not neardup.NEARDUP_ENABLED:
+        return None
+    return neardup.INDEX.lookup(message)
+
+
+def _index_verdict(message: str, verdict: Tuple[bool, float]) -> None:
+    if neardup.NEARDUP_ENABLED:
+        neardup.INDEX.add(message, verdict)
+
+
+async def predict_scam(message: str) -> Tuple[bool, float]:
+    """
+    Classifies a message through the shared batching engine. Verdicts are
+    cached on the message text with case and punctuation folded (links and
+    numbers kept, see cache.verdict_key), so replayed scripts skip the model,
+    and edited copies of a known scam script take its verdict (app.neardup).
+
+    Args:
+        message (str): The incoming message text.
+
+    Returns:
+        Tuple[bool, float]: Whether the message is a scam and the scam probability.
+
+    Raises:
+        RuntimeError: If the model has not finished warming up.
+    """
+    if ENGINE is None:
+        raise RuntimeError("Guard model is not ready.")
+
+    key = cache.verdict_key(message)
+    verdict = cache.VERDICTS.get(key)
+    if verdict is None:
+        verdict = _near_duplicate(message)
+        if verdict is None:
+            verdict = await asyncio.wrap_future(ENGINE.submit(message))
+            _index_verdict(message, verdict)
+        cache.VERDICTS.set(key, verdict)
+    return verdict
+
+
+async def predict_scam_batch(messages: List[str]) -> List[Tuple[bool, float]]:
+    """
+    Classifies many messages at once. Repeats, cached scripts and near
+    copies of known scams are resolved first; the rest go to the engine
+    together, which runs them in full batches of MAX_BATCH_SIZE.
+
+    Args:
+        messages (List[str]): Message texts.
+
+    Returns:
+        List[Tuple[bool, float]]: (is_scam, probability) per message, in order.
+
+    Raises:
+        RuntimeError: If the model has not finished warming up.
+    """
+    if ENGINE is None:
+        raise RuntimeError("Guard model is not ready.")
 
-# 3. Initialize
-tokenizer, model = load_security_model()
\ No newline at end of file
+    keys = [cache.verdict_key(message) for message in messages]
+    verdicts = {}
+    pending = {}
+    for key, message in zip(keys, messages):
+        if key in verdicts or key in pending:
+            continue
+        verdict = cache.VERDICTS.get(key)
+        if verdict is None:
+            verdict = _near_duplicate(message)
+        if verdict is None:
+            pending[key] = (message, ENGINE.submit(message))
+        else:
+            cache.VERDICTS.set(key, verdict)
+            verdicts[key] = verdict
+    if pending:
+        results = await asyncio.gather(*(asyncio.wrap_future(f) for _, f in pending.values()))
+        for (key, (message, _)), verdict in zip(pending.items(), results):
+            _index_verdict(message, verdict)
+            cache.VERDICTS.set(key, verdict)
+            verdicts[key] = verdict
+    return [verdicts[key] for key in keys]
@@ -0,0 +1,160 @@
+"""
+Immutable on-disk snapshots of the indicator index, shared by mmap.
+
+A snapshot is the read-only half of indicators.IndicatorIndex written to
+one file: the sorted 64-bit fingerprints, their type codes and the Bloom
+filter bits, behind a fixed header. Workers map it read-only, so however
+many processes use it the pages are held once by the OS page cache instead
+of once per worker, and opening it costs a stat and an mmap instead of a
+full table scan.
+
+Files are written to a temporary name and renamed over the old one, so a
+reader sees either the old snapshot or the new one, never a partial file.
+A worker that still maps the old file keeps its (unlinked) pages until it
+swaps, and the file is only read in the host's native byte order.
+"""
+import fcntl
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+MAGIC = b"HPIXSNAP"
+VERSION = 1
+# magic, version, byte order, count, Bloom bits, Bloom hashes, created_at
+HEADER = struct.Struct("=8sIIQQQd")
+HEADER_SIZE = 64
+BYTE_ORDER = 1 if sys.byteorder == "little" else 2
+
+
+def _align(offset: int, to: int = 8) -> int:
+    return (offset + to - 1) // to * to
+
+
+def _layout(count: int, bloom_bytes: int) -> Tuple[int, int, int, int]:
+    """Offsets of the fingerprints, codes and Bloom bits, and the file size."""
+    fps_at = HEADER_SIZE
+    codes_at = fps_at + 8 * count
+    bloom_at = _align(codes_at + count)
+    return fps_at, codes_at, bloom_at, bloom_at + bloom_bytes
+
+
+class SnapshotError(Exception):
+    """The file is missing, truncated, or not a snapshot this build can read."""
+
+
+def write(path: str, fps: array, codes: array, bloom_bits: bytes, num_bits: int, num_hashes: int,
+          created_at: float) -> int:
+    """
+    Writes a snapshot atomically (temporary file, fsync, rename).
+
+    Args:
+        path (str): Destination file.
+        fps (array): Sorted fingerprints, typecode "Q".
+        codes (array): Type code of each fingerprint, typecode "B".
+        bloom_bits (bytes): Bloom filter bit array over the fingerprints.
+        num_bits (int): Bloom filter size in bits.
+        num_hashes (int): Bloom filter probes per key.
+        created_at (float): Epoch seconds the source rows were read at.
+
+    Returns:
+        int: The file size in bytes.
+    """
+    fps_at, codes_at, bloom_at, size = _layout(len(fps), len(bloom_bits))
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, BYTE_ORDER, len(fps), num_bits, num_hashes, created_at)
+                .ljust(HEADER_SIZE, b"\0"))
+        fps.tofile(f)
+        codes.tofile(f)
+        f.write(b"\0" * (bloom_at - codes_at - len(codes)))
+        f.write(bloom_bits)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return size
+
+
+class Snapshot:
+    """
+    A read-only mapping of one snapshot file.
+
+    `fps`, `codes` and `bloom_bits` are memoryviews into the mapping and
+    index like the arrays they were written from. The mapping is released
+    once the last of them is dropped, so a swapped-out snapshot stays valid
+    for lookups already in progress.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size < HEADER_SIZE:
+                raise SnapshotError(f"{path}: truncated header")
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, order, count, num_bits, num_hashes, created_at = HEADER.unpack_from(mapping)
+        if magic != MAGIC or version != VERSION or order != BYTE_ORDER:
+            raise SnapshotError(f"{path}: not a version {VERSION} snapshot in native byte order")
+        fps_at, codes_at, bloom_at, size = _layout(count, (num_bits + 7) // 8)
+        if stat.st_size < size:
+            raise SnapshotError(f"{path}: truncated ({stat.st_size} of {size} bytes)")
+        view = memoryview(mapping)
+        self.path = path
+        self.identity = (stat.st_ino, stat.st_mtime_ns)
+        self.created_at = created_at
+        self.size = size
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.fps = view[fps_at:codes_at].cast("Q")
+        self.codes = view[codes_at:codes_at + count]
+        self.bloom_bits = view[bloom_at:size]
+
+    def __len__(self) -> int:
+        return len(self.fps)
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (time.time() if now is None else now) - self.created_at
+
+
+def identity(path: str):
+    """(inode, mtime) of the file at path, or None if there is none."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def created_at(path: str) -> float:
+    """The snapshot's creation time from its header, or 0.0 if unreadable."""
+    try:
+        with open(path, "rb") as f:
+            fields = HEADER.unpack(f.read(HEADER.size))
+    except (OSError, struct.error):
+        return 0.0
+    return fields[-1] if fields[0] == MAGIC else 0.0
+
+
+@contextmanager
+def export_lock(path: str, blocking: bool = True) -> Iterator[bool]:
+    """
+    Serializes exports of one snapshot across processes (flock on a
+    sidecar file). Yields False if blocking=False and another process holds it.
+    """
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    with open(f"{path}.lock", "a") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
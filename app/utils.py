@@ -1,56 +1,199 @@
 import re
-from urllib.parse import urlparse
+
+from app import canonical
 
 def get_domain(url: str) -> str:
-    """Extracts root domain from URL."""
-    try:
-        if not url.startswith(('http://', 'https://')):
-            url = 'http://' + url
-        parsed = urlparse(url)
-        return parsed.netloc.split(':')[0]
-    except:
-        return ""
+    """Extracts root (registrable) domain from URL, lowercased, without port."""
+    return canonical.registrable_domain(url)
+
+# Precompiled Patterns (compiled once at import)
+URL_PATTERN = re.compile(r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+(?:/[-\w%./?&;=+]*)?')
+EMAIL_PATTERN = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+PHONE_PATTERN = re.compile(r'(?:\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}')
+BANK_PATTERN = re.compile(r'\b\d{9,18}\b')
+UPI_PATTERN = re.compile(r'[a-zA-Z0-9.\-_]{2,256}@[a-zA-Z]{2,64}')
+# A phone/bank match only uses these characters and starts at '+', '(' or a
+# digit, so both patterns only need to run over these spans.
+NUMERIC_SPAN = re.compile(r'[+(\d][-\d+().\s]*')
+NON_DIGIT = re.compile(r'\D')
+
+SUSPICIOUS_KEYWORDS = ["urgent", "verify", "block", "suspend", "kyc", "lapse", "immediately", "refund", "winner", "lottery"]
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick style multi-keyword matcher.
+
+    The dictionary is folded into a trie, and the trie is compiled into one
+    regular expression, so the walk runs inside the regex engine and skips
+    ahead to the next possible keyword start. After each hit the scan resumes
+    one character later, so overlapping keywords are not lost. The longest
+    keyword at a position is reported; shorter keywords contained in it come
+    from a precomputed closure, so the result equals a substring test for
+    every keyword.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = sorted({k.lower() for k in keywords if k})
+        self.contained = {
+            k: [other for other in self.keywords if other in k]
+            for k in self.keywords
+        }
+        if self.keywords:
+            self.pattern = re.compile(self._trie_regex(self._build_trie()))
+        else:
+            self.pattern = None
+
+    def _build_trie(self) -> dict:
+        root: dict = {}
+        for word in self.keywords:
+            node = root
+            for ch in word:
+                node = node.setdefault(ch, {})
+            node[""] = True
+        return root
+
+    def _trie_regex(self, node: dict) -> str:
+        """Turns a trie into a longest-first regex (shared prefixes factored out)."""
+        branches = [
+            re.escape(ch) + self._trie_regex(child)
+            for ch, child in sorted(node.items()) if ch
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # Terminal node: the continuation is optional, tried first (longest match)
+            return "(?:" + body + ")?"
+        return body
+
+    def find(self, lowered: str) -> list:
+        """Returns the distinct keywords found in already-lowercased text."""
+        if self.pattern is None:
+            return []
+        search = self.pattern.search
+        found = {}
+        match = search(lowered)
+        while match:
+            for word in self.contained[match.group()]:
+                found[word] = None
+            if len(found) == len(self.keywords):
+                break
+            match = search(lowered, match.start() + 1)
+        return list(found)
+
+
+KEYWORD_MATCHER = KeywordMatcher(SUSPICIOUS_KEYWORDS)
+
+
+def configure_keywords(keywords) -> None:
+    """Replaces the suspicious-keyword dictionary used by extract_intelligence."""
+    global KEYWORD_MATCHER
+    KEYWORD_MATCHER = KeywordMatcher(keywords)
+
 
 def extract_intelligence(text: str) -> dict:
     """
     Extracts all required fields for the GUVI Evaluation.
+
+    The message is split into whitespace tokens once. URL, email and UPI
+    patterns never span whitespace, so they only run on the tokens that can
+    hold them ('://' or '@'); phone and bank patterns run only when the text
+    contains digits, and only over the numeric spans.
     """
-    intelligence = {
-        "phishingLinks": [],  # Renamed from 'urls' to match spec
-        "emails": [],
-        "phoneNumbers": [],   # Renamed from 'phone_numbers'
-        "bankAccounts": [],   # NEW
-        "upiIds": [],
-        "suspiciousKeywords": [] # NEW
-    }
+    link_tokens = []
+    at_tokens = []
+    for token in text.split():
+        if "@" in token:
+            at_tokens.append(token)
+        if "://" in token:
+            link_tokens.append(token)
 
     # 1. Phishing Links (URLs)
-    url_pattern = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+(?:/[-\w%./?&;=+]*)?'
-    intelligence["phishingLinks"] = list(set(re.findall(url_pattern, text)))
-
-    # 2. Emails
-    email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-    intelligence["emails"] = list(set(re.findall(email_pattern, text)))
+    links = {}
+    for token in link_tokens:
+        for url in URL_PATTERN.findall(token):
+            links[url] = None
 
-    # 3. Phone Numbers
-    phone_pattern = r'(?:\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}'
-    phones = re.findall(phone_pattern, text)
-    intelligence["phoneNumbers"] = list(set([p for p in phones if len(re.sub(r'\D', '', p)) >= 10]))
+    # 2. Emails & 5. UPI IDs
+    emails = {}
+    upis = {}
+    for token in at_tokens:
+        for email in EMAIL_PATTERN.findall(token):
+            emails[email] = None
+    for token in at_tokens:
+        for upi in UPI_PATTERN.findall(token):
+            if upi not in emails:
+                upis[upi] = None
 
-    # 4. Bank Account Numbers (Generic 9-18 digits)
-    bank_pattern = r'\b\d{9,18}\b'
+    # 3. Phone Numbers & 4. Bank Account Numbers (Generic 9-18 digits)
+    phones = {}
+    potential_banks = []
+    end_of_text = len(text)
+    for span in NUMERIC_SPAN.finditer(text):
+        start, end = span.span()
+        if end - start < 9:
+            continue
+        for phone in PHONE_PATTERN.findall(text, start, end):
+            if len(NON_DIGIT.sub('', phone)) >= 10:
+                phones[phone] = None
+        # One extra char so the trailing \b sees the real neighbour
+        potential_banks.extend(BANK_PATTERN.findall(text, start, min(end + 1, end_of_text)))
     # Filter out phone numbers from this list (basic heuristic)
-    potential_banks = re.findall(bank_pattern, text)
-    intelligence["bankAccounts"] = [b for b in potential_banks if b not in intelligence["phoneNumbers"]]
+    banks = [b for b in potential_banks if b not in phones]
 
-    # 5. UPI IDs
-    upi_pattern = r'[a-zA-Z0-9.\-_]{2,256}@[a-zA-Z]{2,64}'
-    upis = re.findall(upi_pattern, text)
-    intelligence["upiIds"] = list(set([u for u in upis if u not in intelligence["emails"]]))
+    # 6. Suspicious Keywords (dictionary automaton over the lowercased text)
+    keywords = KEYWORD_MATCHER.find(text.lower())
+
+    return {
+        "phishingLinks": list(links),
+        "emails": list(emails),
+        "phoneNumbers": list(phones),
+        "bankAccounts": banks,
+        "upiIds": list(upis),
+        "suspiciousKeywords": keywords,
+    }
 
-    # 6. Suspicious Keywords (Simple dictionary check)
-    triggers = ["urgent", "verify", "block", "suspend", "kyc", "lapse", "immediately", "refund", "winner", "lottery"]
-    found_keywords = [word for word in triggers if word in text.lower()]
-    intelligence["suspiciousKeywords"] = list(set(found_keywords))
 
-    return intelligence
\ No newline at end of file
+def extract_intelligence_batch(texts) -> list:
+    """
+    Extracts intelligence from many messages at once.
+
+    Args:
+        texts (Iterable[str]): The messages.
+
+    Returns:
+        list: One extract_intelligence dict per message, in order.
+    """
+    extract = extract_intelligence
+    return [extract(text) for text in texts]
+
+
+# Heuristic Tier: cheap score used while the guard model is unavailable
+HEURISTIC_WEIGHTS = {
+    "phishingLinks": 0.35,
+    "upiIds": 0.3,
+    "bankAccounts": 0.25,
+    "phoneNumbers": 0.15,
+    "emails": 0.1,
+}
+KEYWORD_WEIGHT = 0.15
+HEURISTIC_THRESHOLD = 0.5
+
+
+def heuristic_score(intelligence: dict) -> float:
+    """
+    Scores a message from its extracted intelligence alone (no model).
+
+    Args:
+        intelligence (dict): Output of extract_intelligence.
+
+    Returns:
+        float: A scam score between 0 and 1.
+    """
+    score = sum(
+        weight for field, weight in HEURISTIC_WEIGHTS.items()
+        if intelligence.get(field)
+    )
+    score += KEYWORD_WEIGHT * len(intelligence.get("suspiciousKeywords", []))
+    return min(score, 1.0)
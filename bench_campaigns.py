@@ -0,0 +1,215 @@
+"""
+Benchmark script for the campaign graph (app/campaigns.py).
+
+1. Correctness: the incremental union-find must give exactly the connected
+   components a from-scratch BFS finds over the same links.
+2. Scale: observe() throughput, memory and query latency at millions of
+   session-indicator links, and the time to rebuild the graph from the
+   persisted links.
+3. Bulk: session-less /chat/batch items must not be linked to each other
+   through an empty session id.
+4. Reload: replaying persisted links (a restart, or the refresher pulling
+   rows back) must not count them again as observed links.
+"""
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict, deque
+
+# Bulk items record indicators: keep them out of the real database
+os.environ.setdefault("THREAT_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="campaigns-"), "threats.db"))
+
+from app import bulk, campaigns, indicators, memory  # noqa: E402
+
+CAMPAIGNS = 20000
+SESSIONS = 400000
+CROSS_LINK_RATE = 0.002
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as handle:
+        for line in handle:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def campaign_pools(count: int, rng: random.Random) -> list:
+    """Indicator spellings each campaign draws from."""
+    pools = []
+    for c in range(count):
+        pool = [f"https://login{rng.randint(1, 9)}.scam{c}.com/verify" for _ in range(rng.randint(1, 4))]
+        pool += [f"+91 9{c:05d}{rng.randint(1000, 9999)}" for _ in range(rng.randint(1, 3))]
+        pool += [f"pay{c}x{rng.randint(1, 99)}@okaxis" for _ in range(rng.randint(1, 5))]
+        pools.append(pool)
+    return pools
+
+
+def messages(sessions: int, pools: list, rng: random.Random):
+    """(session_id, intelligence) per scam message."""
+    for s in range(sessions):
+        pool = rng.choice(pools)
+        for _ in range(rng.randint(1, 4)):
+            found = rng.sample(pool, min(len(pool), rng.randint(1, 3)))
+            if rng.random() < CROSS_LINK_RATE:
+                found.append(rng.choice(rng.choice(pools)))
+            intel = {"phishingLinks": [], "phoneNumbers": [], "upiIds": []}
+            for item in found:
+                field = "phishingLinks" if item.startswith("http") else "phoneNumbers" if item.startswith("+") else "upiIds"
+                intel[field].append(item)
+            yield f"sess-{s}", intel
+
+
+def bfs_components(links: list) -> set:
+    """Connected components over (session, indicator) links, from scratch."""
+    adjacency = defaultdict(list)
+    for session_id, value in links:
+        adjacency[("s", session_id)].append(("i", value))
+        adjacency[("i", value)].append(("s", session_id))
+    seen, components = set(), set()
+    for start in adjacency:
+        if start in seen:
+            continue
+        seen.add(start)
+        queue, members = deque([start]), []
+        while queue:
+            node = queue.popleft()
+            members.append(node)
+            for other in adjacency[node]:
+                if other not in seen:
+                    seen.add(other)
+                    queue.append(other)
+        components.add(frozenset(members))
+    return components
+
+
+def graph_components(graph: campaigns.CampaignGraph) -> set:
+    components = set()
+    for indicator_ids, session_ids in graph._members.values():
+        components.add(frozenset([("i", graph._names[n]) for n in indicator_ids] +
+                                 [("s", graph._names[n]) for n in session_ids]))
+    return components
+
+
+def check_correctness() -> bool:
+    rng = random.Random(1)
+    pools = campaign_pools(300, rng)
+    graph = campaigns.CampaignGraph(persist=False)
+    links = []
+    for session_id, intel in messages(3000, pools, rng):
+        graph.observe(session_id, intel)
+        links.extend((session_id, value) for value, _ in indicators.indicator_values(intel))
+    expected, got = bfs_components(links), graph_components(graph)
+    ok = expected == got
+    print(f"Correctness: {len(links)} links, {len(got)} campaigns, matches BFS: {ok}")
+    return ok
+
+
+def check_bulk_sessionless() -> bool:
+    """Two unrelated session-less bulk threats, plus one with a session."""
+    memory.init_db()
+    graph, campaigns.GRAPH = campaigns.GRAPH, campaigns.CampaignGraph(persist=False)
+    try:
+        items = [bulk.parse_item(raw, i) for i, raw in enumerate([
+            {"message": "Your account is blocked, verify at http://kyc-one.xyz immediately"},
+            {"message": "Urgent: account suspended, verify at http://kyc-two.xyz now"},
+            {"session_id": "bulk-session", "message": "Account blocked, verify at http://kyc-three.xyz urgently"},
+        ])]
+        results = asyncio.run(bulk.analyze_chunk(items))
+        detected = all(r["status"] == "threat" for r in results)
+        first = campaigns.GRAPH.campaign_id("http://kyc-one.xyz")
+        second = campaigns.GRAPH.campaign_id("http://kyc-two.xyz")
+        separate = first is None or second is None or first != second
+        observed = campaigns.GRAPH.campaign_id("bulk-session") is not None
+        empty = campaigns.GRAPH.campaign_id("") is None
+    finally:
+        campaigns.GRAPH = graph
+    ok = detected and separate and observed and empty
+    print(f"Bulk: session-less items detected {detected}, in separate campaigns {separate}, "
+          f"no '' session {empty}, session item linked {observed}")
+    return ok
+
+
+def check_reload() -> bool:
+    rng = random.Random(3)
+    traffic = list(messages(2000, campaign_pools(100, rng), rng))
+    with tempfile.TemporaryDirectory() as folder:
+        store = memory.ThreatStore(os.path.join(folder, "campaigns.db"))
+        store.init_schema()
+        graph = campaigns.CampaignGraph(store=store)
+        for session_id, intel in traffic:
+            graph.observe(session_id, intel)
+        store.flush()
+        observed = graph.stats()["links_observed"]
+        graph.load()
+        rebuilt = campaigns.CampaignGraph(store=store)
+        rebuilt.load()
+        store.close()
+    after, restarted = graph.stats()["links_observed"], rebuilt.stats()["links_observed"]
+    ok = after == observed and restarted == 0
+    print(f"Reload: links_observed {observed} before, {after} after re-reading its own rows, "
+          f"{restarted} after a restart")
+    return ok
+
+
+def run_scale() -> None:
+    rng = random.Random(2)
+    pools = campaign_pools(CAMPAIGNS, rng)
+    traffic = list(messages(SESSIONS, pools, rng))
+    links = sum(len(indicators.indicator_values(intel)) for _, intel in traffic)
+
+    graph = campaigns.CampaignGraph(persist=False)
+    before = rss_mb()
+    start = time.perf_counter()
+    for session_id, intel in traffic:
+        graph.observe(session_id, intel)
+    elapsed = time.perf_counter() - start
+    stats = graph.stats()
+    print(f"Observed {len(traffic)} messages / {links} links in {elapsed:.1f}s "
+          f"({links / elapsed:,.0f} links/s, {elapsed / len(traffic) * 1e6:.1f} us/message)")
+    print(f"Graph: {stats['nodes']:,} nodes ({stats['sessions']:,} sessions, {stats['indicators']:,} indicators), "
+          f"{stats['campaigns']:,} campaigns, ~{rss_mb() - before:.0f} MB RSS")
+
+    keys = [rng.choice(rng.choice(pools)) for _ in range(5000)]
+    keys += [f"sess-{rng.randrange(SESSIONS)}" for _ in range(5000)]
+    samples = []
+    for key in keys:
+        t = time.perf_counter()
+        graph.campaign(key, limit=100)
+        samples.append((time.perf_counter() - t) * 1e6)
+    samples.sort()
+    sizes = [c["indicator_count"] for c in graph.largest(1, limit=0)]
+    t = time.perf_counter()
+    graph.largest(20)
+    largest_ms = (time.perf_counter() - t) * 1000
+    print(f"campaign(key): p50 {statistics.median(samples):.1f} us, p99 {samples[int(len(samples) * 0.99)]:.1f} us; "
+          f"largest(20): {largest_ms:.1f} ms; biggest campaign {sizes[0] if sizes else 0} indicators")
+
+    with tempfile.TemporaryDirectory() as folder:
+        store = memory.ThreatStore(os.path.join(folder, "campaigns.db"))
+        store.init_schema()
+        persisted = campaigns.CampaignGraph(store=store)
+        start = time.perf_counter()
+        for session_id, intel in traffic:
+            persisted.observe(session_id, intel)
+        store.flush()
+        write_s = time.perf_counter() - start
+        rows = store.connection().execute("SELECT COUNT(*) FROM campaign_edges").fetchone()[0]
+        rebuilt = campaigns.CampaignGraph(store=store)
+        start = time.perf_counter()
+        rebuilt.load()
+        load_s = time.perf_counter() - start
+        same = rebuilt.stats()["campaigns"] == stats["campaigns"]
+        print(f"Persisted: {rows:,} forest links for {links:,} observed ({write_s:.1f}s with queued writes); "
+              f"rebuild in {load_s:.1f}s, same campaigns: {same}")
+        store.close()
+
+
+if __name__ == "__main__":
+    ok = check_correctness() and check_bulk_sessionless() and check_reload()
+    run_scale()
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,69 @@
+"""
+Benchmark script for API cold start: time-to-first-response with eager vs lazy
+guard model loading.
+"""
+import os
+import subprocess
+import sys
+import time
+
+import requests
+
+PORT = 8765
+BASE_URL = f"http://127.0.0.1:{PORT}"
+API_KEY = os.getenv("API_SECRET_KEY", "bench_secret")
+TIMEOUT = 600
+
+
+def wait_for(url: str, start: float, **kwargs) -> float:
+    """Polls url until it answers 200 and returns seconds since start."""
+    while time.perf_counter() - start < TIMEOUT:
+        try:
+            if requests.request(timeout=1, url=url, **kwargs).status_code == 200:
+                return time.perf_counter() - start
+        except requests.RequestException:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(url)
+
+
+def measure(eager: bool) -> dict:
+    """Starts uvicorn and records first health, first /chat and readiness times."""
+    env = dict(os.environ, GUARD_EAGER_LOAD="1" if eager else "0", API_SECRET_KEY=API_KEY)
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(PORT)],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        health = wait_for(f"{BASE_URL}/", start, method="GET")
+        first_chat = wait_for(
+            f"{BASE_URL}/chat",
+            start,
+            method="POST",
+            json={"session_id": "cold-start", "message": "Verify your KYC urgently"},
+            headers={"x-api-key": API_KEY},
+        )
+        ready = wait_for(f"{BASE_URL}/ready", start, method="GET")
+    finally:
+        server.terminate()
+        server.wait()
+    return {"health": health, "first_chat": first_chat, "ready": ready}
+
+
+def main():
+    print("-" * 60)
+    print(f"{'mode':>8} {'health s':>10} {'1st /chat s':>12} {'ready s':>10}")
+    print("-" * 60)
+    for eager in (True, False):
+        result = measure(eager)
+        print(
+            f"{'eager' if eager else 'lazy':>8} {result['health']:>10.2f} "
+            f"{result['first_chat']:>12.2f} {result['ready']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
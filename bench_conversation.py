@@ -0,0 +1,65 @@
+"""
+Benchmark script: prompt tokens per turn over 50-turn sessions, full history
+vs the token-budgeted conversation memory.
+"""
+import random
+
+from app import conversation
+
+TURNS = 50
+SESSIONS = 20
+# Stand-in of roughly the persona prompt's size (app.agent needs groq to import)
+SYSTEM_PROMPT = "x" * 760
+SCAM_LINES = [
+    "Sir your account is blocked, verify KYC at http://kyc-fix.bad/now immediately.",
+    "Why are you not answering? Call +91 98765 43210 right now or lose your pension.",
+    "Just open the link and enter the OTP. It is very simple, even my grandmother can do it.",
+    "Transfer the refund processing fee to claims.desk@okaxis and we release 2 lakh today.",
+    "I am from the bank head office, this is your final warning before legal action.",
+]
+ARTHUR_LINES = [
+    "Oh dear, which button is that? Is it the blue one?",
+    "Let me find my reading glasses, the letters are so small.",
+    "Could I send a cheque instead? What is your mailing address?",
+]
+
+
+def prompt_tokens(messages) -> int:
+    return sum(conversation.estimate_tokens(m["content"]) for m in messages)
+
+
+def run_session(rng: random.Random):
+    """Returns per-turn prompt tokens for (full history, budgeted)."""
+    history = conversation.ConversationHistory()
+    full = [{"role": "system", "content": SYSTEM_PROMPT}]
+    full_tokens, budget_tokens = [], []
+    for _ in range(TURNS):
+        message = " ".join(rng.choice(SCAM_LINES) for _ in range(rng.randint(1, 3)))
+        reply = rng.choice(ARTHUR_LINES)
+
+        full_tokens.append(prompt_tokens(full + [{"role": "user", "content": message}]))
+        budget_tokens.append(prompt_tokens(conversation.build_prompt(SYSTEM_PROMPT, history, message)))
+
+        full += [{"role": "user", "content": message}, {"role": "assistant", "content": reply}]
+        history.add(conversation.SCAMMER, message)
+        history.add(conversation.ARTHUR, reply)
+    return full_tokens, budget_tokens
+
+
+def main():
+    rng = random.Random(42)
+    runs = [run_session(rng) for _ in range(SESSIONS)]
+    print("-" * 44)
+    print(f"{'turn':>5} {'full history':>14} {'budgeted':>10} {'saved':>8}")
+    print("-" * 44)
+    for turn in (1, 5, 10, 20, 30, 40, 50):
+        full = sum(r[0][turn - 1] for r in runs) / SESSIONS
+        budget = sum(r[1][turn - 1] for r in runs) / SESSIONS
+        print(f"{turn:>5} {full:>14.0f} {budget:>10.0f} {1 - budget / full:>7.0%}")
+    total_full = sum(sum(r[0]) for r in runs) / SESSIONS
+    total_budget = sum(sum(r[1]) for r in runs) / SESSIONS
+    print(f"\nTokens per {TURNS}-turn session: {total_full:.0f} full vs {total_budget:.0f} budgeted")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Microbenchmark for utils.extract_intelligence vs the original implementation,
+by message length.
+"""
+import time
+
+from app import utils
+from check_extractor import GOLDEN_MESSAGES, reference_extract_intelligence
+
+FILLER = "Dear customer, we noticed unusual activity on your account today. "
+LENGTHS = (100, 1_000, 10_000, 100_000)
+TARGET_SECONDS = 0.5
+
+
+def make_message(length: int) -> str:
+    body = (FILLER * (length // len(FILLER) + 1))[:length]
+    return body + " " + GOLDEN_MESSAGES[3] + " " + GOLDEN_MESSAGES[4]
+
+
+def per_call_us(func, text: str) -> float:
+    runs, start = 0, time.perf_counter()
+    while time.perf_counter() - start < TARGET_SECONDS:
+        func(text)
+        runs += 1
+    return (time.perf_counter() - start) / runs * 1e6
+
+
+def main():
+    print("-" * 56)
+    print(f"{'chars':>8} {'original us':>14} {'new us':>12} {'speedup':>9}")
+    print("-" * 56)
+    for length in LENGTHS:
+        text = make_message(length)
+        old = per_call_us(reference_extract_intelligence, text)
+        new = per_call_us(utils.extract_intelligence, text)
+        print(f"{len(text):>8} {old:>14.1f} {new:>12.1f} {old / new:>8.1f}x")
+
+    batch = [make_message(500)] * 1000
+    start = time.perf_counter()
+    utils.extract_intelligence_batch(batch)
+    print(f"\nBatch of {len(batch)} x 500 chars: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark script for the in-memory indicator index: build time, memory and
+lookup latency (hits and clean misses) at 1M and 10M indicators.
+
+Usage: python bench_indicator_index.py [size ...]
+"""
+import sys
+import time
+
+from app import indicators
+
+DEFAULT_SIZES = (1_000_000, 10_000_000)
+LOOKUPS = 200_000
+
+
+def synthetic(n: int):
+    """Yields n distinct (value, threat_type) pairs across all indicator types."""
+    kinds = list(indicators.INDICATOR_TYPES.values())
+    for i in range(n):
+        yield f"scam-{i}.bad", kinds[i % len(kinds)]
+
+
+def bench(size: int) -> dict:
+    index = indicators.IndicatorIndex()
+    start = time.perf_counter()
+    index.build(synthetic(size))
+    build_s = time.perf_counter() - start
+
+    hits = [f"scam-{i}.bad" for i in range(0, size, max(1, size // LOOKUPS))][:LOOKUPS]
+    misses = [f"clean-{i}.example" for i in range(LOOKUPS)]
+
+    start = time.perf_counter()
+    found = sum(1 for value in hits if index.get(value))
+    hit_us = (time.perf_counter() - start) / len(hits) * 1e6
+
+    start = time.perf_counter()
+    false_hits = sum(1 for value in misses if index.get(value))
+    miss_us = (time.perf_counter() - start) / len(misses) * 1e6
+
+    bloom_fp = sum(1 for value in misses if indicators.fingerprint(value) in index.bloom)
+
+    return {
+        "size": size,
+        "build_s": build_s,
+        "index_mb": index.nbytes() / 2**20,
+        "hit_us": hit_us,
+        "miss_us": miss_us,
+        "recall": found / len(hits),
+        "false_hits": false_hits,
+        "bloom_fp_rate": bloom_fp / len(misses),
+    }
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print("-" * 78)
+    print(f"{'size':>11} {'build s':>8} {'index MB':>9} {'hit us':>7} {'miss us':>8} "
+          f"{'recall':>7} {'bloom fp':>9}")
+    print("-" * 78)
+    for size in sizes:
+        r = bench(size)
+        print(f"{r['size']:>11,} {r['build_s']:>8.1f} {r['index_mb']:>9.1f} {r['hit_us']:>7.2f} "
+              f"{r['miss_us']:>8.2f} {r['recall']:>7.3f} {r['bloom_fp_rate']:>9.4f}")
+
+
+if __name__ == "__main__":
+    main()
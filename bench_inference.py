@@ -0,0 +1,65 @@
+"""
+Benchmark script for the batched guard model: throughput vs latency on CPU.
+"""
+import asyncio
+import statistics
+import time
+
+from app import security
+
+SAMPLE_MESSAGES = [
+    "URGENT: your KYC has lapsed, verify immediately at http://kyc-update.bad/login",
+    "Hi grandpa, it's me. I lost my phone, can you send money to this UPI id quick?",
+    "Congratulations! You are the lottery winner. Pay the processing fee to claim.",
+    "Are we still meeting for lunch tomorrow at 1pm?",
+    "Your account will be suspended. Call +1 555 010 9999 to avoid the block.",
+    "Thanks for the photos from the weekend, the kids loved them.",
+]
+REQUESTS_PER_RUN = 256
+CONCURRENCY = 64
+BACKEND = security.load_backend()
+
+
+async def run(batch_size: int) -> dict:
+    """Fires REQUESTS_PER_RUN requests at CONCURRENCY and records per-request latency."""
+    engine = security.BatchInferenceEngine(BACKEND, max_batch_size=batch_size)
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await asyncio.wrap_future(engine.submit(SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)]))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    # Warm-up so the first run does not pay for lazy kernel init
+    await asyncio.wrap_future(engine.submit(SAMPLE_MESSAGES[0]))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(REQUESTS_PER_RUN)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "batch_size": batch_size,
+        "throughput": REQUESTS_PER_RUN / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+def main():
+    print(f"Backend: {BACKEND.name}")
+    print("-" * 60)
+    print(f"{'batch':>6} {'msg/s':>10} {'p50 ms':>10} {'p95 ms':>10}")
+    print("-" * 60)
+    for batch_size in (1, 8, 32):
+        result = asyncio.run(run(batch_size))
+        print(
+            f"{result['batch_size']:>6} {result['throughput']:>10.1f} "
+            f"{result['p50']:>10.1f} {result['p95']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmark script: sustained append throughput of the engagement journal and
+the cost of an append on the request path.
+"""
+import tempfile
+import time
+
+from app import journal
+
+RECORDS = 200_000
+RECORD = {
+    "session_id": "bench-session-0001",
+    "scammer_msg": "URGENT: your KYC has lapsed, verify immediately at http://kyc-update.bad/login",
+    "bot_response": "Oh dear, which button do I press? Is it the blue one?",
+    "intelligence": {
+        "phishingLinks": ["http://kyc-update.bad/login"], "emails": [], "phoneNumbers": [],
+        "bankAccounts": [], "upiIds": [], "suspiciousKeywords": ["urgent", "verify", "kyc"],
+    },
+    "threat_source": "ai_guard",
+}
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        log = journal.Journal(tmp, segment_bytes=16 * 1024 * 1024)
+
+        start = time.perf_counter()
+        for i in range(RECORDS):
+            log.append(dict(RECORD, n=i))
+        enqueue_s = time.perf_counter() - start
+        log.flush()
+        total_s = time.perf_counter() - start
+
+        size = sum(
+            len(line) for name in journal.list_segments(tmp)
+            for line in open(f"{tmp}/{name}", "rb")
+        )
+        start = time.perf_counter()
+        replayed = sum(1 for _ in journal.read(directory=tmp))
+        read_s = time.perf_counter() - start
+        log.close()
+
+    print("-" * 50)
+    print(f"Records appended   : {RECORDS:,} ({size / 2**20:.1f} MB)")
+    print(f"Request-path append: {enqueue_s / RECORDS * 1e6:.2f} us/record")
+    print(f"Sustained write    : {RECORDS / total_s:,.0f} records/s ({size / 2**20 / total_s:.1f} MB/s)")
+    print(f"Replay             : {replayed / read_s:,.0f} records/s ({replayed:,} read back)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark script for long-message classification: head truncation vs
+sliding token windows (max and attention pooling), by message length.
+
+Scam emails hide one payload sentence (link + pressure words) at a random
+position inside benign filler; clean emails of the same length carry the
+same filler and, now and then, a harmless link or a lone pressure word.
+For each length and mode it reports detection rate, false positive rate,
+windows per message and per-message latency with a cold and a warm token
+cache (the warm run is a retry of the same messages).
+
+The classifier is security.load_backend() (GUARD_BACKEND; "stub" counts
+whitespace words as tokens and scores with the keyword heuristic).
+
+Usage: python bench_long_messages.py [--per-length N] [--lengths L ...]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app import cache, security
+
+FILLER = [
+    "Our quarterly newsletter covers the new branch opening hours and holiday schedule.",
+    "The community garden project will continue through the summer with weekly volunteer sessions.",
+    "Thank you to everyone who attended the annual meeting last month in the main hall.",
+    "Parking near the east entrance will be limited while the resurfacing work is completed.",
+    "Our team has been working on improvements to the mobile app based on your feedback.",
+    "The library will host a reading group for children every Saturday morning this season.",
+    "Recycling collection moves to Thursdays starting next week for all residential streets.",
+    "We are grateful for the many kind messages received after the charity run.",
+    "Minutes from the previous session are available at the front desk on request.",
+    "Refreshments will be served after the talk, and all are welcome to stay and chat.",
+]
+PAYLOADS = [
+    "Your account is blocked, verify immediately at http://secure-{n}.bad/login or lose access.",
+    "Lottery winner! Pay the release fee urgently to claims{n}@okaxis to avoid legal action.",
+    "Your KYC has lapsed, verify now at http://kyc-{n}.xyz/update within 24 hours.",
+    "Urgent: your refund is on hold, share the OTP immediately or the account stays blocked.",
+]
+MILD = [
+    "Photos from the event are at http://gallery{n}.example.org/album for anyone interested.",
+    "Please reply soon if you can volunteer, it is not urgent.",
+]
+LENGTHS = [32, 128, 256, 512, 1024, 2048, 4096]
+MODES = [("truncate", "max"), ("window", "max"), ("window", "attention")]
+
+
+def filler_words(count: int, rng: random.Random) -> list:
+    words = []
+    while len(words) < count:
+        words.extend(rng.choice(FILLER).split())
+    return words[:count]
+
+
+def email(length: int, scam: bool, rng: random.Random) -> str:
+    """A `length`-word email; scams hide one payload at a random position."""
+    words = filler_words(length, rng)
+    inserts = []
+    if scam:
+        inserts.append(rng.choice(PAYLOADS).format(n=rng.randint(1, 999)))
+    elif rng.random() < 0.5:
+        inserts.append(rng.choice(MILD).format(n=rng.randint(1, 999)))
+    for sentence in inserts:
+        extra = sentence.split()
+        at = rng.randint(0, max(0, len(words) - len(extra)))
+        words[at:at + len(extra)] = extra
+    return " ".join(words)
+
+
+def measure(backend, scams: list, clean: list, chunking: str, pooling: str) -> dict:
+    texts = scams + clean
+    cache.TOKENS.clear()
+    cold, warm, scores = [], [], []
+    for runs in (cold, warm):
+        scores = []
+        for text in texts:
+            start = time.perf_counter()
+            scores.append(security.classify_texts(backend, [text], chunking, pooling)[0])
+            runs.append((time.perf_counter() - start) * 1000)
+    if chunking == "window":
+        windows = statistics.mean(
+            len(security.split_windows(ids, backend.window_size)) for ids in security.token_ids(backend, texts))
+    else:
+        windows = 1.0
+    flagged = [score >= security.SCAM_THRESHOLD for score in scores]
+    return {
+        "recall": sum(flagged[:len(scams)]) / len(scams),
+        "fpr": sum(flagged[len(scams):]) / len(clean),
+        "windows": windows,
+        "cold_ms": statistics.median(cold),
+        "warm_ms": statistics.median(warm),
+    }
+
+
+def tokenize_cost(backend, texts: list) -> tuple:
+    """Median ms to get token ids for one text: tokenizer vs cache hit."""
+    cache.TOKENS.clear()
+    samples = {"miss": [], "hit": []}
+    for kind in ("miss", "hit"):
+        for text in texts:
+            start = time.perf_counter()
+            security.token_ids(backend, [text])
+            samples[kind].append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples["miss"]), statistics.median(samples["hit"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--per-length", type=int, default=40, help="scam and clean emails per length")
+    parser.add_argument("--lengths", type=int, nargs="+", default=LENGTHS)
+    args = parser.parse_args()
+
+    backend = security.load_backend()
+    print(f"Backend '{backend.name}', MAX_SEQ_LENGTH {security.MAX_SEQ_LENGTH} "
+          f"(window {backend.window_size} tokens, overlap {security.WINDOW_OVERLAP}, "
+          f"max {security.MAX_WINDOWS} windows), token cache {cache.TOKEN_CACHE_SIZE} entries")
+    print(f"{'length':>6} {'mode':<17} {'recall':>7} {'FPR':>6} {'windows':>7} "
+          f"{'cold ms':>8} {'warm ms':>8} {'tokenize ms':>14}")
+    for length in args.lengths:
+        rng = random.Random(length)
+        scams = [email(length, True, rng) for _ in range(args.per_length)]
+        clean = [email(length, False, rng) for _ in range(args.per_length)]
+        miss_ms, hit_ms = tokenize_cost(backend, scams)
+        for chunking, pooling in MODES:
+            result = measure(backend, scams, clean, chunking, pooling)
+            label = chunking if chunking == "truncate" else f"{chunking}/{pooling}"
+            tokenize = f"{miss_ms:.3f}/{hit_ms:.3f}" if chunking == "window" else ""
+            print(f"{length:>6} {label:<17} {result['recall']:>7.1%} {result['fpr']:>6.1%} "
+                  f"{result['windows']:>7.1f} {result['cold_ms']:>8.1f} {result['warm_ms']:>8.1f} {tokenize:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Multi-worker check: N worker processes share one session store, the way
+`uvicorn --workers N` (or several containers on one volume) would.
+
+Every turn of every session is routed to a random worker. With
+SESSION_BACKEND=sqlite each turn must see the full history written by the
+others; the in-process backend is run as well to show what breaks without it.
+Also checks that dashboard seqs are global and that an indicator recorded by
+one worker is matched by another after its index refresh.
+
+Last, the shared backend's async paths must not block the event loop: while
+another connection holds the database write lock for LOCK_SECONDS, a
+dashboard append, a stream and a session write run, and the loop has to
+keep ticking.
+
+Usage: python bench_multiworker.py [workers] [sessions] [turns]
+"""
+import asyncio
+import multiprocessing as mp
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+WORKERS = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+SESSIONS = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+TURNS = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+LOCK_SECONDS = 1.0
+MAX_LOOP_STALL_MS = 250
+
+
+def worker(inbox, outbox):
+    from app import conversation, dashboard, indicators, memory, utils
+
+    memory.init_db()
+    indicators.INDEX.load()
+    while True:
+        job = inbox.get()
+        if job is None:
+            break
+        kind, session_id, message = job
+        if kind == "turn":
+            history = conversation.get_history(session_id)
+            seen = history.turn_count if history else 0
+            conversation.record_exchange(session_id, message, f"reply to {message}", "heuristic")
+            seq = dashboard.DASHBOARD_LOGS.append({"session_id": session_id, "scammer_msg": message})
+            outbox.put((session_id, seen, seq))
+        elif kind == "record":
+            indicators.record_intelligence(utils.extract_intelligence(message), 0.9)
+            memory.STORE.flush()
+            outbox.put(("record", 0, 0))
+        elif kind == "match":
+            indicators.INDEX.refresh()
+            outbox.put(("match", len(indicators.INDEX.match(utils.extract_intelligence(message))), 0))
+    memory.STORE.close()
+
+
+def stall_worker(outbox):
+    """Longest event-loop stall (ms) while the write lock is held elsewhere."""
+    from app import conversation, dashboard, memory
+
+    memory.init_db()
+    log = dashboard.DASHBOARD_LOGS
+
+    def hold_lock():
+        conn = sqlite3.connect(memory.DB_PATH)
+        conn.execute("BEGIN IMMEDIATE")
+        time.sleep(LOCK_SECONDS)
+        conn.execute("COMMIT")
+        conn.close()
+
+    async def check():
+        frames = []
+
+        async def consume():
+            async for frame in log.stream(0):
+                if frame.startswith("id:"):
+                    frames.append(frame)
+
+        async def ticker():
+            gaps, last = [], time.perf_counter()
+            while len(gaps) < LOCK_SECONDS * 100:
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+            return max(gaps)
+
+        stream = asyncio.ensure_future(consume())
+        threading.Thread(target=hold_lock).start()
+        await asyncio.sleep(0.05)
+        stall, _, _ = await asyncio.gather(
+            ticker(),
+            log.add({"session_id": "stall", "scammer_msg": "check"}),
+            memory.run_blocking(conversation.record_exchange, "stall", "check", "reply", "heuristic"),
+        )
+        await asyncio.sleep(0.2)
+        stream.cancel()
+        return stall * 1000, len(frames)
+
+    outbox.put(asyncio.run(check()))
+    memory.STORE.close()
+
+
+def loop_stall() -> tuple:
+    os.environ["SESSION_BACKEND"] = "sqlite"
+    os.environ["THREAT_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "threats.db")
+    os.environ["DASHBOARD_POLL_SECONDS"] = "0.05"
+    ctx = mp.get_context("spawn")
+    outbox = ctx.Queue()
+    proc = ctx.Process(target=stall_worker, args=(outbox,))
+    proc.start()
+    result = outbox.get()
+    proc.join()
+    return result
+
+
+def run(backend: str) -> dict:
+    db_path = os.path.join(tempfile.mkdtemp(), "threats.db")
+    os.environ["SESSION_BACKEND"] = backend
+    os.environ["THREAT_DB_PATH"] = db_path
+
+    ctx = mp.get_context("spawn")
+    inboxes = [ctx.Queue() for _ in range(WORKERS)]
+    outbox = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(inbox, outbox)) for inbox in inboxes]
+    for proc in procs:
+        proc.start()
+
+    rng = random.Random(13)
+    lost = 0
+    seqs = []
+    start = time.perf_counter()
+    for turn in range(TURNS):
+        for s in range(SESSIONS):
+            rng.choice(inboxes).put(("turn", f"session-{s}", f"turn {turn} of session {s}"))
+        for _ in range(SESSIONS):
+            _, seen, seq = outbox.get()
+            seqs.append(seq)
+            lost += seen != 2 * turn
+    elapsed = time.perf_counter() - start
+
+    inboxes[0].put(("record", "", "Pay at http://multi-worker-check.bad now"))
+    outbox.get()
+    inboxes[-1].put(("match", "", "Pay at http://multi-worker-check.bad now"))
+    _, matched, _ = outbox.get()
+
+    for inbox in inboxes:
+        inbox.put(None)
+    for proc in procs:
+        proc.join()
+
+    turns = SESSIONS * TURNS
+    return {
+        "turns": turns,
+        "lost_history": lost,
+        "duplicate_seqs": len(seqs) - len(set(seqs)),
+        "indicator_shared": bool(matched),
+        "turns_per_s": turns / elapsed,
+    }
+
+
+def main():
+    print(f"{WORKERS} workers, {SESSIONS} sessions x {TURNS} turns, random routing")
+    print("-" * 60)
+    results = {}
+    for backend in ("memory", "sqlite"):
+        results[backend] = r = run(backend)
+        print(f"{backend:>7}: history lost on {r['lost_history']}/{r['turns']} turns, "
+              f"{r['duplicate_seqs']} duplicate dashboard seqs, "
+              f"indicator shared: {r['indicator_shared']}, {r['turns_per_s']:.0f} turns/s")
+
+    stall_ms, frames = loop_stall()
+    print(f"event loop: longest stall {stall_ms:.0f} ms while the database was locked for "
+          f"{LOCK_SECONDS * 1000:.0f} ms (limit {MAX_LOOP_STALL_MS} ms), {frames} entry streamed")
+
+    shared = results["sqlite"]
+    ok = (not shared["lost_history"] and not shared["duplicate_seqs"] and shared["indicator_shared"]
+          and stall_ms <= MAX_LOOP_STALL_MS and frames == 1)
+    print("OK: shared backend keeps sessions consistent across workers" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Benchmark script for the near-duplicate verdict index (app/neardup.py).
+
+Replays a campaign-style corpus (scam templates re-sent with edits: names,
+links, amounts, emoji, dropped / inserted / swapped words, an extra
+sentence; plus clean chat, some of it reusing scam vocabulary) through the
+exact verdict cache and the index, and compares every verdict the index
+hands out with what the exact classifier says about that same message.
+
+- precision: index hits whose verdict the classifier agrees with
+- recall: classifier-scam messages missing the exact cache that the index
+  answered (the first sighting of each template can never be answered)
+- latency: signature + lookup per message vs one classifier pass
+- memory: index size, evictions and RSS under a cap, with a stream of
+  unique scams that would otherwise grow it without bound
+
+The classifier is security.load_backend() (GUARD_BACKEND; "stub" scores
+with the keyword heuristic when no weights are available).
+
+Usage: python bench_neardup.py [--messages N] [--threshold T ...] [--min-score S]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from typing import Optional
+
+from app import cache, neardup, security
+
+SCAM_TEMPLATES = [
+    "Dear {name}, your KYC has lapsed. Verify at {link} within 24 hours or your account will be blocked.",
+    "URGENT: your account ending {digits} is blocked. Call {phone} immediately to verify your identity.",
+    "Congratulations {name}! You won the lottery prize of Rs {amount}. Pay the processing fee to {upi} to claim.",
+    "Hi mum, this is my new number. Can you send Rs {amount} for my exam fee? It's urgent, pay to {upi}.",
+    "Your electricity connection will be cut tonight at 9:30 pm. Pay the pending bill now at {link}",
+    "Dear customer, your SBI reward points worth Rs {amount} expire today. Redeem now at {link}",
+    "This is the cyber crime cell. A parcel in your name has illegal items. Call {phone} immediately or face arrest.",
+    "Your PAN card is blocked. Update PAN at {link} to avoid suspension of your bank account.",
+    "Hello {name}, work from home job offer: earn Rs {amount} daily by liking videos. Register fee to {upi}.",
+    "Your Amazon order {digits} could not be delivered. Reschedule and pay Rs 25 at {link}",
+    "Income tax refund of Rs {amount} approved. Verify your bank account at {link} to receive it today.",
+    "{name}, I am stuck at the airport and lost my wallet. Please send Rs {amount} to {upi}, will return tomorrow.",
+    "Your SIM card will be deactivated in 2 hours. Share the OTP sent to your number to continue service.",
+    "Final notice: your loan of Rs {amount} is overdue. Pay immediately via {upi} or legal action will follow.",
+    "Dear {name}, your Netflix payment failed. Update your card details at {link} to avoid suspension.",
+]
+CLEAN_TEMPLATES = [
+    "Are we still on for dinner at {time} tonight?",
+    "Thanks {name}, see you tomorrow at the office.",
+    "Can you pick up milk and bread on your way home?",
+    "The meeting moved to {time}, same room as last week.",
+    "Happy birthday {name}! Hope you have a wonderful day.",
+    "I paid the electricity bill already, no need to worry about it.",
+    "Did you verify the train tickets for Friday? Platform changed to {digits}.",
+    "Your account statement for March is attached, let me know if anything looks off.",
+    "Send me the photos from the trip when you get a chance.",
+    "Mum, I reached the hostel safely. Will call you after class.",
+]
+NAMES = ["Ravi", "Anita", "John", "Priya", "Arthur", "Meera", "Suresh", "Kavya", "Rahul", "Fatima"]
+SITES = ["kyc-help", "sbi-update", "pay-now", "secure-verify", "refund-portal", "bill-desk"]
+TLDS = ["bad", "xyz", "top", "co.in"]
+EMOJI = [" 🙏", " !!", " 😊", " ⚠️", " 🔔"]
+FILLERS = ["please", "kindly", "sir", "madam", "dear", "now", "today", "asap"]
+SWAPS = {"immediately": "right away", "blocked": "suspended", "verify": "confirm", "pay": "transfer",
+         "account": "a/c", "urgent": "very urgent", "now": "today"}
+EXTRA = [" Do not share this with anyone.", " Ignore if already done.", " This is an automated message.",
+         " Reply STOP to opt out.", " Contact support for help."]
+MODEL_BATCH = 64
+
+
+def fill(template: str, rng: random.Random) -> str:
+    return template.format(
+        name=rng.choice(NAMES),
+        link=f"http://{rng.choice(SITES)}{rng.randint(1, 99)}.{rng.choice(TLDS)}/{rng.choice(['kyc', 'login', 'pay'])}",
+        digits=rng.randint(10, 9999),
+        amount=rng.choice([499, 999, 2500, 5000, 15000, 25000, 100000]),
+        phone=f"+91 9{rng.randint(100000000, 999999999)}",
+        upi=f"{rng.choice(NAMES).lower()}{rng.randint(1, 999)}@{rng.choice(['okaxis', 'ybl', 'paytm'])}",
+        time=f"{rng.randint(5, 10)}pm",
+    )
+
+
+def mutate(message: str, rng: random.Random, edits: int) -> str:
+    """Applies `edits` random script edits a campaign operator might make."""
+    for _ in range(edits):
+        words = message.split()
+        op = rng.randrange(5)
+        if op == 0 and len(words) > 6:
+            del words[rng.randrange(len(words))]
+        elif op == 1:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(FILLERS))
+        elif op == 2:
+            words = [SWAPS.get(w.lower(), w) if rng.random() < 0.5 else w for w in words]
+        elif op == 3:
+            message = " ".join(words) + rng.choice(EXTRA)
+            continue
+        else:
+            message = " ".join(words) + rng.choice(EMOJI)
+            continue
+        message = " ".join(words)
+    return message
+
+
+def corpus(n: int, seed: int = 7, scam_rate: float = 0.8) -> list:
+    """Replay trace of (template label, message)."""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        scam = rng.random() < scam_rate
+        template = rng.choice(SCAM_TEMPLATES if scam else CLEAN_TEMPLATES)
+        message = mutate(fill(template, rng), rng, rng.choice([0, 1, 1, 2, 2, 3, 4]))
+        out.append(("scam" if scam else "clean", message))
+    return out
+
+
+def exact_verdicts(backend, messages: list) -> list:
+    """(is_scam, probability) from the classifier for every message."""
+    out = []
+    for i in range(0, len(messages), MODEL_BATCH):
+        for score in backend.classify_batch(messages[i:i + MODEL_BATCH]):
+            out.append((score >= security.SCAM_THRESHOLD, score))
+    return out
+
+
+def model_ms(backend, messages: list) -> float:
+    """Median single-message classifier latency."""
+    samples = []
+    for message in messages[:50]:
+        start = time.perf_counter()
+        backend.classify_batch([message])
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def replay(messages: list, exact: list, index: Optional[neardup.NearDupIndex]) -> dict:
+    """Exact cache -> index (if any) -> classifier, as security.predict_scam does."""
+    cache.VERDICTS.clear()
+    stats = {"exact_hits": 0, "index_hits": 0, "model_calls": 0, "agree": 0,
+             "scam_reached": 0, "scam_answered": 0, "score_error": [], "lookup_us": []}
+    for message, truth in zip(messages, exact):
+        key = cache.verdict_key(message)
+        if cache.VERDICTS.get(key) is not None:
+            stats["exact_hits"] += 1
+            continue
+        verdict = None
+        if index is not None:
+            start = time.perf_counter()
+            verdict = index.lookup(message)
+            stats["lookup_us"].append((time.perf_counter() - start) * 1e6)
+        if truth[0]:
+            stats["scam_reached"] += 1
+        if verdict is None:
+            stats["model_calls"] += 1
+            verdict = truth
+            if index is not None:
+                index.add(message, verdict)
+        else:
+            stats["index_hits"] += 1
+            stats["agree"] += verdict[0] == truth[0]
+            stats["scam_answered"] += truth[0]
+            stats["score_error"].append(abs(verdict[1] - truth[1]))
+        cache.VERDICTS.set(key, verdict)
+    return stats
+
+
+def report(label: str, stats: dict, n: int, classifier_ms: float) -> None:
+    lookups = sorted(stats["lookup_us"]) or [0.0]
+    hits = stats["index_hits"]
+    precision = stats["agree"] / hits if hits else 1.0
+    recall = stats["scam_answered"] / stats["scam_reached"] if stats["scam_reached"] else 0.0
+    saved = hits * classifier_ms - sum(lookups) / 1000
+    error = statistics.mean(stats["score_error"]) if stats["score_error"] else 0.0
+    print(f"{label:<28} {stats['exact_hits'] / n:>7.1%} {hits / n:>7.1%} {stats['model_calls'] / n:>7.1%} "
+          f"{precision:>9.2%} {recall:>7.1%} {error:>7.3f} "
+          f"{statistics.median(lookups):>6.0f}/{lookups[int(len(lookups) * 0.99)]:<6.0f} {saved / 1000:>8.1f}")
+
+
+def run_accuracy(messages: list, exact: list, thresholds: list, min_score: float, classifier_ms: float) -> None:
+    n = len(messages)
+    print(f"{'config':<28} {'exact':>7} {'index':>7} {'model':>7} {'precision':>9} {'recall':>7} "
+          f"{'|dp|':>7} {'p50/p99 us':>13} {'saved s':>8}")
+    report("exact cache only", replay(messages, exact, None), n, classifier_ms)
+    for threshold in thresholds:
+        for permutations, bands in ((64, 16), (128, 32)):
+            index = neardup.NearDupIndex(threshold=threshold, permutations=permutations, bands=bands,
+                                         min_score=min_score)
+            report(f"t={threshold} k={permutations} b={bands}", replay(messages, exact, index), n, classifier_ms)
+
+
+def check_estimates(messages: list, pairs: int = 2000, seed: int = 3) -> None:
+    """MinHash estimate vs true Jaccard of shingle sets over random pairs."""
+    rng = random.Random(seed)
+    index = neardup.NearDupIndex()
+    errors = []
+    for _ in range(pairs):
+        a, b = rng.sample(messages, 2)
+        sa, sb = neardup.shingles(a), neardup.shingles(b)
+        sig_a, sig_b = index.signature(a), index.signature(b)
+        if sig_a is None or sig_b is None:
+            continue
+        errors.append(abs(index.similarity(sig_a, sig_b) - len(sa & sb) / len(sa | sb)))
+    print(f"MinHash estimate vs true Jaccard over {len(errors)} pairs: mean |error| "
+          f"{statistics.mean(errors):.3f}, p99 {sorted(errors)[int(len(errors) * 0.99)]:.3f}")
+
+
+def check_densify(messages: list) -> bool:
+    """Every bin of a signature is filled, and borrowed bins never pass as a real minimum."""
+    index = neardup.NearDupIndex()
+    k = index.permutations
+    checked = 0
+    for message in messages[:500]:
+        signature = index.signature(message)
+        if signature is None:
+            continue
+        real = {(hash(gram) & neardup.MASK64) % k for gram in neardup.shingles(message)}
+        minima = {signature[b] for b in real}
+        for b, value in enumerate(signature):
+            borrowed = b not in real
+            if value == neardup.EMPTY or bool(value & neardup.BORROWED) != borrowed or (borrowed and value in minima):
+                print(f"Densified bins: bin {b} of {message[:40]!r} holds {value:#x} -> FAIL")
+                return False
+        checked += 1
+    print(f"Densified bins: {checked} signatures, borrowed bins flagged and apart from real minima -> OK")
+    return True
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as handle:
+        for line in handle:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run_memory(cap: int, unique: int, seed: int = 11) -> None:
+    """Indexes `unique` distinct confident scams under a cap of `cap` entries."""
+    rng = random.Random(seed)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 8)))
+             for _ in range(5000)]
+    index = neardup.NearDupIndex(max_entries=cap)
+    before = rss_mb()
+    start = time.perf_counter()
+    for i in range(unique):
+        index.add(" ".join(rng.choice(words) for _ in range(20)), (True, 0.99))
+        if (i + 1) % (unique // 4) == 0:
+            stats = index.stats()
+            print(f"  after {i + 1:>7} adds: {stats['size']:>6} entries, {stats['buckets']:>7} buckets, "
+                  f"{stats['evictions']:>7} evictions, +{rss_mb() - before:.1f} MB RSS")
+    elapsed = time.perf_counter() - start
+    print(f"  {elapsed / unique * 1e6:.0f} us per add (signature + insert + eviction)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--threshold", type=float, nargs="+", default=[0.6, 0.7, 0.8, 0.9])
+    parser.add_argument("--min-score", type=float, default=neardup.NEARDUP_MIN_SCORE,
+                        help="lowest scam probability worth indexing")
+    args = parser.parse_args()
+
+    backend = security.load_backend()
+    trace = corpus(args.messages)
+    messages = [message for _, message in trace]
+    start = time.perf_counter()
+    exact = exact_verdicts(backend, messages)
+    print(f"Classified {len(messages)} messages with the '{backend.name}' backend in "
+          f"{time.perf_counter() - start:.1f}s; {sum(v[0] for v in exact) / len(exact):.1%} scam, "
+          f"{sum(v[0] and v[1] >= args.min_score for v in exact) / len(exact):.1%} "
+          f"confident enough to index (>= {args.min_score})")
+    classifier_ms = model_ms(backend, messages)
+    print(f"Classifier: {classifier_ms:.1f} ms per single message")
+    if not check_densify(messages):
+        sys.exit(1)
+    check_estimates(messages)
+    run_accuracy(messages, exact, args.threshold, args.min_score, classifier_ms)
+    print(f"Memory with NEARDUP_MAX_ENTRIES={neardup.NEARDUP_MAX_ENTRIES}:")
+    run_memory(neardup.NEARDUP_MAX_ENTRIES, neardup.NEARDUP_MAX_ENTRIES * 5)
+
+
+if __name__ == "__main__":
+    main()
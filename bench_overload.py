@@ -0,0 +1,109 @@
+"""
+Overload test for admission control (app/admission.py).
+
+Launches the app offline (stub guard model, stub Groq; see loadgen.py) with
+Groq as the bottleneck: a slow completion, few LLM slots and the reply
+cache off, so every engaged message needs its own call. Capacity is
+measured first with a closed loop, then open-loop load at 1x and 5x that
+rate is replayed with admission control off (ADMISSION=0) and on.
+
+Without admission the Groq queue grows for as long as the overload lasts
+and latency grows with it. With admission, requests past the degrade
+thresholds get heuristic detection and a cached / canned reply, so p99
+stays bounded. The script exits 1 if admitted p99 at 5x exceeds
+--p99-limit-ms (3x the LLM latency by default).
+
+Usage: python bench_overload.py [--duration 20] [--llm-latency-ms 700] [--llm-slots 8]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+import loadgen
+
+OVERLOAD_FACTORS = (1, 5)
+
+
+def launch(admission: bool, args):
+    os.environ.update({
+        "ADMISSION": "1" if admission else "0",
+        "LLM_MAX_CONCURRENCY": str(args.llm_slots),
+        "REPLY_CACHE": "0",
+        "METRICS_ENABLED": "1",
+    })
+    return loadgen.launch_app(args.llm_latency_ms, tempfile.mkdtemp(prefix="overload-"), loadgen.free_port())
+
+
+def run(url: str, rps, concurrency: int, duration: float) -> dict:
+    return asyncio.run(loadgen.run_load(
+        url, "chat", concurrency, rps, duration, loadgen.scripted_sessions(None),
+        0.0, 60.0, False,
+    ))
+
+
+def measure_capacity(args) -> float:
+    """Closed-loop throughput with admission off: what the app can actually serve."""
+    process, url = launch(False, args)
+    try:
+        report = run(url, None, args.llm_slots * 2, args.duration / 2)
+    finally:
+        process.terminate()
+        process.wait(10)
+    return report["throughput_rps"]
+
+
+def row(label: str, report: dict) -> str:
+    latency = report["latency_ms"]
+    statuses = report["statuses"]
+    errors = report["errors"]
+    rejected = errors.get("http_429", 0) + errors.get("http_503", 0)
+    failed = sum(errors.values()) - rejected
+    return (f"{label:<22} {report['requests']:>6} {report['throughput_rps']:>8.1f} "
+            f"{latency.get('p50', 0):>9.0f} {latency.get('p99', 0):>9.0f} {latency.get('max', 0):>9.0f} "
+            f"{statuses.get('degraded', 0):>8} {rejected:>8} {failed:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per load level")
+    parser.add_argument("--llm-latency-ms", type=float, default=700.0)
+    parser.add_argument("--llm-slots", type=int, default=8)
+    parser.add_argument("--p99-limit-ms", type=float,
+                        help="fail if p99 with admission at 5x exceeds this (default: 3x the LLM latency)")
+    args = parser.parse_args()
+    # Full-path requests admitted just before the threshold wait for one
+    # round of queued calls, then make their own (plus the stub's jitter)
+    limit_ms = args.p99_limit_ms or 3 * args.llm_latency_ms
+
+    capacity = measure_capacity(args)
+    print(f"Capacity: {capacity:.1f} req/s (stub Groq {args.llm_latency_ms:.0f} ms, {args.llm_slots} slots, "
+          f"reply cache off)")
+    print(f"{'run':<22} {'reqs':>6} {'ok/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} "
+          f"{'degraded':>8} {'429/503':>8} {'failed':>7}")
+    p99_at_peak = None
+    for admission in (False, True):
+        process, url = launch(admission, args)
+        try:
+            for factor in OVERLOAD_FACTORS:
+                rps = capacity * factor
+                # Enough connections that the client never throttles the offered rate
+                concurrency = max(64, int(rps * 4))
+                report = run(url, rps, concurrency, args.duration)
+                label = f"{'admission' if admission else 'no admission'} {factor}x"
+                print(row(label, report))
+                if admission and factor == max(OVERLOAD_FACTORS):
+                    p99_at_peak = report["latency_ms"].get("p99")
+        finally:
+            process.terminate()
+            process.wait(10)
+
+    ok = p99_at_peak is not None and p99_at_peak <= limit_ms
+    print(f"p99 with admission at {max(OVERLOAD_FACTORS)}x capacity: {p99_at_peak} ms "
+          f"(limit {limit_ms:.0f} ms) -> {'OK' if ok else 'FAIL'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
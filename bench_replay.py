@@ -0,0 +1,137 @@
+"""
+Replay benchmark for the verdict and reply caches.
+
+Replays JSONL traffic ({"session_id": ..., "message": ...} per line) through
+the cache layer with stub classifier / LLM costs and reports hit rates and
+the model and LLM time avoided. Without a file argument, a synthetic
+campaign trace is generated (and can be saved with --write <path>).
+
+It also checks the cache keys: messages that differ only in a link, domain
+or number must get separate verdict keys (a phishing link must never reuse
+a benign message's verdict) while still sharing one reply pool.
+
+Usage: python bench_replay.py [traffic.jsonl] [--write traffic.jsonl]
+"""
+import json
+import random
+import sys
+
+from app import cache
+
+MODEL_MS = 25.0   # stub cost of one classifier pass (CPU, batch of 1)
+LLM_MS = 700.0    # stub cost of one Groq completion
+MESSAGES = 20000
+
+SCRIPTS = [
+    "Dear {name}, your KYC has lapsed. Verify at http://{site}.bad/kyc within 24 hours.",
+    "URGENT: your account ending {digits} is blocked. Call {phone} immediately.",
+    "Congratulations {name}! You won the lottery. Pay the fee to {name}{digits}@okaxis.",
+    "Hi mum, new number. Can you send {digits} rupees for my exam fee? Urgent!!",
+    "Your electricity will be cut tonight. Pay now at http://{site}.bad/pay",
+]
+CLEAN = [
+    "Are we still on for dinner at {digits}?",
+    "Thanks {name}, see you tomorrow.",
+]
+NAMES = ["Ravi", "Anita", "John", "Priya", "Arthur", "Meera"]
+
+
+def synthetic_traffic(n: int, seed: int = 1):
+    """Campaign-style trace: a few scripts replayed with small edits."""
+    rng = random.Random(seed)
+    for i in range(n):
+        template = rng.choice(SCRIPTS if rng.random() < 0.85 else CLEAN)
+        message = template.format(
+            name=rng.choice(NAMES),
+            site=rng.choice(["kyc-help", "sbi-update", "pay-now"]),
+            digits=rng.randint(10, 99999),
+            phone=f"+1 555 {rng.randint(100, 999)} {rng.randint(1000, 9999)}",
+        )
+        if rng.random() < 0.2:
+            message += rng.choice([" !!", " 🙏", " pls", "  "])
+        yield {"session_id": f"s{rng.randint(0, n // 10)}", "message": message}
+
+
+def load_traffic(path: str):
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                yield json.loads(line)
+
+
+def replay(records) -> dict:
+    cache.VERDICTS.clear()
+    cache.REPLIES.clear()
+    rng = random.Random(2)
+    total = model_calls = llm_calls = 0
+    for record in records:
+        total += 1
+        message = record["message"]
+
+        key = cache.verdict_key(message)
+        if cache.VERDICTS.get(key) is None:
+            model_calls += 1
+            cache.VERDICTS.set(key, (True, 0.9))
+
+        if cache.cached_reply(message) is None:
+            llm_calls += 1
+            cache.store_reply(message, f"stub reply {rng.randint(0, 10**6)}")
+
+    return {
+        "messages": total,
+        "model_calls": model_calls,
+        "llm_calls": llm_calls,
+        "model_s_saved": (total - model_calls) * MODEL_MS / 1000,
+        "llm_s_saved": (total - llm_calls) * LLM_MS / 1000,
+        "stats": cache.stats(),
+    }
+
+
+# Pairs that differ only in an indicator
+INDICATOR_VARIANTS = [
+    ("Your parcel is held, track it at https://www.royalmail.com/track",
+     "Your parcel is held, track it at https://royalmail-track.bad/pay"),
+    ("Please verify at paypal.com", "Please verify at paypa1.com"),
+    ("Call us on +44 20 7946 0000 about your order", "Call us on +44 20 7946 0999 about your order"),
+    ("Refund sent to ravi.k@okaxis", "Refund sent to ravi-k@okaxis"),
+    ("Transfer 500 to account 1234567890", "Transfer 500 to account 1234567899"),
+]
+
+
+def check_keys() -> bool:
+    separate = all(cache.verdict_key(a) != cache.verdict_key(b) for a, b in INDICATOR_VARIANTS)
+    pooled = all(cache.normalize(a) == cache.normalize(b)
+                 for a, b in INDICATOR_VARIANTS if cache.URL_RUN.search(a) or cache.DIGIT_RUN.search(a))
+    folded = cache.verdict_key("URGENT:  your account is blocked!!") == cache.verdict_key("urgent your account is blocked")
+    print(f"Verdict keys keep indicators: {separate}; reply keys fold them: {pooled}; "
+          f"case/punctuation folded: {folded}")
+    return separate and pooled and folded
+
+
+def main():
+    args = sys.argv[1:]
+    if "--write" in args:
+        path = args[args.index("--write") + 1]
+        with open(path, "w", encoding="utf-8") as handle:
+            for record in synthetic_traffic(MESSAGES):
+                handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+        print(f"Wrote {MESSAGES} records to {path}")
+        return
+
+    keys_ok = check_keys()
+    records = load_traffic(args[0]) if args else synthetic_traffic(MESSAGES)
+    result = replay(records)
+    stats = result["stats"]
+    print("-" * 50)
+    print(f"Messages replayed : {result['messages']}")
+    print(f"Classifier passes : {result['model_calls']} "
+          f"(verdict hit rate {stats['verdicts']['hit_rate']:.1%})")
+    print(f"LLM completions   : {result['llm_calls']} "
+          f"(reply hit rate {stats['replies']['hit_rate']:.1%})")
+    print(f"Model time saved  : {result['model_s_saved']:.0f}s at {MODEL_MS:.0f}ms/pass")
+    print(f"LLM time saved    : {result['llm_s_saved']:.0f}s at {LLM_MS:.0f}ms/call")
+    sys.exit(0 if keys_ok else 1)
+
+
+if __name__ == "__main__":
+    main()
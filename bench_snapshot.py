@@ -0,0 +1,197 @@
+"""
+Benchmark script for shared indicator snapshots: per-worker startup time
+and memory when N worker processes load the indicator index from SQLite
+versus mapping one snapshot file (INDICATOR_SNAPSHOT_PATH).
+
+A threat database with --indicators rows is built in a temporary folder.
+Each mode then starts --workers fresh processes together. Every worker
+loads the index, touches all of it (so the snapshot pages are resident),
+and reports its load time and its memory once all workers are up:
+
+- RSS: resident pages, counting shared snapshot pages in full.
+- PSS: shared pages split between the processes mapping them, i.e. what
+  each worker really costs.
+- private: pages only this worker holds.
+
+With snapshots, a swap is checked as well. New indicators are written and
+a new snapshot is exported while the workers keep looking up known values
+on a thread. After their next refresh, every worker must see the new
+values, and no lookup may miss during the swap.
+
+Usage: python bench_snapshot.py [--indicators 1000000] [--workers 4]
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+SAMPLE = 10_000
+PAGE = 4096
+
+
+def memory_kb() -> dict:
+    """RSS, PSS and private memory of this process in KB (Linux /proc)."""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def worker(env: dict, size: int, ready, control, results):
+    os.environ.update(env)
+    from app import indicators, memory
+
+    baseline = memory_kb()
+    start = time.perf_counter()
+    indicators.INDEX.load()
+    load_s = time.perf_counter() - start
+    snap = indicators.INDEX.snapshot
+    if snap is not None:
+        # Fault in every page, as a long-running worker eventually would
+        for view in (snap.fps.cast("B"), snap.codes, snap.bloom_bits):
+            for offset in range(0, len(view), PAGE):
+                view[offset]
+    hits = [f"scam-{i}.bad" for i in range(0, size, max(1, size // SAMPLE))]
+    found = sum(1 for value in hits if indicators.INDEX.get(value))
+    ready.wait()
+    usage = memory_kb()
+    results.put({
+        "pid": os.getpid(), "load_s": load_s, "found": found / len(hits),
+        **{key: usage[key] - baseline[key] for key in usage},
+    })
+
+    if control.get() != "swap":
+        return
+    misses, stop = [0], threading.Event()
+
+    def lookups():
+        while not stop.is_set():
+            misses[0] += sum(1 for value in hits[:1000] if not indicators.INDEX.get(value))
+            time.sleep(0.01)
+
+    thread = threading.Thread(target=lookups)
+    thread.start()
+    control.get()  # new snapshot exported
+    old = snap.identity
+    indicators.INDEX.refresh()
+    stop.set()
+    thread.join()
+    new_values = sum(1 for i in range(100) if indicators.INDEX.get(f"fresh-{i}.bad"))
+    results.put({
+        "swapped": indicators.INDEX.snapshot.identity != old,
+        "new_seen": new_values, "misses": misses[0], "delta": len(indicators.INDEX.delta),
+    })
+    memory.STORE.close()
+
+
+def build_db(path: str, size: int) -> float:
+    start = time.perf_counter()
+    os.environ["THREAT_DB_PATH"] = path
+    from app import memory
+    memory.init_db()
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO threat_cache (value, type, confidence, last_seen, hits, expires_at) "
+        "VALUES (?, 'SCAM_URL', 0.9, datetime('now', '-1 hour'), 1, NULL)",
+        ((f"scam-{i}.bad",) for i in range(size)),
+    )
+    conn.commit()
+    conn.close()
+    memory.STORE.close()
+    return time.perf_counter() - start
+
+
+def run_mode(label: str, env: dict, args) -> list:
+    ctx = mp.get_context("spawn")
+    ready = ctx.Barrier(args.workers + 1)
+    controls = [ctx.Queue() for _ in range(args.workers)]
+    results = ctx.Queue()
+    processes = [ctx.Process(target=worker, args=(env, args.indicators, ready, controls[i], results))
+                 for i in range(args.workers)]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    ready.wait()
+    reports = [results.get() for _ in processes]
+    all_up_s = time.perf_counter() - started
+
+    swap_reports = []
+    if env.get("INDICATOR_SNAPSHOT_PATH"):
+        swap_reports = swap(env, controls, results, args)
+    else:
+        for control in controls:
+            control.put("stop")
+    for process in processes:
+        process.join(60)
+
+    load = [r["load_s"] for r in reports]
+    print(f"{label:<10} {statistics.mean(load):>8.2f} {max(load):>8.2f} {all_up_s:>9.2f} "
+          f"{statistics.mean(r['rss'] for r in reports) / 1024:>8.1f} "
+          f"{statistics.mean(r['pss'] for r in reports) / 1024:>8.1f} "
+          f"{statistics.mean(r['private'] for r in reports) / 1024:>8.1f} "
+          f"{sum(r['pss'] for r in reports) / 1024:>9.1f} {min(r['found'] for r in reports):>6.0%}")
+    return swap_reports
+
+
+def swap(env: dict, controls: list, results, args) -> list:
+    from app import indicators, memory, snapshot
+    for control in controls:
+        control.put("swap")
+    time.sleep(0.5)
+    for i in range(100):
+        memory.STORE.upsert(f"fresh-{i}.bad", "SCAM_URL", 0.9)
+    memory.STORE.flush()
+    with snapshot.export_lock(env["INDICATOR_SNAPSHOT_PATH"]):
+        stats = indicators.export_snapshot(path=env["INDICATOR_SNAPSHOT_PATH"])
+    for control in controls:
+        control.put("exported")
+    reports = [results.get() for _ in controls]
+    print(f"Re-export: {stats['entries']} entries in {stats['seconds']:.2f}s")
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--indicators", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="snapshot-")
+    db_path = os.path.join(folder, "threats.db")
+    snap_path = os.path.join(folder, "indicators.snap")
+    print(f"Building {args.indicators} indicators: {build_db(db_path, args.indicators):.1f}s")
+
+    from app import indicators, memory, snapshot
+    with snapshot.export_lock(snap_path):
+        stats = indicators.export_snapshot(memory.STORE, snap_path)
+    print(f"Snapshot: {stats['bytes'] / 2**20:.1f} MB, exported in {stats['seconds']:.2f}s")
+
+    print(f"{args.workers} workers, memory in MB above each worker's baseline after import")
+    print(f"{'mode':<10} {'load s':>8} {'max s':>8} {'all up s':>9} {'RSS':>8} {'PSS':>8} "
+          f"{'private':>8} {'total PSS':>9} {'found':>6}")
+    base_env = {"THREAT_DB_PATH": db_path, "INDICATOR_SNAPSHOT_SECONDS": "3600"}
+    run_mode("sqlite", {**base_env, "INDICATOR_SNAPSHOT_PATH": ""}, args)
+    swaps = run_mode("snapshot", {**base_env, "INDICATOR_SNAPSHOT_PATH": snap_path}, args)
+
+    ok = all(r["swapped"] and r["new_seen"] == 100 and r["misses"] == 0 for r in swaps)
+    print(f"Swap: {sum(r['swapped'] for r in swaps)}/{len(swaps)} workers swapped, new values seen "
+          f"{min(r['new_seen'] for r in swaps)}/100, lookup misses during swap "
+          f"{sum(r['misses'] for r in swaps)}, delta left {max(r['delta'] for r in swaps)} -> "
+          f"{'OK' if ok else 'FAIL'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
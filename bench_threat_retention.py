@@ -0,0 +1,128 @@
+"""
+Benchmark script for threat_cache retention: table size, index size and
+lookup latency over a simulated month of traffic, with the daily compactor
+vs without it.
+
+Every simulated day brings fresh indicators, re-sightings of the last few
+days' indicators and a small set of long-running campaigns seen daily.
+"""
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app import indicators, memory
+
+DAYS = 30
+NEW_PER_DAY = 10000
+CAMPAIGNS = 500
+RESIGHT_DAYS = 3
+RESIGHT_RATE = 0.2
+LOOKUPS = 5000
+START = time.time() - DAYS * memory.DAY_SECONDS
+
+
+def day_traffic(day: int, rng: random.Random) -> list:
+    """(value, confidence, hits) sightings for one simulated day."""
+    sightings = {}
+    for i in range(NEW_PER_DAY):
+        sightings[f"d{day}-{i}.bad"] = (rng.uniform(0.6, 1.0), 1)
+    for back in range(1, RESIGHT_DAYS + 1):
+        if day - back >= 0:
+            for i in rng.sample(range(NEW_PER_DAY), int(NEW_PER_DAY * RESIGHT_RATE / back)):
+                sightings[f"d{day - back}-{i}.bad"] = (rng.uniform(0.6, 1.0), rng.randint(1, 3))
+    for i in range(CAMPAIGNS):
+        sightings[f"campaign-{i}.bad"] = (0.95, rng.randint(1, 5))
+    return [(value, conf, hits) for value, (conf, hits) in sightings.items()]
+
+
+def lookup_latency(store: memory.ThreatStore, index: indicators.IndicatorIndex, day: int,
+                   now: float, rng: random.Random) -> tuple:
+    """Median / p99 microseconds for store.lookup and index.get, half hits half misses."""
+    values = [f"d{rng.randint(max(0, day - 5), day)}-{rng.randrange(NEW_PER_DAY)}.bad" for _ in range(LOOKUPS // 2)]
+    values += [f"clean-{rng.randrange(10 ** 9)}.example" for _ in range(LOOKUPS // 2)]
+    rng.shuffle(values)
+    results = []
+    for op in (lambda v: store.lookup(v, now), index.get):
+        samples = []
+        for value in values:
+            start = time.perf_counter()
+            op(value)
+            samples.append((time.perf_counter() - start) * 1e6)
+        samples.sort()
+        results.append((statistics.median(samples), samples[int(len(samples) * 0.99)]))
+    return results
+
+
+def stale_matches(index: indicators.IndicatorIndex, day: int) -> int:
+    """Indicators from days past the TTL (and never re-sighted since) the index still matches."""
+    cutoff = day - int(memory.THREAT_TTL_DAYS) - RESIGHT_DAYS
+    return sum(1 for d in range(max(0, cutoff)) for i in range(0, NEW_PER_DAY, 10)
+               if index.get(f"d{d}-{i}.bad"))
+
+
+def simulate(compact: bool, folder: str) -> list:
+    store = memory.ThreatStore(os.path.join(folder, f"{'retention' if compact else 'baseline'}.db"))
+    store.init_schema()
+    index = indicators.IndicatorIndex()
+    rng = random.Random(42)
+    rows = []
+    for day in range(DAYS + 15):
+        now = START + (day + 1) * memory.DAY_SECONDS
+        seen = memory._timestamp(now - 3600)
+        traffic = day_traffic(day, rng)
+        store.write_batch([(memory.UPSERT_THREAT, [(v, "SCAM_URL", c, seen, h) for v, c, h in traffic])])
+        for value, _, _ in traffic:
+            index.add(value, "SCAM_URL")
+
+        stats = {"expired": [], "max_lock_ms": 0.0, "chunks": 0}
+        compact_s = 0.0
+        # A day of writes lands in one transaction here; checkpoint it so the
+        # compactor's first commit does not pay for it, as it would not live
+        store.connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        if compact:
+            start = time.perf_counter()
+            stats = store.compact(now, pause_ms=0)
+            compact_s = time.perf_counter() - start
+            index.discard(stats["expired"])
+
+        conn = store.connection()
+        table = conn.execute("SELECT COUNT(*) FROM threat_cache").fetchone()[0]
+        archive = conn.execute("SELECT COUNT(*) FROM threat_archive").fetchone()[0]
+        pages = conn.execute("PRAGMA page_count").fetchone()[0] * conn.execute("PRAGMA page_size").fetchone()[0]
+        (db_p50, db_p99), (ix_p50, ix_p99) = lookup_latency(store, index, day, now, rng)
+        rows.append({
+            "day": day + 1, "table": table, "archive": archive, "mb": pages / 1e6,
+            "index": len(index), "index_mb": index.nbytes() / 1e6,
+            "db_p50": db_p50, "db_p99": db_p99, "ix_p50": ix_p50, "ix_p99": ix_p99,
+            "stale": stale_matches(index, day), "expired": len(stats["expired"]),
+            "compact_s": compact_s, "lock_ms": stats["max_lock_ms"], "chunks": stats["chunks"],
+        })
+    store.close()
+    return rows
+
+
+def main():
+    print(f"{NEW_PER_DAY} new indicators/day, {CAMPAIGNS} daily campaigns, half-life "
+          f"{memory.HALF_LIFE_DAYS:g}d, min confidence {memory.MIN_CONFIDENCE}, TTL {memory.THREAT_TTL_DAYS:g}d")
+    with tempfile.TemporaryDirectory() as folder:
+        for compact in (False, True):
+            print("-" * 118)
+            print("with daily compaction" if compact else "without compaction (baseline)")
+            print(f"{'day':>4} {'rows':>8} {'archive':>8} {'db MB':>7} {'index':>8} {'idx MB':>7} "
+                  f"{'db p50/p99 us':>15} {'idx p50/p99 us':>15} {'stale':>6} {'expired':>8} "
+                  f"{'compact s':>9} {'max lock ms':>11}")
+            for row in simulate(compact, folder):
+                if row["day"] % 5 and row["day"] != 1:
+                    continue
+                print(
+                    f"{row['day']:>4} {row['table']:>8} {row['archive']:>8} {row['mb']:>7.1f} "
+                    f"{row['index']:>8} {row['index_mb']:>7.2f} "
+                    f"{row['db_p50']:>7.1f}/{row['db_p99']:<7.1f} {row['ix_p50']:>7.1f}/{row['ix_p99']:<7.1f} "
+                    f"{row['stale']:>6} {row['expired']:>8} {row['compact_s']:>9.2f} {row['lock_ms']:>11.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark script for the threat store: concurrent reads and writes against
+the pooled WAL store vs a fresh connection per call.
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from app import memory
+
+READERS = 8
+WRITERS = 2
+DURATION = 3.0
+KEYSPACE = 5000
+
+
+def legacy_ops(db_path: str):
+    """Connect-per-call read and write, as the module used to do."""
+    def read(value):
+        conn = sqlite3.connect(db_path, timeout=5)
+        conn.execute(memory.SELECT_THREAT, (value, time.time())).fetchone()
+        conn.close()
+
+    def write(value):
+        conn = sqlite3.connect(db_path, timeout=5)
+        memory._register_functions(conn)
+        conn.execute(memory.UPSERT_THREAT, (value, "SCAM_URL", 0.9, memory._timestamp(), 1))
+        conn.commit()
+        conn.close()
+
+    return read, write
+
+
+def store_ops(store: memory.ThreatStore):
+    """Pooled reads and queued, batched writes."""
+    def write(value):
+        store.upsert(value, "SCAM_URL", 0.9)
+
+    return store.lookup, write
+
+
+def run(read, write) -> dict:
+    """Hammers read/write for DURATION seconds and counts completed ops."""
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + DURATION
+
+    def worker(op, key):
+        done = errors = 0
+        rng = random.Random()
+        while time.perf_counter() < stop:
+            try:
+                op(f"domain-{rng.randrange(KEYSPACE)}.bad")
+                done += 1
+            except sqlite3.Error:
+                errors += 1
+        with lock:
+            counts[key] += done
+            counts["errors"] += errors
+
+    threads = [threading.Thread(target=worker, args=(read, "reads")) for _ in range(READERS)]
+    threads += [threading.Thread(target=worker, args=(write, "writes")) for _ in range(WRITERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return counts
+
+
+def main():
+    print("-" * 60)
+    print(f"{READERS} readers / {WRITERS} writers for {DURATION:.0f}s, {KEYSPACE} keys")
+    print(f"{'mode':>8} {'reads/s':>12} {'writes/s':>12} {'errors':>8}")
+    print("-" * 60)
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        conn = sqlite3.connect(legacy_path)
+        for statement in memory.SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+        conn.close()
+
+        store = memory.ThreatStore(os.path.join(tmp, "pooled.db"))
+        store.init_schema()
+
+        for mode, ops in (("legacy", legacy_ops(legacy_path)), ("pooled", store_ops(store))):
+            counts = run(*ops)
+            if mode == "pooled":
+                store.flush()
+            print(
+                f"{mode:>8} {counts['reads'] / DURATION:>12.0f} "
+                f"{counts['writes'] / DURATION:>12.0f} {counts['errors']:>8}"
+            )
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
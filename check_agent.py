@@ -0,0 +1,60 @@
+"""
+Diagnostic script: exercises Arthur's LLM providers against the local
+stub server (no network or real key needed).
+"""
+import asyncio
+import os
+import sys
+import time
+
+from stub_groq import STUB_REPLIES, start_stub
+
+# The first call fails with 503, to exercise failover to the fallback model
+server, state, base_url = start_stub(latency_s=0.2, fail_first=1, token_delay_s=0.02)
+os.environ["GROQ_API_KEY"] = "stub-key"
+os.environ["GROQ_BASE_URL"] = base_url
+os.environ["LLM_BACKOFF_BASE"] = "0.01"
+
+from app import agent  # noqa: E402  (must import after the env is set)
+
+CONCURRENT_CALLS = 20
+
+
+async def run_checks() -> bool:
+    ok = True
+
+    # 1. Failover: first request gets a 503, the next provider answers
+    reply = await agent.generate_reply("check", "Hello grandpa")
+    retried = state.requests == 2 and reply in STUB_REPLIES
+    print(f"Failover after 503: {'OK' if retried else 'FAIL'} ({reply!r})")
+    ok = ok and retried
+
+    # 2. Concurrency: calls overlap instead of running back to back
+    start = time.perf_counter()
+    replies = await asyncio.gather(*(
+        agent.generate_reply(f"s{i}", "verify your account") for i in range(CONCURRENT_CALLS)
+    ))
+    elapsed = time.perf_counter() - start
+    overlapped = elapsed < CONCURRENT_CALLS * state.latency_s / 2
+    print(f"{CONCURRENT_CALLS} concurrent calls in {elapsed:.2f}s: {'OK' if overlapped else 'FAIL'}")
+    ok = ok and overlapped and all(reply in STUB_REPLIES for reply in replies)
+
+    # 3. Streaming: first fragment arrives before the full reply
+    start = time.perf_counter()
+    first = None
+    fragments = []
+    async for fragment in agent.stream_reply("check", "Send the fee now"):
+        if first is None:
+            first = time.perf_counter() - start
+        fragments.append(fragment)
+    total = time.perf_counter() - start
+    streamed = len(fragments) > 1 and first < total
+    print(f"Stream: first token {first:.2f}s, full reply {total:.2f}s: {'OK' if streamed else 'FAIL'}")
+    print(f"  -> {''.join(fragments)!r}")
+    return ok and streamed
+
+
+if __name__ == "__main__":
+    passed = asyncio.run(run_checks())
+    server.shutdown()
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,52 @@
+"""
+Diagnostic script to verify the guard backends agree with full precision.
+"""
+import os
+import sys
+
+os.environ.setdefault("GUARD_BACKEND", "torch")
+
+from app import security
+
+TOLERANCE = float(os.getenv("GUARD_PARITY_TOLERANCE", "0.05"))
+SAMPLES = [
+    "URGENT: your KYC has lapsed, verify immediately at http://kyc-update.bad/login",
+    "Congratulations! You are the lottery winner. Pay the processing fee to claim.",
+    "Your account will be suspended. Call +1 555 010 9999 to avoid the block.",
+    "Send the refund fee to winner.claims@okaxis and we release the amount today.",
+    "Are we still meeting for lunch tomorrow at 1pm?",
+    "Thanks for the photos from the weekend, the kids loved them.",
+    "Can you pick up milk on the way home?",
+]
+
+
+def check_parity() -> bool:
+    """Compares int8 and ONNX scores against the fp32 reference."""
+    print("-" * 50)
+    print(f"Backend Parity (tolerance {TOLERANCE})")
+    print("-" * 50)
+
+    reference = security.load_backend("torch").classify_batch(SAMPLES)
+    ok = True
+
+    for name in ("int8", "onnx"):
+        try:
+            scores = security.load_backend(name).classify_batch(SAMPLES)
+        except (FileNotFoundError, ImportError) as e:
+            print(f"Skip {name}: {e}")
+            continue
+
+        worst = max(abs(a - b) for a, b in zip(reference, scores))
+        flips = sum(
+            (a >= security.SCAM_THRESHOLD) != (b >= security.SCAM_THRESHOLD)
+            for a, b in zip(reference, scores)
+        )
+        passed = worst <= TOLERANCE and flips == 0
+        ok = ok and passed
+        print(f"{name:>5}: max |diff| = {worst:.4f}, label flips = {flips} -> {'OK' if passed else 'FAIL'}")
+
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_parity() else 1)
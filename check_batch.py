@@ -0,0 +1,94 @@
+"""
+Diagnostic script: drives POST /chat/batch through FastAPI's TestClient with
+an NDJSON body and checks that every item comes back, in order, before a
+timeout. The endpoint reads the request body while it streams the response,
+so a response class that also listens on the receive channel for a client
+disconnect would swallow the body and hang the request.
+
+It also samples admission control's in-flight count during the request:
+the chunk being classified must be charged to it (one per item, so bulk
+work counts toward degrading /chat), and released once the stream ends.
+
+Runs against a throwaway database and journal with the stub guard model
+(GUARD_BACKEND=stub); no model weights or API key needed.
+
+Usage: python check_batch.py [--items 20] [--timeout 30]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+FOLDER = tempfile.mkdtemp(prefix="check-batch-")
+os.environ["THREAT_DB_PATH"] = os.path.join(FOLDER, "threats.db")
+os.environ["JOURNAL_DIR"] = os.path.join(FOLDER, "journal")
+os.environ["API_SECRET_KEY"] = "check-batch-key"
+os.environ["GUARD_BACKEND"] = "stub"
+os.environ["GUARD_STUB_BATCH_MS"] = "20"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import admission, main, security  # noqa: E402  (must import after the env is set)
+
+MESSAGES = [
+    "Your account is blocked, verify at http://kyc-update.xyz immediately",
+    "Hello sir, how are you today?",
+    "Pay the release fee to scammer@upi to claim your prize",
+]
+
+
+def post_batch(body: bytes, result: dict) -> None:
+    with TestClient(main.app) as client:
+        deadline = time.time() + 30
+        while not security.is_ready() and time.time() < deadline:
+            time.sleep(0.05)
+        result["started"] = True
+        response = client.post("/chat/batch", content=body, headers={
+            "x-api-key": os.environ["API_SECRET_KEY"], "content-type": "application/x-ndjson"})
+        result["status"] = response.status_code
+        result["lines"] = [json.loads(line) for line in response.text.splitlines() if line.strip()]
+
+
+def check_batch(items: int, timeout: float) -> bool:
+    """Posts `items` NDJSON lines (plus one invalid line) and checks the response."""
+    lines = [json.dumps({"session_id": f"batch-{i}", "message": MESSAGES[i % len(MESSAGES)]})
+             for i in range(items)]
+    lines.append("not json")
+    result = {}
+    thread = threading.Thread(target=post_batch, args=(("\n".join(lines) + "\n").encode(), result), daemon=True)
+    thread.start()
+    peak = 0
+    deadline = time.time() + timeout
+    while thread.is_alive() and time.time() < deadline:
+        if result.get("started"):
+            peak = max(peak, admission.CONTROLLER.in_flight)
+        time.sleep(0.001)
+    thread.join(max(0.0, deadline - time.time()))
+    if thread.is_alive():
+        print(f"/chat/batch: no response after {timeout:.0f}s -> FAIL (request hangs)")
+        return False
+    charged = peak > 1 and admission.CONTROLLER.in_flight == 0
+    print(f"Admission: peak {peak} in flight during the batch, {admission.CONTROLLER.in_flight} after "
+          f"-> {'OK' if charged else 'FAIL'}")
+
+    results = result["lines"]
+    in_order = [r["index"] for r in results] == list(range(items + 1))
+    sessions = all(r.get("session_id") == f"batch-{i}" for i, r in enumerate(results[:items]))
+    invalid = "error" in results[-1] if results else False
+    ok = result["status"] == 200 and in_order and sessions and invalid and charged
+    print(f"/chat/batch: HTTP {result['status']}, {len(results)}/{items + 1} results, in order: {in_order}, "
+          f"invalid line reported: {invalid} -> {'OK' if ok else 'FAIL'}")
+    for r in results[:len(MESSAGES)]:
+        print(f"   {r}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+    sys.exit(0 if check_batch(args.items, args.timeout) else 1)
@@ -0,0 +1,97 @@
+"""
+Diagnostic script: golden-output check of utils.extract_intelligence against
+the original six-regex implementation.
+"""
+import random
+import re
+import sys
+
+from app import utils
+
+
+def reference_extract_intelligence(text: str) -> dict:
+    """The original implementation, kept verbatim as the golden reference."""
+    intelligence = {
+        "phishingLinks": [],
+        "emails": [],
+        "phoneNumbers": [],
+        "bankAccounts": [],
+        "upiIds": [],
+        "suspiciousKeywords": []
+    }
+
+    url_pattern = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+(?:/[-\w%./?&;=+]*)?'
+    intelligence["phishingLinks"] = list(set(re.findall(url_pattern, text)))
+
+    email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
+    intelligence["emails"] = list(set(re.findall(email_pattern, text)))
+
+    phone_pattern = r'(?:\+?\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}'
+    phones = re.findall(phone_pattern, text)
+    intelligence["phoneNumbers"] = list(set([p for p in phones if len(re.sub(r'\D', '', p)) >= 10]))
+
+    bank_pattern = r'\b\d{9,18}\b'
+    potential_banks = re.findall(bank_pattern, text)
+    intelligence["bankAccounts"] = [b for b in potential_banks if b not in intelligence["phoneNumbers"]]
+
+    upi_pattern = r'[a-zA-Z0-9.\-_]{2,256}@[a-zA-Z]{2,64}'
+    upis = re.findall(upi_pattern, text)
+    intelligence["upiIds"] = list(set([u for u in upis if u not in intelligence["emails"]]))
+
+    triggers = ["urgent", "verify", "block", "suspend", "kyc", "lapse", "immediately", "refund", "winner", "lottery"]
+    found_keywords = [word for word in triggers if word in text.lower()]
+    intelligence["suspiciousKeywords"] = list(set(found_keywords))
+
+    return intelligence
+
+
+GOLDEN_MESSAGES = [
+    "",
+    "Hello, this is urgent. I am Prince Al-Waleed. Visit http://prizecenter.bad/claim",
+    "Please VERIFY your account at https://secure-bank.bad/login?id=7&x=%20 immediately",
+    "Pay winner.claims@okaxis or mail support@help-desk.co.in, ref 123456789012 123456789012",
+    "Call (555) 010-9999 or +91 98765 43210 or 555.010.9999 now, KYC lapse!",
+    "Your a/c 000123456789 will be BLOCKED. Refund via refund@ybl\tlottery\nWINNER",
+    "multi space http://a.b http://c.d/e  x@y.zz@w.com",
+    "blockblock suspendedsuspend verifyverification kyckyc",
+]
+ALPHABET = "ab@.:/-_ 0123456789+()%\tKYCurgentverifyhttps://x.y"
+
+
+def fuzz_messages(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    for _ in range(n):
+        yield "".join(rng.choice(ALPHABET) for _ in range(rng.randrange(0, 120)))
+
+
+def same(a: dict, b: dict) -> bool:
+    """Set-built fields compare as sets; bankAccounts keeps order and duplicates."""
+    for field in b:
+        if field == "bankAccounts":
+            if a[field] != b[field]:
+                return False
+        elif sorted(a[field]) != sorted(b[field]) or len(a[field]) != len(set(a[field])):
+            return False
+    return set(a) == set(b)
+
+
+def check_extractor() -> bool:
+    messages = GOLDEN_MESSAGES + list(fuzz_messages(20000))
+    failures = 0
+    for text in messages:
+        got = utils.extract_intelligence(text)
+        want = reference_extract_intelligence(text)
+        if not same(got, want):
+            failures += 1
+            if failures <= 5:
+                print(f"MISMATCH for {text!r}\n  got:  {got}\n  want: {want}")
+
+    batch_ok = utils.extract_intelligence_batch(GOLDEN_MESSAGES) == [
+        utils.extract_intelligence(text) for text in GOLDEN_MESSAGES
+    ]
+    print(f"Checked {len(messages)} messages: {failures} mismatches, batch API {'OK' if batch_ok else 'FAIL'}")
+    return failures == 0 and batch_ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_extractor() else 1)
@@ -0,0 +1,164 @@
+"""
+Diagnostic script for app/metrics.py: checks the exposition output and
+measures what the instrumentation costs on the detection hot path.
+
+The hot path (extract + tiered pipeline, model not loaded) is timed with
+recording on and off. Without the model and HTTP stack that path is only
+tens of microseconds, so the budget is absolute: the check fails if
+metrics add more than MAX_OVERHEAD_US per message.
+
+Last, real /chat requests go through FastAPI's TestClient with the stub
+guard model (GUARD_BACKEND=stub) and the stub Groq server, and one
+threat-store commit goes through the queued writer, so every instrumented
+call site runs at least once: the check fails if a request errors, the
+writer thread dies, or the model-batch and DB-commit histograms stay empty.
+"""
+import asyncio
+import os
+import re
+import sys
+import tempfile
+import time
+
+from stub_groq import start_stub
+
+# Offline app for the end-to-end check (must be set before import)
+_, _, STUB_URL = start_stub(latency_s=0.01)
+FOLDER = tempfile.mkdtemp(prefix="check-metrics-")
+os.environ["GUARD_BACKEND"] = "stub"
+os.environ["GROQ_BASE_URL"] = STUB_URL
+os.environ["GROQ_API_KEY"] = "stub-key"
+os.environ["API_SECRET_KEY"] = "check-metrics-key"
+os.environ["THREAT_DB_PATH"] = os.path.join(FOLDER, "threats.db")
+os.environ["JOURNAL_DIR"] = os.path.join(FOLDER, "journal")
+
+from app import memory, metrics, pipeline, utils  # noqa: E402
+from bench_replay import synthetic_traffic  # noqa: E402
+
+MAX_OVERHEAD_US = 2.0
+MESSAGES = 20000
+ROUNDS = 5
+SAMPLE_LINE = re.compile(r'^[a-z_]+(\{[a-z_]+="[^"]*"(,[a-z_]+="[^"]*")*\})? -?[0-9.e+-]+$|^[a-z_]+\{.*le="\+Inf".*\} \d+$')
+
+
+def check_exposition() -> int:
+    hist = metrics.Histogram("check_latency_seconds", "Check histogram.", ["stage"])
+    child = hist.labels("a")
+    for value in (0.0001, 0.003, 0.003, 2.0, 100.0):
+        child.observe(value)
+    text = metrics.render()
+    errors = 0
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        if not SAMPLE_LINE.match(line):
+            print(f"  malformed sample: {line}")
+            errors += 1
+    buckets = [int(l.rsplit(" ", 1)[1]) for l in text.splitlines() if l.startswith("check_latency_seconds_bucket")]
+    if buckets != sorted(buckets) or buckets[-1] != 5:
+        print(f"  histogram buckets not cumulative: {buckets}")
+        errors += 1
+    metrics.REGISTRY.remove(hist)
+    return errors
+
+
+def micro_ns() -> dict:
+    counter = metrics.THREATS.labels("check")
+    hist = metrics.CHAT_STAGE_SECONDS.labels("check")
+    n = 200_000
+    out = {}
+    for name, op in (("counter.inc", counter.inc), ("histogram.observe", lambda: hist.observe(0.004)),
+                     ("histogram.since", lambda: hist.since(time.perf_counter()))):
+        start = time.perf_counter()
+        for _ in range(n):
+            op()
+        out[name] = (time.perf_counter() - start) / n * 1e9
+    return out
+
+
+async def hot_path(messages) -> float:
+    """Per-message seconds for what /chat does before the reply, incl. its metric calls."""
+    extract = metrics.CHAT_STAGE_SECONDS.labels("extract")
+    detect = metrics.CHAT_STAGE_SECONDS.labels("detect")
+    total = metrics.REQUEST_SECONDS.labels("chat")
+    start_all = time.perf_counter()
+    for i, message in enumerate(messages):
+        start = time.perf_counter()
+        intelligence = utils.extract_intelligence(message)
+        mark = time.perf_counter()
+        extract.observe(mark - start)
+        detected, source, _, _ = await pipeline.PIPELINE.run(f"check-{i}", message, intelligence)
+        detect.since(mark)
+        if detected:
+            metrics.THREATS.labels(source).inc()
+        total.since(start)
+    return (time.perf_counter() - start_all) / len(messages)
+
+
+def observations(hist: metrics.Histogram) -> int:
+    return sum(sum(child.counts) for child in list(hist._children.values()))
+
+
+def check_instrumented_paths() -> int:
+    """Real /chat requests and one DB commit; returns the number of problems."""
+    from fastapi.testclient import TestClient
+    from app import main as app_main, security
+
+    errors = 0
+    before = {hist.name: observations(hist)
+              for hist in (metrics.MODEL_BATCH_SECONDS, metrics.DB_COMMIT_SECONDS, metrics.REQUEST_SECONDS)}
+    with TestClient(app_main.app, raise_server_exceptions=False) as client:
+        deadline = time.time() + 30
+        while not security.is_ready() and time.time() < deadline:
+            time.sleep(0.05)
+        headers = {"x-api-key": os.environ["API_SECRET_KEY"]}
+        for i, message in enumerate(("Dear customer, kindly confirm the details for your refund",
+                                     "Your account is blocked, verify at http://kyc-check.xyz now")):
+            response = client.post("/chat", json={"session_id": f"metrics-{i}", "message": message},
+                                   headers=headers)
+            if response.status_code != 200:
+                print(f"  /chat returned HTTP {response.status_code}: {response.text[:200]}")
+                errors += 1
+
+    memory.STORE.upsert("metrics-check.bad", "SCAM_URL", 0.9)
+    memory.STORE.flush(timeout=10)
+    writer = memory.STORE._writer
+    if writer is None or not writer.is_alive():
+        print("  threat-writer thread is not running after a commit")
+        errors += 1
+    for hist in (metrics.MODEL_BATCH_SECONDS, metrics.DB_COMMIT_SECONDS, metrics.REQUEST_SECONDS):
+        recorded = observations(hist) - before[hist.name]
+        print(f"  {hist.name}: {recorded} new observations")
+        if not recorded:
+            errors += 1
+    return errors
+
+
+def main():
+    errors = check_exposition()
+    print(f"Exposition format: {'OK' if not errors else f'{errors} problems'}")
+
+    for name, ns in micro_ns().items():
+        print(f"{name:>18}: {ns:6.0f} ns")
+
+    messages = [r["message"] for r in synthetic_traffic(MESSAGES)]
+    timings = {True: [], False: []}
+    for _ in range(ROUNDS):
+        for enabled in (False, True):
+            metrics.ENABLED = enabled
+            timings[enabled].append(asyncio.run(hot_path(messages)))
+    off, on = min(timings[False]), min(timings[True])
+    overhead_us = (on - off) * 1e6
+    print(f"Hot path per message: {off * 1e6:.1f} us without metrics, {on * 1e6:.1f} us with "
+          f"({overhead_us:+.2f} us = {(on - off) / off:+.1%}, limit {MAX_OVERHEAD_US} us)")
+
+    path_errors = check_instrumented_paths()
+    print(f"Instrumented /chat and DB commit paths: {'OK' if not path_errors else f'{path_errors} problems'}")
+
+    ok = not errors and overhead_us <= MAX_OVERHEAD_US and not path_errors
+    print("OK" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Diagnostic script: hedging, failover, circuit breakers and the offline
+fallback of app/providers.py, against local stub providers (stub_groq.py)
+with injected latency distributions and failure rates. No network or real
+key needed.
+
+1. Tail latency: two providers, each answering in 50-100 ms except for a
+   heavy tail (5% of requests take 1.5 s longer). p99 without hedging is the
+   tail; with a 250 ms hedge it should stay well under it.
+2. Failover and breaker: the first provider always fails. Calls still
+   succeed via the second; after three errors in a row the first stops
+   getting traffic, then gets one probe per reset period and is back in use
+   once it recovers.
+3. Offline: with every provider down, Arthur answers from templates at once,
+   in persona (short, no AI talk) and without repeating himself.
+
+Usage: python check_providers.py [--requests 200]
+"""
+import argparse
+import asyncio
+import os
+import re
+import statistics
+import sys
+import time
+
+from stub_groq import STUB_REPLIES, start_stub
+
+# Two dead providers for the agent-level outage check (must be set before import)
+_, OUTAGE_A, outage_a_url = start_stub(fail_rate=1.0)
+_, OUTAGE_B, outage_b_url = start_stub(fail_rate=1.0)
+os.environ["GROQ_API_KEY"] = "stub-key"
+os.environ["LLM_PROVIDERS"] = f"outage-a|{outage_a_url},outage-b|{outage_b_url}"
+os.environ["LLM_BREAKER_FAILURES"] = "2"
+os.environ["LLM_BACKOFF_BASE"] = "0.01"
+os.environ["REPLY_CACHE"] = "0"
+
+from app import agent, offline, providers  # noqa: E402  (must import after the env is set)
+
+MESSAGES = [{"role": "user", "content": "Your account is blocked, verify now"}]
+SCAM_MESSAGES = [
+    "Your account is blocked, click http://kyc-update.xyz to verify immediately",
+    "Pay the release fee of Rs 4999 to claim your lottery prize",
+    "Share the OTP you just received to stop the transaction",
+    "This is the police, a warrant is issued in your name, act now",
+    "Send your Aadhaar and PAN for KYC verification",
+    "Hello sir, how are you today?",
+]
+
+
+def make_provider(name: str, url: str, failures: int = 5, reset_after: float = 30.0) -> providers.Provider:
+    return providers.Provider(name, providers.make_client(url, "stub-key"), name,
+                              providers.CircuitBreaker(failures, reset_after))
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def timed_calls(pool: providers.ProviderPool, requests: int, concurrency: int = 8) -> list:
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with slots:
+            start = time.perf_counter()
+            reply = await pool.complete(MESSAGES, temperature=0.7)
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert reply in STUB_REPLIES
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies
+
+
+async def check_tail(requests: int) -> bool:
+    knobs = dict(latency_s=0.05, jitter_s=0.05, tail_prob=0.05, tail_s=1.5)
+    _, state_a, url_a = start_stub(**knobs)
+    _, state_b, url_b = start_stub(**knobs)
+    print(f"1. Tail latency ({requests} calls, 50-100 ms + 5% at +1.5 s):")
+    print(f"   {'setup':<24} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'max ms':>7} {'hedged':>7} {'won':>5}")
+    results = {}
+    for label, hedge_after, urls in (("no hedging", 0.0, (url_a, url_b)),
+                                     ("hedge 250 ms", 0.25, (url_a, url_b)),
+                                     ("hedge 250 ms, 1 provider", 0.25, (url_a,))):
+        pool = providers.ProviderPool([make_provider(f"p{i}", url) for i, url in enumerate(urls)],
+                                      hedge_after=hedge_after, max_hedges=8)
+        latencies = await timed_calls(pool, requests)
+        results[label] = percentile(latencies, 0.99)
+        print(f"   {label:<24} {statistics.median(latencies):>7.0f} {percentile(latencies, 0.95):>7.0f} "
+              f"{results[label]:>7.0f} {max(latencies):>7.0f} {pool.counts['hedges']:>7} "
+              f"{pool.counts['hedge_wins']:>5}")
+    ok = results["no hedging"] > 1000 and results["hedge 250 ms"] < 600 and results["hedge 250 ms, 1 provider"] < 600
+    print(f"   -> {'OK' if ok else 'FAIL'} (hedged p99 under 600 ms, unhedged over 1000 ms)")
+    return ok
+
+
+async def check_breaker() -> bool:
+    _, broken, broken_url = start_stub(fail_rate=1.0)
+    _, healthy, healthy_url = start_stub(latency_s=0.01)
+    primary = make_provider("primary", broken_url, failures=3, reset_after=2.0)
+    pool = providers.ProviderPool([primary, make_provider("secondary", healthy_url)], hedge_after=0.0)
+
+    replies = [await pool.complete(MESSAGES) for _ in range(20)]
+    served = all(reply in STUB_REPLIES for reply in replies)
+    tripped = primary.breaker.state == primary.breaker.OPEN and broken.requests == 3
+    print(f"2. Failover: 20/20 served: {'OK' if served else 'FAIL'}; primary tripped after "
+          f"{broken.requests} failures: {'OK' if tripped else 'FAIL'}")
+
+    await asyncio.sleep(2.1)
+    await asyncio.gather(*(pool.complete(MESSAGES) for _ in range(5)))
+    probed = broken.requests == 4 and primary.breaker.state == primary.breaker.OPEN
+    print(f"   After reset: one probe for 5 concurrent calls ({broken.requests - 3} sent), "
+          f"breaker {primary.breaker.state}: {'OK' if probed else 'FAIL'}")
+
+    broken.fail_rate = 0.0
+    await asyncio.sleep(2.1)
+    await pool.complete(MESSAGES)
+    before = healthy.requests
+    await pool.complete(MESSAGES)
+    recovered = primary.breaker.state == primary.breaker.CLOSED and healthy.requests == before
+    print(f"   Recovered primary takes traffic again, breaker {primary.breaker.state}: "
+          f"{'OK' if recovered else 'FAIL'}")
+    return served and tripped and probed and recovered
+
+
+async def check_offline(requests: int) -> bool:
+    warmup = [await agent.generate_reply("outage", SCAM_MESSAGES[0]) for _ in range(3)]
+    network_calls = OUTAGE_A.requests + OUTAGE_B.requests
+    start = time.perf_counter()
+    replies = []
+    for i in range(requests):
+        replies.append(await agent.generate_reply(f"outage{i % 7}", SCAM_MESSAGES[i % len(SCAM_MESSAGES)]))
+    per_call_ms = (time.perf_counter() - start) * 1000 / requests
+    fast = OUTAGE_A.requests + OUTAGE_B.requests == network_calls and per_call_ms < 5
+    print(f"3. Outage: {network_calls} requests until both breakers opened, then {requests} offline replies "
+          f"at {per_call_ms:.3f} ms each with no network: {'OK' if fast else 'FAIL'}")
+
+    forbidden = [r for r in warmup + replies if offline.FORBIDDEN.search(r)]
+    too_long = [r for r in warmup + replies if len(re.findall(r"[.?!](\s|$)", r)) > 2]
+    distinct = len(set(replies))
+    persona = not forbidden and not too_long and distinct >= requests // 4
+    print(f"   Persona: {distinct} distinct, {len(too_long)} over two sentences, "
+          f"{len(forbidden)} off-persona: {'OK' if persona else 'FAIL'}")
+    for message, reply in list(zip(SCAM_MESSAGES, replies))[:len(SCAM_MESSAGES)]:
+        print(f"   {message[:40]!r:<44} -> {reply!r}")
+
+    persona_rng = offline.OfflinePersona()
+    repeats = 0
+    last = None
+    for i in range(requests):
+        reply = persona_rng.reply(SCAM_MESSAGES[i % 2], avoid=last)
+        repeats += reply == last
+        last = reply
+    print(f"   No back-to-back repeats over {requests} replies: {'OK' if not repeats else 'FAIL'}")
+    return fast and persona and not repeats
+
+
+async def run_checks(requests: int) -> bool:
+    results = [await check_tail(requests), await check_breaker(), await check_offline(requests)]
+    return all(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run_checks(args.requests)) else 1)
@@ -0,0 +1,51 @@
+"""
+One-shot export of the guard model into ml_assets/.
+
+Writes:
+    ml_assets/scam_model/        full-precision checkpoint (if downloaded)
+    ml_assets/scam_model_int8.pt dynamic int8 quantized module
+    ml_assets/scam_model.onnx    ONNX graph for onnxruntime
+"""
+import os
+
+import torch
+
+from app import security
+
+
+def export_models():
+    """Saves the fp32 checkpoint, the int8 module and the ONNX graph."""
+    os.makedirs(security.ASSETS_DIR, exist_ok=True)
+    tokenizer, model = security.load_security_model()
+    model.eval()
+
+    # 1. Full precision checkpoint (makes later loads offline)
+    if not os.path.exists(security.local_model_path) or not os.listdir(security.local_model_path):
+        tokenizer.save_pretrained(security.local_model_path)
+        model.save_pretrained(security.local_model_path)
+        print(f"Saved checkpoint: {security.local_model_path}")
+
+    # 2. Dynamic int8
+    quantized = security.quantize_model(model)
+    torch.save(quantized, security.INT8_MODEL_PATH)
+    print(f"Saved quantized model: {security.INT8_MODEL_PATH}")
+
+    # 3. ONNX (dynamic batch and sequence axes)
+    sample = tokenizer(["verify your account"], return_tensors="pt")
+    input_names = list(sample.keys())
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+    torch.onnx.export(
+        model,
+        tuple(sample[name] for name in input_names),
+        security.ONNX_MODEL_PATH,
+        input_names=input_names,
+        output_names=["logits"],
+        dynamic_axes=dynamic_axes,
+        opset_version=14,
+    )
+    print(f"Saved ONNX graph: {security.ONNX_MODEL_PATH}")
+
+
+if __name__ == "__main__":
+    export_models()
@@ -0,0 +1,104 @@
+"""
+Offline bulk analysis of captured scam messages (same path as /chat/batch).
+
+Reads a JSON array or NDJSON of {"session_id", "message"} from a file or
+stdin and writes one NDJSON result per item, in input order. Indicators of
+detected threats are saved to the threat database.
+
+Usage:
+    python ingest_batch.py [feed.ndjson] [--out results.ndjson] [--no-model] [--compare]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from app import bulk, cache, memory, pipeline, security, utils
+
+
+async def items_async(items):
+    for item in items:
+        yield item
+
+
+async def run(items, out) -> int:
+    count = 0
+    async for result in bulk.analyze_stream(items_async(items)):
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+async def decide_single(items) -> list:
+    """Per-message path, as /chat does it, for --compare."""
+    results = []
+    for item in items:
+        intelligence = utils.extract_intelligence(item["message"])
+        results.append(await pipeline.PIPELINE.run(item["session_id"], item["message"], intelligence))
+    return results
+
+
+async def decide_batched(items) -> list:
+    """Chunked path of bulk.analyze_chunk, without recording, for --compare."""
+    results = []
+    for i in range(0, len(items), bulk.CHUNK_SIZE):
+        chunk = items[i:i + bulk.CHUNK_SIZE]
+        intelligence = utils.extract_intelligence_batch([item["message"] for item in chunk])
+        results.extend(await pipeline.PIPELINE.run_batch(
+            [(item["session_id"], item["message"], intel) for item, intel in zip(chunk, intelligence)]
+        ))
+    return results
+
+
+def compare(items) -> None:
+    """Times decisions on both paths (same index state) and checks they agree."""
+    items = [item for item in items if "error" not in item]
+    timings = {}
+    decisions = {}
+    for name, decide in (("per-message", decide_single), ("batched", decide_batched)):
+        cache.VERDICTS.clear()
+        start = time.perf_counter()
+        decisions[name] = asyncio.run(decide(items))
+        timings[name] = time.perf_counter() - start
+        print(f"# {name:>11}: {len(items) / timings[name]:.0f} msgs/s", file=sys.stderr)
+    mismatches = sum(a[:2] != b[:2] for a, b in zip(decisions["per-message"], decisions["batched"]))
+    print(f"# batched speedup {timings['per-message'] / timings['batched']:.2f}x, "
+          f"{mismatches} decisions differ", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", nargs="?", help="input file (default: stdin)")
+    parser.add_argument("--out", help="output file (default: stdout)")
+    parser.add_argument("--no-model", action="store_true", help="skip the guard model")
+    parser.add_argument("--compare", action="store_true",
+                        help="also time the per-message path and check both agree")
+    args = parser.parse_args()
+
+    memory.init_db()
+    from app import indicators
+    indicators.INDEX.load()
+    if not args.no_model:
+        security.warm_up()
+
+    source = open(args.path, encoding="utf-8") if args.path else sys.stdin
+    with source:
+        items = list(bulk.iter_items(source))
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+
+    start = time.perf_counter()
+    count = asyncio.run(run(items, out))
+    elapsed = time.perf_counter() - start
+    memory.STORE.flush()
+    if args.out:
+        out.close()
+    print(f"# {count} items in {elapsed:.2f}s ({count / elapsed:.0f}/s, "
+          f"chunks of {bulk.CHUNK_SIZE})", file=sys.stderr)
+
+    if args.compare:
+        compare(items)
+
+
+if __name__ == "__main__":
+    main()
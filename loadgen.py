@@ -0,0 +1,410 @@
+"""
+Async load generator and regression check for the honeypot API.
+
+Replays multi-turn scam sessions (built-in scripts, or recorded JSONL such as
+bench_replay.py --write / replay_journal.py output) against a running app at
+a target concurrency and request rate, and writes throughput, latency
+percentiles and error rates to a JSON report. With --launch it starts the app
+itself against the stub Groq server and the stub guard model, so a run needs
+no network, API key or model weights. Replaces mock_scammer.py and
+ai_scammer.py (use --sessions 1 --verbose for a single narrated session).
+
+Usage:
+    python loadgen.py run [--launch] [--url http://127.0.0.1:8000] [--endpoint chat|chat/stream]
+        [--concurrency 32] [--rps 200] [--duration 30 | --sessions 500]
+        [--recorded traffic.jsonl] [--out report.json] [--verbose]
+    python loadgen.py compare baseline.json candidate.json [--latency-tolerance 0.10]
+        [--throughput-tolerance 0.10] [--error-tolerance 0.01]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+API_KEY = os.getenv("API_SECRET_KEY", "your_secret_key_here")
+PERCENTILES = (50, 90, 95, 99)
+
+# Multi-turn scripts: an opener, then the follow-ups a scammer pushes
+SESSION_SCRIPTS = [
+    [
+        "Hello, this is urgent. I am Prince Al-Waleed. I need your bank details to transfer $5M. Visit http://prizecenter.bad/claim",
+        "Why is it taking so long? Please verify your account at http://secure-bank.bad/login",
+        "It is very important. I will send you a gift card if you help.",
+    ],
+    [
+        "Dear customer, your KYC has lapsed. Verify at http://kyc-help.bad/kyc within 24 hours.",
+        "Sir the link is simple, open it and enter your card number and OTP.",
+        "If you do not verify today your account {digits} will be blocked permanently.",
+        "OK call me on +91 98{digits} 4321 and I will guide you.",
+    ],
+    [
+        "This is the tax department. You owe {digits} in back taxes. Pay today to avoid arrest.",
+        "Pay via UPI to taxdept{digits}@okaxis or officers will visit you.",
+        "Do not tell anyone, this is a confidential government matter.",
+    ],
+    [
+        "Hi grandpa, it's me. I lost my phone, this is my new number.",
+        "I am in trouble and need {digits} rupees for the hospital, please hurry.",
+        "Send it to account 5012{digits}88 IFSC SBIN0001234, I will return it tomorrow.",
+    ],
+    [
+        "Congratulations! You won our crypto giveaway. Deposit 0.1 BTC to unlock {digits} BTC.",
+        "Our platform is fully regulated, check http://crypto-gain.bad/proof",
+        "Only 2 hours left to claim. Contact support@crypto-gain.bad now.",
+    ],
+]
+CLEAN_SESSIONS = [
+    ["Are we still on for dinner at {digits}?", "Great, see you there."],
+    ["Thanks for the photos from the weekend, the kids loved them."],
+]
+
+
+# --- Workload ---
+
+def scripted_sessions(count: Optional[int], seed: int = 7):
+    """Endless (or `count`) sessions drawn from the built-in scripts."""
+    rng = random.Random(seed)
+    made = 0
+    while count is None or made < count:
+        script = rng.choice(SESSION_SCRIPTS if rng.random() < 0.85 else CLEAN_SESSIONS)
+        turns = [turn.replace("{digits}", str(rng.randint(100, 99999))) for turn in script]
+        yield f"load-{uuid.uuid4().hex[:12]}", turns
+        made += 1
+
+
+def recorded_sessions(path: str, count: Optional[int]):
+    """Sessions from JSONL ({session_id, message} or journal records), turns in file order."""
+    sessions: Dict[str, List[str]] = defaultdict(list)
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip() or line.startswith("#"):
+                continue
+            record = json.loads(line)
+            message = record.get("message") or record.get("scammer_msg")
+            if message:
+                sessions[str(record.get("session_id", ""))].append(message)
+    run_id = uuid.uuid4().hex[:6]
+    for i, (session_id, turns) in enumerate(sessions.items()):
+        if count is not None and i >= count:
+            return
+        # Fresh ids so repeated runs do not continue each other's sessions
+        yield f"{session_id}-{run_id}", turns
+
+
+class Pacer:
+    """Open-loop schedule: request i is due at start + i / rps."""
+
+    def __init__(self, rps: Optional[float]):
+        self.interval = 1.0 / rps if rps else 0.0
+        self.next_slot = time.perf_counter()
+
+    async def wait(self) -> float:
+        """Sleeps until the next slot; returns the slot's scheduled time."""
+        if not self.interval:
+            return time.perf_counter()
+        slot = self.next_slot
+        self.next_slot += self.interval
+        delay = slot - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return slot
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.first_token: List[float] = []
+        self.errors: Counter = Counter()
+        self.statuses: Counter = Counter()
+        self.requests = 0
+
+
+async def send(client: httpx.AsyncClient, endpoint: str, session_id: str, message: str,
+               scheduled: float, recorder: Recorder, verbose: bool) -> None:
+    payload = {"session_id": session_id, "message": message}
+    headers = {"x-api-key": API_KEY}
+    recorder.requests += 1
+    try:
+        if endpoint == "chat/stream":
+            first = None
+            reply = []
+            async with client.stream("POST", "/chat/stream", json=payload, headers=headers) as response:
+                if response.status_code != 200:
+                    recorder.errors[f"http_{response.status_code}"] += 1
+                    return
+                event = None
+                async for line in response.aiter_lines():
+                    if line.startswith("event: "):
+                        event = line[7:]
+                    elif line.startswith("data: ") and event == "token":
+                        if first is None:
+                            first = time.perf_counter() - scheduled
+                        reply.append(json.loads(line[6:]))
+                    elif line.startswith("data: ") and event == "meta":
+                        meta = json.loads(line[6:])
+                        recorder.statuses[meta.get("status", "?")] += 1
+                        if meta.get("degraded"):
+                            recorder.statuses["degraded"] += 1
+            if first is not None:
+                recorder.first_token.append(first)
+            data = {"response": "".join(reply)}
+        else:
+            response = await client.post("/chat", json=payload, headers=headers)
+            if response.status_code != 200:
+                recorder.errors[f"http_{response.status_code}"] += 1
+                return
+            data = response.json()
+            recorder.statuses[data.get("status", "?")] += 1
+            if data.get("degraded"):
+                recorder.statuses["degraded"] += 1
+        recorder.latencies.append(time.perf_counter() - scheduled)
+        if verbose:
+            print(f"\n[Scammer]: {message}\n[Arthur]: {data.get('response')}")
+            if "intelligence" in data:
+                print(f"[Status]: {data.get('status')}  [Intelligence]: {data['intelligence']}")
+    except httpx.TimeoutException:
+        recorder.errors["timeout"] += 1
+    except httpx.HTTPError as e:
+        recorder.errors[type(e).__name__] += 1
+
+
+async def run_load(url: str, endpoint: str, concurrency: int, rps: Optional[float],
+                   duration: Optional[float], sessions, think_s: float, timeout: float,
+                   verbose: bool) -> dict:
+    recorder = Recorder()
+    pacer = Pacer(rps)
+    stop_at = time.perf_counter() + duration if duration else None
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    source = iter(sessions)
+
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        async def session_worker():
+            # Each worker plays one session at a time, turn by turn
+            for session_id, turns in source:
+                for message in turns:
+                    if stop_at and time.perf_counter() >= stop_at:
+                        return
+                    scheduled = await pacer.wait()
+                    await send(client, endpoint, session_id, message, scheduled, recorder, verbose)
+                    if think_s:
+                        await asyncio.sleep(think_s)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(session_worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return build_report(recorder, elapsed, {
+        "url": url,
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "target_rps": rps,
+        "duration_s": round(elapsed, 3),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    })
+
+
+def percentiles_ms(samples: List[float]) -> dict:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    out = {f"p{p}": round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000, 2)
+           for p in PERCENTILES}
+    out["mean"] = round(statistics.fmean(ordered) * 1000, 2)
+    out["max"] = round(ordered[-1] * 1000, 2)
+    return out
+
+
+def build_report(recorder: Recorder, elapsed: float, meta: dict) -> dict:
+    errors = sum(recorder.errors.values())
+    ok = len(recorder.latencies)
+    report = {
+        "meta": meta,
+        "requests": recorder.requests,
+        "succeeded": ok,
+        "errors": dict(recorder.errors),
+        "error_rate": round(errors / recorder.requests, 5) if recorder.requests else 0.0,
+        "throughput_rps": round(ok / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": percentiles_ms(recorder.latencies),
+        "statuses": dict(recorder.statuses),
+    }
+    if recorder.first_token:
+        report["first_token_ms"] = percentiles_ms(recorder.first_token)
+    return report
+
+
+# --- Offline launch (stub Groq + stub model) ---
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def launch_app(llm_latency_ms: float, workdir: str, port: int):
+    """Starts the stub Groq API in-process and the app under uvicorn. Returns (process, url)."""
+    from stub_groq import start_stub
+
+    _, _, groq_url = start_stub(latency_s=llm_latency_ms / 1000.0, jitter_s=llm_latency_ms / 2000.0)
+    env = dict(
+        os.environ,
+        GUARD_BACKEND="stub",
+        GUARD_EAGER_LOAD="1",
+        GROQ_BASE_URL=groq_url,
+        GROQ_API_KEY="stub-key",
+        API_SECRET_KEY=API_KEY,
+        THREAT_DB_PATH=os.path.join(workdir, "threats.db"),
+        JOURNAL_DIR=os.path.join(workdir, "journal"),
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("App exited during startup.")
+        try:
+            if httpx.get(url + "/ready", timeout=1).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("App did not become ready within 60s.")
+
+
+def run_command(args) -> None:
+    count = args.sessions if args.sessions else (None if args.duration else 100)
+    sessions = recorded_sessions(args.recorded, count) if args.recorded else scripted_sessions(count)
+
+    process = None
+    url = args.url
+    if args.launch:
+        workdir = tempfile.mkdtemp(prefix="loadgen-")
+        process, url = launch_app(args.llm_latency_ms, workdir, free_port())
+        print(f"Launched app on {url} (stub model, stub Groq {args.llm_latency_ms:.0f} ms, data in {workdir})")
+    try:
+        report = asyncio.run(run_load(
+            url, args.endpoint, args.concurrency, args.rps, args.duration, sessions,
+            args.think_ms / 1000.0, args.timeout, args.verbose,
+        ))
+    finally:
+        if process:
+            process.terminate()
+            process.wait(10)
+
+    report["meta"]["launched"] = bool(args.launch)
+    report["meta"]["workload"] = args.recorded or "scripted"
+    latency = report["latency_ms"]
+    print("-" * 60)
+    print(f"{report['succeeded']}/{report['requests']} ok, error rate {report['error_rate']:.2%}, "
+          f"{report['throughput_rps']:.1f} req/s")
+    if latency:
+        print("latency ms: " + "  ".join(f"{k} {v}" for k, v in latency.items()))
+    if "first_token_ms" in report:
+        print("first token ms: " + "  ".join(f"{k} {v}" for k, v in report["first_token_ms"].items()))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"Report written to {args.out}")
+
+
+# --- Compare ---
+
+def compare_reports(base: dict, new: dict, latency_tol: float, throughput_tol: float,
+                    error_tol: float) -> List[str]:
+    """Returns a list of regressions (empty if the candidate is within tolerance)."""
+    regressions = []
+    for key in [f"p{p}" for p in PERCENTILES]:
+        old, cur = base["latency_ms"].get(key), new["latency_ms"].get(key)
+        if old and cur and cur > old * (1 + latency_tol):
+            regressions.append(f"latency {key} {old} -> {cur} ms (+{cur / old - 1:.0%})")
+    old, cur = base["throughput_rps"], new["throughput_rps"]
+    if old and cur < old * (1 - throughput_tol):
+        regressions.append(f"throughput {old} -> {cur} req/s ({cur / old - 1:.0%})")
+    old, cur = base["error_rate"], new["error_rate"]
+    if cur > old + error_tol:
+        regressions.append(f"error rate {old:.2%} -> {cur:.2%}")
+    return regressions
+
+
+def compare_command(args) -> None:
+    with open(args.baseline, encoding="utf-8") as handle:
+        base = json.load(handle)
+    with open(args.candidate, encoding="utf-8") as handle:
+        new = json.load(handle)
+
+    for key in ("endpoint", "concurrency", "target_rps", "workload"):
+        if base["meta"].get(key) != new["meta"].get(key):
+            print(f"Warning: runs differ in {key} ({base['meta'].get(key)} vs {new['meta'].get(key)})")
+    print(f"{'metric':>16} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    print("-" * 52)
+    rows = [(f"latency {k}", base["latency_ms"].get(k), new["latency_ms"].get(k))
+            for k in [f"p{p}" for p in PERCENTILES]]
+    rows += [("throughput", base["throughput_rps"], new["throughput_rps"]),
+             ("error rate", base["error_rate"], new["error_rate"])]
+    for name, old, cur in rows:
+        change = f"{cur / old - 1:+.1%}" if old and cur is not None else "-"
+        print(f"{name:>16} {old if old is not None else '-':>12} {cur if cur is not None else '-':>12} {change:>9}")
+
+    regressions = compare_reports(base, new, args.latency_tolerance, args.throughput_tolerance,
+                                  args.error_tolerance)
+    print("-" * 52)
+    if regressions:
+        print("REGRESSION:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("No regression.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="generate load and write a report")
+    run.add_argument("--url", default="http://127.0.0.1:8000")
+    run.add_argument("--launch", action="store_true", help="start the app offline with stub backends")
+    run.add_argument("--llm-latency-ms", type=float, default=300.0, help="stub Groq latency (--launch)")
+    run.add_argument("--endpoint", choices=["chat", "chat/stream"], default="chat")
+    run.add_argument("--concurrency", type=int, default=32, help="sessions in flight")
+    run.add_argument("--rps", type=float, help="target request rate (default: as fast as possible)")
+    run.add_argument("--duration", type=float, help="seconds to run")
+    run.add_argument("--sessions", type=int, help="number of sessions to play")
+    run.add_argument("--recorded", help="JSONL of recorded sessions to replay")
+    run.add_argument("--think-ms", type=float, default=0.0, help="pause between turns of a session")
+    run.add_argument("--timeout", type=float, default=30.0)
+    run.add_argument("--out", help="JSON report path")
+    run.add_argument("--verbose", action="store_true", help="print every exchange")
+    run.set_defaults(func=run_command)
+
+    cmp = commands.add_parser("compare", help="flag regressions between two reports")
+    cmp.add_argument("baseline")
+    cmp.add_argument("candidate")
+    cmp.add_argument("--latency-tolerance", type=float, default=0.10)
+    cmp.add_argument("--throughput-tolerance", type=float, default=0.10)
+    cmp.add_argument("--error-tolerance", type=float, default=0.01)
+    cmp.set_defaults(func=compare_command)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Streams records from the engagement journal, optionally within a time range.
+
+Usage:
+    python replay_journal.py [--from 2026-10-01T00:00] [--to 2026-10-02T00:00] [--dir data/journal]
+"""
+import argparse
+import json
+from datetime import datetime
+
+from app import journal
+
+
+def parse_time(value: str) -> float:
+    return datetime.fromisoformat(value).timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--from", dest="start", type=parse_time, help="ISO start time (inclusive)")
+    parser.add_argument("--to", dest="end", type=parse_time, help="ISO end time (exclusive)")
+    parser.add_argument("--dir", default=journal.JOURNAL_DIR, help="journal folder")
+    args = parser.parse_args()
+
+    count = 0
+    for record in journal.read(args.start, args.end, args.dir):
+        print(json.dumps(record, ensure_ascii=False))
+        count += 1
+    print(f"# {count} records", flush=True)
+
+
+if __name__ == "__main__":
+    main()
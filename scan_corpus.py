@@ -0,0 +1,288 @@
+"""
+Offline bulk scanner for archived message corpora.
+
+Streams JSONL or CSV files (optionally .gz) and shards them, in chunks, over
+a process pool. Every worker loads its own copy of the guard model once and
+runs the same extraction as utils.extract_intelligence. The parent process
+bulk-inserts verdicts (scan_verdicts) and indicators of scam messages
+(threat_cache; model verdicts only, as in the live pipeline) into the
+threat database, one transaction per chunk, and marks the chunk done in
+that same transaction (scan_chunks). Re-running the same command after a
+crash skips every chunk already committed.
+
+Usage:
+    python scan_corpus.py archive.jsonl.gz more.csv [--workers 4] [--chunk-size 512]
+        [--backend torch|int8|onnx|stub|none] [--text-field message] [--id-field session_id]
+        [--restart]
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import multiprocessing as mp
+import os
+import signal
+import sys
+import time
+from collections import deque
+from typing import Iterator, List, Optional, Tuple
+
+from app import indicators, memory, security, utils
+
+PROGRESS_SECONDS = 2.0
+
+# --- Worker side ---
+
+BACKENDS = ("torch", "int8", "onnx", "stub", "none")
+
+_BACKEND = None
+_LOAD_ERROR: Optional[str] = None
+_FIELDS: Tuple[str, str] = ("message", "session_id")
+
+
+class BackendLoadError(RuntimeError):
+    """A worker could not load the guard model (raised from its first chunk)."""
+
+
+def init_worker(backend: str, threads: int, text_field: str, id_field: str) -> None:
+    """
+    Runs once per worker process: pins thread count and loads the model.
+
+    A failure is kept and reported by scan_chunk: an initializer that raises
+    makes multiprocessing.Pool respawn the worker forever.
+    """
+    global _BACKEND, _LOAD_ERROR, _FIELDS
+    # Ctrl+C is handled by the parent, which kills the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _FIELDS = (text_field, id_field)
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    if backend != "none":
+        try:
+            _BACKEND = security.load_backend(backend)
+        except Exception as e:
+            _LOAD_ERROR = f"{type(e).__name__}: {e}"
+            return
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+
+
+def parse_records(kind: str, first_line: int, payload: list) -> List[Tuple[int, str, str]]:
+    """(line, record_id, text) for every usable record of a chunk."""
+    text_field, id_field = _FIELDS
+    records = []
+    for offset, raw in enumerate(payload):
+        if kind == "jsonl":
+            try:
+                raw = json.loads(raw)
+            except ValueError:
+                continue
+        if not isinstance(raw, dict) or not isinstance(raw.get(text_field), str):
+            continue
+        records.append((first_line + offset, str(raw.get(id_field) or ""), raw[text_field]))
+    return records
+
+
+def scan_chunk(job: tuple) -> tuple:
+    """
+    Extracts and classifies one chunk.
+
+    Returns:
+        tuple: (source, first_line, last_line, verdict rows, indicator rows, scams)
+    """
+    if _LOAD_ERROR is not None:
+        raise BackendLoadError(_LOAD_ERROR)
+    source, kind, first_line, payload = job
+    records = parse_records(kind, first_line, payload)
+    texts = [text for _, _, text in records]
+    intelligence = utils.extract_intelligence_batch(texts)
+
+    if _BACKEND is not None:
+        scores = []
+        for i in range(0, len(texts), security.MAX_BATCH_SIZE):
+            scores.extend(security.classify_texts(_BACKEND, texts[i:i + security.MAX_BATCH_SIZE]))
+        threshold = security.SCAM_THRESHOLD
+    else:
+        scores = [utils.heuristic_score(intel) for intel in intelligence]
+        threshold = utils.HEURISTIC_THRESHOLD
+
+    seen = memory._timestamp()
+    verdicts = []
+    found = {}
+    for (line, record_id, _), intel, score in zip(records, intelligence, scores):
+        is_scam = score >= threshold
+        verdicts.append((source, line, record_id, int(is_scam), float(score)))
+        if is_scam and _BACKEND is not None:
+            for value, threat_type in indicators.indicator_values(intel):
+                _, best, hits = found.get(value, (threat_type, 0.0, 0))
+                found[value] = (threat_type, max(best, float(score)), hits + 1)
+    indicator_rows = [(value, t, score, seen, hits) for value, (t, score, hits) in found.items()]
+    scams = sum(v[3] for v in verdicts)
+    return source, first_line, first_line + len(payload) - 1, verdicts, indicator_rows, scams
+
+
+# --- Parent side ---
+
+class Source:
+    """One input file, read as raw lines (JSONL) or rows (CSV) with a byte position."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.key = os.path.abspath(path)
+        self.size = os.path.getsize(path)
+        name = path[:-3] if path.endswith(".gz") else path
+        self.kind = "csv" if name.endswith(".csv") else "jsonl"
+        self._raw = None
+
+    def position(self) -> int:
+        """Bytes of the (possibly compressed) file consumed so far."""
+        try:
+            return self._raw.tell() if self._raw else 0
+        except ValueError:
+            return self.size
+
+    def chunks(self, chunk_size: int) -> Iterator[Tuple[int, list]]:
+        """(first_line, payload) per chunk; line numbers start at 1."""
+        with open(self.path, "rb") as raw:
+            self._raw = raw
+            binary = gzip.GzipFile(fileobj=raw) if self.path.endswith(".gz") else raw
+            text = io.TextIOWrapper(binary, encoding="utf-8", errors="replace", newline="")
+            rows = csv.DictReader(text) if self.kind == "csv" else text
+            chunk, first = [], 1
+            for line, row in enumerate(rows, 1):
+                if not chunk:
+                    first = line
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    yield first, chunk
+                    chunk = []
+            if chunk:
+                yield first, chunk
+        self._raw = None
+
+
+def completed_chunks(store: memory.ThreatStore, source: str) -> set:
+    rows = store.connection().execute(
+        "SELECT first_line FROM scan_chunks WHERE source = ?", (source,)
+    ).fetchall()
+    return {row[0] for row in rows}
+
+
+def forget_source(store: memory.ThreatStore, source: str) -> None:
+    store.write_batch([
+        ("DELETE FROM scan_chunks WHERE source = ?", [(source,)]),
+        ("DELETE FROM scan_verdicts WHERE source = ?", [(source,)]),
+    ])
+
+
+class Progress:
+    """Periodic progress and throughput lines."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.last_report = self.start
+        self.lines = 0
+        self.skipped = 0
+        self.scams = 0
+        self.indicators = 0
+        self.source: Optional[Source] = None
+
+    def report(self, final: bool = False) -> None:
+        now = time.perf_counter()
+        if not final and now - self.last_report < PROGRESS_SECONDS:
+            return
+        self.last_report = now
+        elapsed = now - self.start
+        where = ""
+        if self.source is not None and not final:
+            where = f" | {os.path.basename(self.source.path)} {self.source.position() / max(self.source.size, 1):.0%}"
+        print(
+            f"{'Done' if final else 'Progress'}: {self.lines} scanned, {self.skipped} resumed, "
+            f"{self.scams} scams, {self.indicators} indicators, "
+            f"{self.lines / elapsed if elapsed else 0:.0f} msgs/s, {elapsed:.0f}s{where}",
+            flush=True,
+        )
+
+
+def scan(paths: List[str], workers: int, chunk_size: int, backend: str, threads: int,
+         text_field: str, id_field: str, restart: bool) -> Progress:
+    store = memory.STORE
+    store.init_schema()
+    progress = Progress()
+    pool = mp.get_context("spawn").Pool(
+        workers, initializer=init_worker, initargs=(backend, threads, text_field, id_field)
+    )
+    # Results are committed oldest first; at most 2 chunks per worker are queued
+    in_flight: deque = deque()
+
+    def commit_oldest() -> None:
+        source, first, last, verdicts, indicator_rows, scams = in_flight.popleft().get()
+        store.write_batch([
+            (memory.UPSERT_THREAT, indicator_rows),
+            (memory.UPSERT_VERDICT, verdicts),
+            (memory.INSERT_SCAN_CHUNK, [(source, first, last)]),
+        ])
+        progress.lines += len(verdicts)
+        progress.scams += scams
+        progress.indicators += len(indicator_rows)
+        progress.report()
+
+    try:
+        for path in paths:
+            source = Source(path)
+            progress.source = source
+            if restart:
+                forget_source(store, source.key)
+            done_chunks = completed_chunks(store, source.key)
+            for first, payload in source.chunks(chunk_size):
+                if first in done_chunks:
+                    progress.skipped += len(payload)
+                    continue
+                if len(in_flight) >= workers * 2:
+                    commit_oldest()
+                job = (source.key, source.kind, first, payload)
+                in_flight.append(pool.apply_async(scan_chunk, (job,)))
+        while in_flight:
+            commit_oldest()
+        pool.close()
+        pool.join()
+    except BackendLoadError as e:
+        pool.terminate()
+        print(f"Could not load the '{backend}' guard model backend: {e}\n"
+              f"Committed chunks are kept. Fix the backend or use --backend none.", flush=True)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        # Every chunk is committed synchronously, so nothing is lost by killing
+        # the workers outright (a graceful pool shutdown can hang mid-interrupt)
+        for child in mp.active_children():
+            child.kill()
+        print("Interrupted. Committed chunks are kept; run the same command to resume.", flush=True)
+        os._exit(130)
+    progress.report(final=True)
+    return progress
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="+", help=".jsonl / .csv files, optionally .gz")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--backend", default=security.BACKEND, choices=BACKENDS,
+                        help="guard model backend, or 'none' for the heuristic score")
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--text-field", default="message")
+    parser.add_argument("--id-field", default="session_id")
+    parser.add_argument("--restart", action="store_true", help="ignore progress from earlier runs")
+    args = parser.parse_args()
+
+    print(f"Scanning {len(args.paths)} file(s) with {args.workers} workers "
+          f"({args.backend} backend, chunks of {args.chunk_size}) into {memory.STORE.db_path}")
+    scan(args.paths, args.workers, args.chunk_size, args.backend, args.threads_per_worker,
+         args.text_field, args.id_field, args.restart)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Local stand-in for the Groq chat completions API (OpenAI-compatible).
+
+Serves POST /openai/v1/chat/completions with either a JSON completion or an
+SSE stream, with optional injected latency and failures. Latency is
+latency_s plus uniform jitter up to jitter_s, plus tail_s on a tail_prob
+fraction of requests (a heavy tail); the first fail_first requests and a
+fail_rate fraction of the rest answer 503. Point the app at it
+with GROQ_BASE_URL=http://127.0.0.1:<port> and any GROQ_API_KEY.
+
+Usage: python stub_groq.py [port]
+"""
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_REPLIES = [
+    "Oh my, which button do I press? Is it the blue one?",
+    "Hold on dear, let me find my reading glasses first.",
+    "I would rather post a cheque. What is your mailing address?",
+    "My grandson usually helps me with the computer. Can you explain it slowly?",
+]
+
+
+class StubState:
+    """Knobs shared by all handler threads."""
+
+    def __init__(self, latency_s: float = 0.0, jitter_s: float = 0.0, fail_first: int = 0,
+                 token_delay_s: float = 0.0, tail_prob: float = 0.0, tail_s: float = 0.0,
+                 fail_rate: float = 0.0):
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.fail_first = fail_first
+        self.token_delay_s = token_delay_s
+        self.tail_prob = tail_prob
+        self.tail_s = tail_s
+        self.fail_rate = fail_rate
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def delay(self) -> float:
+        tail = self.tail_s if random.random() < self.tail_prob else 0.0
+        return self.latency_s + random.uniform(0, self.jitter_s) + tail
+
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status: int, payload: dict) -> None:
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not self.path.endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+
+            with state.lock:
+                state.requests += 1
+                failing = state.requests <= state.fail_first or random.random() < state.fail_rate
+
+            time.sleep(state.delay())
+            if failing:
+                self._send_json(503, {"error": {"message": "stub overloaded"}})
+                return
+
+            reply = random.choice(STUB_REPLIES)
+            model = request.get("model", "stub")
+            if request.get("stream"):
+                self._stream(reply, model)
+            else:
+                self._send_json(200, {
+                    "id": "stub-1",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": reply},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+
+        def _stream(self, reply: str, model: str) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for i, word in enumerate(reply.split(" ")):
+                chunk = {
+                    "id": "stub-1",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "delta": {"content": word if i == 0 else " " + word},
+                        "finish_reason": None,
+                    }],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(state.token_delay_s)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+    return Handler
+
+
+class StubServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass  # clients that gave up (cancelled hedges) close before the reply
+
+
+def start_stub(port: int = 0, **knobs):
+    """Starts the stub on a daemon thread. Returns (server, state, base_url)."""
+    state = StubState(**knobs)
+    server = StubServer(("127.0.0.1", port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8900
+    _, _, url = start_stub(port, latency_s=0.2, jitter_s=0.3)
+    print(f"Stub Groq API on {url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
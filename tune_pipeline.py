@@ -0,0 +1,128 @@
+"""
+Offline threshold tuning for the detection pipeline.
+
+Reads labelled JSONL ({"message": ..., "label": 1|0} per line; an optional
+"model_score" field is used for the model stage), scores every message with
+the heuristic tier, and sweeps each stage's early-exit band. For every stage
+it picks the band that lets the most traffic exit while keeping the error
+rate among exits under --max-error, and prints the PIPELINE_* settings next
+to how the band shipped in app/pipeline.py does on the same traffic.
+
+Usage: python tune_pipeline.py [labelled.jsonl] [--max-error 0.01] [--model]
+"""
+import json
+import sys
+from typing import List, Optional, Tuple
+
+from app import pipeline, utils
+from bench_replay import synthetic_traffic, SCRIPTS
+
+GRID = [round(i * 0.05, 2) for i in range(21)]
+
+
+def load_labelled(path: str):
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                record = json.loads(line)
+                label = record["label"]
+                record["label"] = 1 if label in (1, True, "1", "scam") else 0
+                yield record
+
+
+def synthetic_labelled(n: int = 5000):
+    """Labels the replay benchmark's synthetic trace by the template used."""
+    prefixes = [template.split("{")[0].lower() for template in SCRIPTS]
+    for record in synthetic_traffic(n):
+        text = record["message"].lower()
+        record["label"] = int(any(text.startswith(p) for p in prefixes if p))
+        yield record
+
+
+def band_rates(scored: List[Tuple[float, int]], scam_at: Optional[float],
+               clean_at: Optional[float]) -> Tuple[float, float]:
+    """(exit_rate, error_rate) of one early-exit band."""
+    exits = errors = 0
+    for score, label in scored:
+        if scam_at is not None and score >= scam_at:
+            exits += 1
+            errors += label == 0
+        elif clean_at is not None and score <= clean_at:
+            exits += 1
+            errors += label == 1
+    return exits / len(scored), (errors / exits if exits else 0.0)
+
+
+def best_band(scored: List[Tuple[float, int]], max_error: float):
+    """
+    Finds (scam_at, clean_at) maximizing the exit rate under max_error.
+
+    Returns:
+        (scam_at, clean_at, exit_rate, error_rate); thresholds may be None.
+    """
+    best = (None, None, 0.0, 0.0)
+    for scam_at in GRID + [None]:
+        for clean_at in [None] + GRID:
+            if scam_at is not None and clean_at is not None and clean_at >= scam_at:
+                continue
+            rate, error_rate = band_rates(scored, scam_at, clean_at)
+            if rate and error_rate <= max_error and rate > best[2]:
+                best = (scam_at, clean_at, rate, error_rate)
+    return best
+
+
+def model_scores(messages: List[str]) -> List[float]:
+    from app import security
+
+    backend = security.load_backend()
+    scores = []
+    for i in range(0, len(messages), 32):
+        scores.extend(security.classify_texts(backend, messages[i:i + 32]))
+    return scores
+
+
+def fmt(value: Optional[float]) -> str:
+    return "none" if value is None else f"{value:.2f}"
+
+
+def main():
+    args = sys.argv[1:]
+    max_error = 0.01
+    if "--max-error" in args:
+        max_error = float(args[args.index("--max-error") + 1])
+    paths = [a for a in args if a.endswith(".jsonl")]
+    records = list(load_labelled(paths[0]) if paths else synthetic_labelled())
+
+    labels = [r["label"] for r in records]
+    heuristic = [utils.heuristic_score(utils.extract_intelligence(r["message"])) for r in records]
+
+    print(f"{len(records)} labelled messages ({sum(labels)} scam), max exit error {max_error:.1%}")
+    print("-" * 60)
+    results = {"HEURISTIC": best_band(list(zip(heuristic, labels)), max_error)}
+
+    if "--model" in args or all("model_score" in r for r in records):
+        if all("model_score" in r for r in records):
+            scores = [r["model_score"] for r in records]
+        else:
+            scores = model_scores([r["message"] for r in records])
+        # Only traffic the heuristic band did not settle reaches the model
+        h_scam, h_clean = results["HEURISTIC"][:2]
+        remaining = [
+            (s, label) for s, h, label in zip(scores, heuristic, labels)
+            if not ((h_scam is not None and h >= h_scam) or (h_clean is not None and h <= h_clean))
+        ]
+        if remaining:
+            results["MODEL"] = best_band(remaining, max_error)
+
+    for stage, (scam_at, clean_at, rate, error) in results.items():
+        print(f"{stage.lower():>10}: exits {rate:.1%} of its traffic, error {error:.2%}")
+        print(f"    PIPELINE_{stage}_SCAM_AT={fmt(scam_at)}")
+        print(f"    PIPELINE_{stage}_CLEAN_AT={fmt(clean_at)}")
+    default = next(stage for stage in pipeline.PIPELINE.stages if stage.name == "heuristic")
+    rate, error = band_rates(list(zip(heuristic, labels)), default.scam_at, default.clean_at)
+    print(f"   default: heuristic band scam_at={fmt(default.scam_at)} clean_at={fmt(default.clean_at)} "
+          f"exits {rate:.1%}, error {error:.2%}")
+
+
+if __name__ == "__main__":
+    main()